@@ -2,7 +2,6 @@ from flask import Flask
 from app.db import db
 from flask_login import LoginManager
 from flask_migrate import Migrate
-from app.models import User
 
 login_manager = LoginManager()
 
@@ -15,9 +14,38 @@ def create_app():
     login_manager.init_app(app)  # ✅ after app is created
     login_manager.login_view = 'auth.login' # Set the login view for Flask-Login
 
+    from app.snapshot import init_snapshot
+    init_snapshot(app)  # map the shared College snapshot, if one has been written
+
+    from app.search import init_search
+    init_search(app)
+
+    from app.http_cache import init_http_cache
+    init_http_cache(app)
+
+    from app.metrics import init_metrics
+    init_metrics(app)  # request/SQL timing for /metrics
+
+    from app.query_budget import init_query_budget
+    init_query_budget(app)  # per-route query budgets (QUERY_BUDGET_MODE, development/tests)
+
+    from app.ml.recommendations import result_cache, profile_cache
+    result_cache.maxsize = app.config.get('RECOMMENDATION_CACHE_SIZE', result_cache.maxsize)
+    result_cache.ttl = app.config.get('RECOMMENDATION_CACHE_TTL', result_cache.ttl)
+    profile_cache.maxsize = app.config.get('RECOMMENDATION_PROFILE_CACHE_SIZE', profile_cache.maxsize)
+    profile_cache.ttl = app.config.get('RECOMMENDATION_PROFILE_CACHE_TTL', profile_cache.ttl)
+
+    from app.ml.pool import recommendation_pool
+    recommendation_pool.workers = app.config.get('RECOMMENDATION_WORKERS', recommendation_pool.workers)
+    recommendation_pool.queue_depth = app.config.get('RECOMMENDATION_QUEUE_DEPTH', recommendation_pool.queue_depth)
+    recommendation_pool.timeout = app.config.get('RECOMMENDATION_TIMEOUT', recommendation_pool.timeout)
+
+    from app.users import init_user_cache, load_user as load_cached_user
+    init_user_cache(app)  # per-worker user cache (USER_CACHE_SIZE/TTL)
+
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_cached_user(int(user_id))
 
     # Register routes/blueprints here
     from app.routes.main import main_bp
@@ -0,0 +1,255 @@
+"""
+Facet counts for the /colleges sidebar from precomputed bitmaps.
+
+Every listable college (non-NULL undergrad_population) gets a bit position in College.id
+order, and every facet value (a state, public/private, a size or selectivity band, a
+specialty flag) a Python int bitmap of the colleges that have it. The index is built from the
+snapshot (or the College table when none is published) and rebuilt when the data version
+changes.
+
+Given the current filters, one pass of bitmap ANDs yields the count for every option: within
+the OR-ed groups (state, control, size, selectivity) an option is counted against the other
+groups' filters only, so the numbers say how many schools ticking it would show; specialties
+are AND-ed, so they are counted on top of the full current selection. The same bitmaps give
+the exact result total and the matching ids, in listing order or in a given (search rank)
+order, so searches and proximity listings never send their whole id set to the database.
+"""
+import threading
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import and_
+
+from app.db import db
+from app.models import College
+from app.snapshot import data_version, get_snapshot
+
+# Bounds of a numeric band; a None bound is open
+Band = namedtuple('Band', 'low high include_low include_high')
+
+CONTROL_CODES = {'public': 1, 'private': 2}
+
+SIZE_BANDS = {
+    'small': Band(None, 5000, False, False),
+    'medium': Band(5000, 15000, True, True),
+    'large': Band(15000, None, False, False),
+}
+
+SELECTIVITY_BANDS = {
+    'Extremely Selective': Band(None, 0.10, False, True),
+    'Very Selective': Band(0.10, 0.25, True, True),
+    'Selective': Band(0.25, 0.50, True, True),
+    'Average': Band(0.50, 0.75, True, True),
+    'Safety': Band(0.75, None, False, False),
+}
+
+SPECIALTY_COLUMNS = {
+    'All-Women': 'is_women_only',
+    'All-Men': 'is_men_only',
+    'AANAPISI': 'is_annhi',
+    'HBCU': 'is_hbcu',
+    'NATIVE AMERICAN': 'is_tribal',
+}
+
+# Facet groups whose selected values are OR-ed; specialties are AND-ed
+ANY_GROUPS = ('state', 'control', 'size', 'selectivity')
+
+INDEX_COLUMNS = [
+    'id', 'state', 'control', 'undergrad_population', 'admission_rate', 'cost_of_attendance',
+] + list(SPECIALTY_COLUMNS.values())
+
+
+def band_condition(column, band: Band):
+    """SQL condition for `band` on `column`."""
+    conditions = []
+    if band.low is not None:
+        conditions.append(column >= band.low if band.include_low else column > band.low)
+    if band.high is not None:
+        conditions.append(column <= band.high if band.include_high else column < band.high)
+    return conditions[0] if len(conditions) == 1 else and_(*conditions)
+
+
+def band_mask(values: np.ndarray, band: Band) -> np.ndarray:
+    """Boolean mask of `values` inside `band` (NaN is never inside)."""
+    mask = ~np.isnan(values)
+    if band.low is not None:
+        mask &= values >= band.low if band.include_low else values > band.low
+    if band.high is not None:
+        mask &= values <= band.high if band.include_high else values < band.high
+    return mask
+
+
+def to_bitmap(mask: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+
+
+class FacetResult:
+    """Facet counts and the matching set for one filter combination."""
+
+    def __init__(self, index: 'FacetIndex', mask: int, counts: Dict[str, Dict[str, int]]):
+        self.index = index
+        self.mask = mask
+        self.counts = counts
+        self.total = mask.bit_count()
+
+    def ids(self) -> List[int]:
+        """Matching College ids, in id order."""
+        return self.index.ids_for(self.mask)
+
+    def ordered_ids(self) -> List[int]:
+        """Matching College ids in listing order (undergrad_population descending, then id)."""
+        order = self.index.listing_order
+        return self.index.ids[order[self.index.bits(self.mask)[order]]].tolist()
+
+    def select(self, college_ids: Iterable[int]) -> List[int]:
+        """The matching ones of `college_ids`, in the order given (e.g. search rank)."""
+        college_ids = np.asarray(list(college_ids), dtype=np.int64)
+        if not self.index.size or not len(college_ids):
+            return []
+        pos = np.minimum(np.searchsorted(self.index.ids, college_ids), self.index.size - 1)
+        keep = (self.index.ids[pos] == college_ids) & self.index.bits(self.mask)[pos]
+        return college_ids[keep].tolist()
+
+
+class FacetIndex:
+    def __init__(self, columns: Dict[str, np.ndarray], version: Optional[str] = None):
+        self.version = version
+        listable = ~np.isnan(columns['undergrad_population'])
+        self.ids = columns['id'][listable].astype(np.int64)
+        self.size = len(self.ids)
+        self.universe = (1 << self.size) - 1
+        self.cost = columns['cost_of_attendance'][listable]
+
+        population = columns['undergrad_population'][listable]
+        # Bit positions in /colleges listing order
+        self.listing_order = np.lexsort((self.ids, -population))
+        admission_rate = columns['admission_rate'][listable]
+        states = columns['state'][listable]
+        control = columns['control'][listable]
+        self.bitmaps: Dict[str, Dict[str, int]] = {
+            'state': {str(s): to_bitmap(states == s) for s in np.unique(states) if s},
+            'control': {label: to_bitmap(control == code) for label, code in CONTROL_CODES.items()},
+            'size': {label: to_bitmap(band_mask(population, band)) for label, band in SIZE_BANDS.items()},
+            'selectivity': {
+                label: to_bitmap(band_mask(admission_rate, band)) for label, band in SELECTIVITY_BANDS.items()
+            },
+            'specialties': {
+                label: to_bitmap(columns[name][listable] == 1) for label, name in SPECIALTY_COLUMNS.items()
+            },
+        }
+
+    def bits(self, mask: int) -> np.ndarray:
+        """`mask` as a boolean array over bit positions."""
+        raw = np.frombuffer(mask.to_bytes((self.size + 7) // 8, 'little'), dtype=np.uint8)
+        return np.unpackbits(raw, bitorder='little', count=self.size).astype(bool)
+
+    def ids_for(self, mask: int) -> List[int]:
+        return self.ids[self.bits(mask)].tolist()
+
+    def id_mask(self, college_ids: Iterable[int]) -> int:
+        college_ids = np.asarray(list(college_ids), dtype=np.int64)
+        if not self.size or not len(college_ids):
+            return 0
+        pos = np.minimum(np.searchsorted(self.ids, college_ids), self.size - 1)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[pos[self.ids[pos] == college_ids]] = True
+        return to_bitmap(mask)
+
+    def _group_mask(self, group: str, selected: List[str]) -> Optional[int]:
+        """Bitmap allowed by `group`'s selection, or None when it doesn't filter."""
+        bitmaps = self.bitmaps[group]
+        if group == 'specialties':
+            known = [bitmaps[v] for v in selected if v in bitmaps]
+            if not known:
+                return None
+            mask = self.universe
+            for bitmap in known:
+                mask &= bitmap
+            return mask
+        known = [v for v in selected if v in bitmaps]
+        # State and control filter even on unknown values (matching nothing), like the SQL
+        if not known and group in ('size', 'selectivity'):
+            return None
+        mask = 0
+        for value in known:
+            mask |= bitmaps[value]
+        return mask
+
+    def evaluate(self, args, search_ids: Optional[Iterable[int]] = None,
+                 near_ids: Optional[Iterable[int]] = None) -> FacetResult:
+        """
+        Counts for every facet value under the /colleges query-string `args`, within the
+        search matches and the proximity radius when given.
+        """
+        base = self.universe
+        for restrict in (search_ids, near_ids):
+            if restrict is not None:
+                base &= self.id_mask(restrict)
+        max_cost = args.get('max_cost', type=float)
+        if max_cost is not None:
+            base &= to_bitmap(self.cost <= max_cost)
+
+        state = args.get('state')
+        selections = {
+            'state': [state] if state else [],
+            'control': args.getlist('control'),
+            'size': args.getlist('size'),
+            'selectivity': args.getlist('selectivity'),
+            'specialties': args.getlist('specialties'),
+        }
+        masks = {
+            group: self._group_mask(group, selected) if selected else None
+            for group, selected in selections.items()
+        }
+
+        everything = base
+        for mask in masks.values():
+            if mask is not None:
+                everything &= mask
+
+        counts = {}
+        for group, bitmaps in self.bitmaps.items():
+            if group in ANY_GROUPS:
+                others = base
+                for other, mask in masks.items():
+                    if other != group and mask is not None:
+                        others &= mask
+            else:
+                others = everything
+            counts[group] = {value: (others & bitmap).bit_count() for value, bitmap in bitmaps.items()}
+        return FacetResult(self, everything, counts)
+
+
+def build_facet_index(version: Optional[str] = None) -> FacetIndex:
+    """Index the current snapshot, or the College table when no snapshot is published."""
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.has_columns(INDEX_COLUMNS):
+        return FacetIndex({c: np.asarray(snapshot[c]) for c in INDEX_COLUMNS}, version=snapshot.version)
+    rows = db.session.query(*[getattr(College, c) for c in INDEX_COLUMNS]).order_by(College.id).all()
+    columns = {}
+    for name, values in zip(INDEX_COLUMNS, zip(*rows) if rows else ([],) * len(INDEX_COLUMNS)):
+        if name == 'state':
+            columns[name] = np.array([v or '' for v in values], dtype=str)
+        elif name == 'id':
+            columns[name] = np.array(values, dtype=np.int64)
+        else:
+            columns[name] = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    return FacetIndex(columns, version=version)
+
+
+_index: Optional[FacetIndex] = None
+_lock = threading.Lock()
+
+
+def get_facet_index() -> FacetIndex:
+    """This worker's facet index, rebuilt when the data version changes."""
+    global _index
+    version = data_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            index = _index
+            if index is None or index.version != version:
+                index = _index = build_facet_index(version)
+    return index
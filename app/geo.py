@@ -0,0 +1,159 @@
+"""
+Proximity search over college locations.
+
+Colleges with coordinates are placed on the unit sphere (x, y, z) and indexed with a KD-tree,
+so a radius or k-nearest query is a logarithmic tree walk on straight-line (chord) distance,
+which orders points exactly like great-circle distance. A home location is either
+"lat,lon" or a ZIP code; a ZIP's centroid is the mean position of the colleges that share
+it (falling back to its 3-digit prefix area).
+
+The index is built from the snapshot (or the College table when none is published) and
+rebuilt when the data version changes.
+"""
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.db import db
+from app.models import College
+from app.snapshot import data_version, get_snapshot
+
+EARTH_RADIUS_MILES = 3958.8
+DEFAULT_RADIUS_MILES = 100
+MAX_RADIUS_MILES = 3000
+
+INDEX_COLUMNS = ['id', 'latitude', 'longitude', 'zip']
+
+_LAT_LON = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+_ZIP = re.compile(r'^\s*(\d{5})(?:-\d{4})?\s*$')
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """(n x 3) positions on the unit sphere for latitudes/longitudes in degrees."""
+    lat, lon = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def miles_to_chord(miles: float) -> float:
+    return 2.0 * np.sin(min(miles, np.pi * EARTH_RADIUS_MILES) / (2.0 * EARTH_RADIUS_MILES))
+
+
+def chord_to_miles(chord) -> np.ndarray:
+    return 2.0 * EARTH_RADIUS_MILES * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+def _to_lat_lon(xyz: np.ndarray) -> Tuple[float, float]:
+    x, y, z = xyz / np.linalg.norm(xyz)
+    return float(np.degrees(np.arcsin(z))), float(np.degrees(np.arctan2(y, x)))
+
+
+class GeoIndex:
+    def __init__(self, ids: np.ndarray, latitude: np.ndarray, longitude: np.ndarray,
+                 zips: np.ndarray, version: Optional[str] = None):
+        self.version = version
+        located = ~(np.isnan(latitude) | np.isnan(longitude))
+        self.ids = np.asarray(ids, dtype=np.int64)[located]
+        self.points = unit_vectors(latitude[located], longitude[located])
+        from sklearn.neighbors import KDTree  # imported on first build (see app/preload.py)
+        self.tree = KDTree(self.points if len(self.points) else np.zeros((0, 3)))
+
+        # ZIP (and ZIP3) centroids from the schools' own ZIP codes
+        self.zip_centroids: Dict[str, Tuple[float, float]] = {}
+        zip_codes = [str(z)[:5] for z in np.asarray(zips)[located]]
+        for width in (3, 5):
+            keys = np.array([z[:width] if len(z) >= width and z[:width].isdigit() else '' for z in zip_codes],
+                            dtype=str)
+            codes, inverse = np.unique(keys, return_inverse=True)
+            sums = np.zeros((len(codes), 3))
+            np.add.at(sums, inverse, self.points)
+            self.zip_centroids.update({code: _to_lat_lon(total) for code, total in zip(codes, sums) if code})
+
+    def locate(self, text: Optional[str]) -> Optional[Tuple[float, float]]:
+        """(lat, lon) for "lat,lon" or a ZIP code, or None if it can't be placed."""
+        if not text:
+            return None
+        match = _LAT_LON.match(text)
+        if match:
+            lat, lon = float(match.group(1)), float(match.group(2))
+            return (lat, lon) if -90 <= lat <= 90 and -180 <= lon <= 180 else None
+        match = _ZIP.match(text)
+        if match:
+            code = match.group(1)
+            return self.zip_centroids.get(code) or self.zip_centroids.get(code[:3])
+        return None
+
+    def within(self, lat: float, lon: float, miles: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids of the colleges within `miles` of (lat, lon) and their distances, nearest first."""
+        if not len(self.ids):
+            return self.ids, np.empty(0)
+        pos, chord = self.tree.query_radius(
+            unit_vectors([lat], [lon]), r=miles_to_chord(miles), return_distance=True, sort_results=True,
+        )
+        return self.ids[pos[0]], chord_to_miles(chord[0])
+
+    def nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids of the `k` colleges nearest to (lat, lon) and their distances, nearest first."""
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return self.ids[:0], np.empty(0)
+        chord, pos = self.tree.query(unit_vectors([lat], [lon]), k=k)
+        return self.ids[pos[0]], chord_to_miles(chord[0])
+
+    def distances(self, lat: float, lon: float, college_ids: Iterable[int]) -> np.ndarray:
+        """Miles from (lat, lon) to each of `college_ids`; NaN where a college has no location."""
+        college_ids = np.asarray(college_ids, dtype=np.int64)
+        out = np.full(len(college_ids), np.nan)
+        if not len(self.ids) or not len(college_ids):
+            return out
+        # self.ids is in id order (snapshot/query order)
+        rows = np.minimum(np.searchsorted(self.ids, college_ids), len(self.ids) - 1)
+        found = self.ids[rows] == college_ids
+        chord = np.linalg.norm(self.points[rows[found]] - unit_vectors([lat], [lon]), axis=1)
+        out[found] = chord_to_miles(chord)
+        return out
+
+
+def build_geo_index(version: Optional[str] = None) -> GeoIndex:
+    """Index the current snapshot, or the College table when no snapshot is published."""
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.has_columns(INDEX_COLUMNS):
+        return GeoIndex(*(np.asarray(snapshot[c]) for c in INDEX_COLUMNS), version=snapshot.version)
+    rows = db.session.query(*[getattr(College, c) for c in INDEX_COLUMNS]).order_by(College.id).all()
+    ids, lat, lon, zips = zip(*rows) if rows else ([],) * 4
+    return GeoIndex(np.array(ids, dtype=np.int64), _float_array(lat), _float_array(lon),
+                    np.array([z or '' for z in zips], dtype=str), version=version)
+
+
+def _float_array(values) -> np.ndarray:
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+_index: Optional[GeoIndex] = None
+_lock = threading.Lock()
+
+
+def get_geo_index() -> GeoIndex:
+    """This worker's geo index, rebuilt when the data version changes."""
+    global _index
+    version = data_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            index = _index
+            if index is None or index.version != version:
+                index = _index = build_geo_index(version)
+    return index
+
+
+def parse_radius(value, default: float = DEFAULT_RADIUS_MILES) -> float:
+    """Radius in miles from a query/form value, clamped to (0, MAX_RADIUS_MILES]."""
+    try:
+        miles = float(value)
+    except (TypeError, ValueError):
+        return default
+    if not np.isfinite(miles) or miles <= 0:
+        return default
+    return min(miles, MAX_RADIUS_MILES)
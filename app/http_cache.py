@@ -0,0 +1,211 @@
+"""
+Conditional GET (ETag / Last-Modified) for pages that only change with the data.
+
+A view decorated with `conditional(...)` names the stamps its output depends on:
+
+    data_stamp        the published College snapshot version (bumped by scripts/load.py)
+    viewer_stamp      who is signed in (the header shows their name)
+    user_lists_stamp  the signed-in user's `lists_updated_at`, bumped by every list mutation
+    list_owner_stamp  the same, for the owner of the list in the URL
+
+The strong ETag is a hash of the stamps, the app release and the request URL, so it is computed
+before the view runs and a matching If-None-Match (or If-Modified-Since) gets a 304 without any
+query or template rendering. Shared pages are `public, max-age=HTTP_CACHE_MAX_AGE` for anonymous
+visitors, so browsers and a fronting cache can reuse them; everything else is
+`private, no-cache`, i.e. always revalidated. Without a snapshot there is no data version and
+the views run as usual.
+
+Per-endpoint counters (`conditional_stats.stats()`) give the 304 hit rate.
+"""
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+from typing import Any, Dict, NamedTuple, Optional
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import update
+from werkzeug.http import is_resource_modified
+
+from app.db import db
+from app.models import CollegeList, User
+from app.snapshot import get_snapshot
+
+DEFAULT_MAX_AGE = 60
+
+
+class Stamp(NamedTuple):
+    tag: str
+    modified: Optional[datetime]  # UTC; None when unknown
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    # SQLite hands back naive datetimes; everything here is stored in UTC
+    return value.replace(tzinfo=dt_timezone.utc) if value.tzinfo is None else value
+
+
+# ---- Stamps (each takes the view's URL arguments)
+
+def data_stamp(**view_args) -> Optional[Stamp]:
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    created_at = snapshot.manifest.get('created_at')
+    return Stamp(f'd{snapshot.version}', _as_utc(datetime.fromisoformat(created_at)) if created_at else None)
+
+
+def viewer_stamp(**view_args) -> Stamp:
+    return Stamp(f'v{current_user.id}' if current_user.is_authenticated else 'v-', None)
+
+
+def _lists_stamp(user_id, updated_at) -> Stamp:
+    updated_at = _as_utc(updated_at)
+    return Stamp(f'l{user_id}:{updated_at.isoformat() if updated_at else 0}', updated_at)
+
+
+def user_lists_stamp(**view_args) -> Optional[Stamp]:
+    if not current_user.is_authenticated:
+        return None
+    # Never cached with the user (app/users.py): loaded here, as any worker may have bumped it
+    return _lists_stamp(current_user.id, current_user.lists_updated_at)
+
+
+def list_owner_stamp(list_id: int, **view_args) -> Optional[Stamp]:
+    row = (
+        db.session.query(CollegeList.user_id, User.lists_updated_at)
+        .outerjoin(User, User.id == CollegeList.user_id)
+        .filter(CollegeList.id == list_id)
+        .first()
+    )
+    # Unknown list: let the view produce its 404
+    return _lists_stamp(*row) if row is not None else None
+
+
+def touch_lists(user_id) -> None:
+    """Bump a user's list stamp (`user_id` may be a scalar subquery); commit with the change."""
+    db.session.execute(
+        update(User).where(User.id == user_id).values(lists_updated_at=datetime.now(dt_timezone.utc))
+    )
+
+
+# ---- Hit-rate counters
+
+class ConditionalStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, outcome: str) -> None:
+        """`outcome` is 'not_modified', 'full' (validators sent) or 'unversioned'."""
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, {'not_modified': 0, 'full': 0, 'unversioned': 0})
+            counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {name: dict(counts) for name, counts in self._counts.items()}
+        for counts in endpoints.values():
+            counts['hit_rate'] = _hit_rate(counts)
+        totals = {k: sum(c[k] for c in endpoints.values()) for k in ('not_modified', 'full', 'unversioned')}
+        totals['hit_rate'] = _hit_rate(totals)
+        return {'endpoints': endpoints, 'total': totals}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+def _hit_rate(counts: Dict[str, int]) -> Optional[float]:
+    served = counts['not_modified'] + counts['full'] + counts['unversioned']
+    return round(counts['not_modified'] / served, 4) if served else None
+
+
+conditional_stats = ConditionalStats()
+
+
+# ---- Decorator
+
+def release_fingerprint(app) -> str:
+    """Stat-based hash of the templates and static files, so a deploy changes every ETag."""
+    digest = hashlib.blake2b(digest_size=8)
+    for folder in (app.template_folder, app.static_folder):
+        root = os.path.join(app.root_path, folder) if folder else None
+        if not root or not os.path.isdir(root):
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                st = os.stat(path)
+                digest.update(f'{os.path.relpath(path, root)}:{st.st_size}:{st.st_mtime_ns};'.encode())
+    return digest.hexdigest()
+
+
+def init_http_cache(app) -> None:
+    app.extensions['http_cache_release'] = app.config.get('HTTP_CACHE_RELEASE') or release_fingerprint(app)
+
+
+def _validators(stamps, view_args):
+    parts = []
+    for stamp in stamps:
+        part = stamp(**view_args)
+        if part is None:
+            return None
+        parts.append(part)
+    key = '|'.join([current_app.extensions.get('http_cache_release', ''), request.full_path]
+                   + [p.tag for p in parts])
+    etag = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    modified = max((p.modified for p in parts if p.modified is not None), default=None)
+    return etag, modified
+
+
+def _cache_headers(response, etag, modified, shared: bool) -> None:
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    if shared:
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config.get('HTTP_CACHE_MAX_AGE', DEFAULT_MAX_AGE)
+    else:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    # Signed-in visitors get a different page (and ETag) from the same URL
+    response.vary.add('Cookie')
+
+
+def conditional(*stamps, shared: bool = False):
+    """
+    Serve GET/HEAD with validators built from `stamps`, answering 304 when they match.
+
+    `shared` pages may be stored by any cache while the visitor is anonymous.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            validators = _validators(stamps, kwargs)
+            if validators is None:
+                conditional_stats.record(request.endpoint, 'unversioned')
+                return view(*args, **kwargs)
+            etag, modified = validators
+            public = shared and not current_user.is_authenticated
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+                conditional_stats.record(request.endpoint, 'not_modified')
+                response = current_app.response_class(status=304)
+                _cache_headers(response, etag, modified, public)
+                return response
+
+            conditional_stats.record(request.endpoint, 'full')
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                # A response that sets a cookie (e.g. a flash) must not land in a shared cache
+                _cache_headers(response, etag, modified, public and not session.modified)
+            return response
+        return wrapper
+    return decorator
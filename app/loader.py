@@ -0,0 +1,440 @@
+"""
+College Scorecard ingest used by `scripts/load.py`.
+
+The bulk path types every column at once with pandas, resolves known `unitid`s with a
+single query and writes inserts/updates in batches (or through COPY + set-based
+UPDATE/INSERT on PostgreSQL), i.e. an upsert keyed on `unitid`.
+
+The streaming path (`load_streaming`) reads the CSV in fixed-size chunks instead, so memory
+stays flat however large the file is. Each mapped row is hashed and only rows whose hash
+differs from `College.content_hash` are written; every chunk is committed and recorded in a
+small progress file, so an interrupted refresh resumes where it stopped.
+
+The original row-at-a-time, insert-only loader is kept as `load_rowwise` for comparison.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.db import db
+from app.models import College
+
+DEFAULT_CSV = "data/final_college_data.csv"
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHUNK_SIZE = 5000
+PROGRESS_SUFFIX = ".progress.json"
+
+# Bound on IN (...) parameters per query; SQLite builds before 3.32 allow 999
+LOOKUP_BATCH_SIZE = 900
+
+# (College attribute, CSV column, type)
+COLUMN_MAP: List[Tuple[str, str, str]] = [
+    ('unitid', 'UNITID', 'int'),
+    ('name', 'INSTNM', 'str'),
+    ('website', 'INSTURL', 'str'),
+    ('net_price_url', 'NPCURL', 'str'),
+    ('city', 'CITY', 'str'),
+    ('state', 'STABBR', 'str'),
+    ('zip', 'ZIP', 'str'),
+    ('latitude', 'LATITUDE', 'float'),
+    ('longitude', 'LONGITUDE', 'float'),
+    ('accrediting_agency', 'ACCREDAGENCY', 'str'),
+    ('school_degree', 'SCH_DEG', 'int'),
+    ('highest_degree', 'HIGHDEG', 'int'),
+    ('predominant_degree', 'PREDDEG', 'int'),
+    ('control', 'CONTROL', 'int'),
+    ('num_branches', 'NUMBRANCH', 'int'),
+    ('is_main_campus', 'MAIN', 'bool'),
+    ('locale', 'LOCALE', 'int'),
+    ('region', 'REGION', 'int'),
+    ('carnegie_basic_class', 'CCBASIC', 'int'),
+    ('carnegie_size_class', 'CCSIZSET', 'int'),
+    ('is_hbcu', 'HBCU', 'bool'),
+    ('is_annhi', 'ANNHI', 'bool'),
+    ('is_tribal', 'HBCU.1', 'bool'),
+    ('is_hsi', 'HSI', 'bool'),
+    ('is_men_only', 'MENONLY', 'bool'),
+    ('is_women_only', 'WOMENONLY', 'bool'),
+    ('cost_of_attendance', 'COSTT4_A', 'float'),
+    ('tuition_in_state', 'TUITIONFEE_IN', 'float'),
+    ('tuition_out_of_state', 'TUITIONFEE_OUT', 'float'),
+    ('median_grad_debt', 'GRAD_DEBT_MDN_SUPP', 'float'),
+    ('median_debt', 'DEBT_MDN', 'float'),
+    ('earnings_income1', 'MD_EARN_WNE_INC1_P11', 'float'),
+    ('earnings_income2', 'MD_EARN_WNE_INC2_P11', 'float'),
+    ('earnings_income3', 'MD_EARN_WNE_INC3_P11', 'float'),
+    ('retention_rate', 'RET_FT4', 'float'),
+    ('retention_rate_part_time', 'RET_PT4', 'float'),
+    ('graduation_rate_150', 'C150_4', 'float'),
+    ('graduation_rate_200', 'C200_4', 'float'),
+    ('graduation_rate_less_than_4', 'C150_L4', 'float'),
+    ('admission_rate', 'ADM_RATE', 'float'),
+    ('sat_avg', 'SAT_AVG', 'float'),
+    ('sat_verbal_25', 'SATVR25', 'float'),
+    ('sat_math_25', 'SATMT25', 'float'),
+    ('act_math_25', 'ACTMT25', 'float'),
+    ('act_composite_25', 'ACTCM25', 'float'),
+    ('undergrad_population', 'UGDS', 'int'),
+    ('pct_white', 'UGDS_WHITE', 'float'),
+    ('pct_black', 'UGDS_BLACK', 'float'),
+    ('pct_hispanic', 'UGDS_HISP', 'float'),
+    ('pct_asian', 'UGDS_ASIAN', 'float'),
+    ('pct_aian', 'UGDS_AIAN', 'float'),
+    ('pct_nhpi', 'UGDS_NHPI', 'float'),
+    ('pct_two_or_more', 'UGDS_2MOR', 'float'),
+    ('pct_unknown', 'UGDS_UNKN', 'float'),
+    ('pct_nonresident_alien', 'UGDS_NRA', 'float'),
+    ('pct_pell', 'PELL_EVER', 'float'),
+    ('avg_faculty_salary', 'AVGFACSAL', 'float'),
+    ('description', 'revised_description', 'str'),
+    ('photo_url', 'wiki_image', 'str'),
+]
+
+FIELDS = [attr for attr, _, _ in COLUMN_MAP]
+# Derived from FIELDS (so not part of the content hash)
+DERIVED_FIELDS = ['short_description']
+STORED_FIELDS = FIELDS + DERIVED_FIELDS + ['content_hash']
+
+SHORT_DESCRIPTION_LENGTH = 365
+_SENTENCE_END = re.compile(r'[.!?](?=\s+[A-Z0-9"\'(]|$)')
+# Words whose trailing period doesn't end a sentence ("St. Louis", "Mt. Holyoke")
+ABBREVIATIONS = {'St', 'Ste', 'Mt', 'Ft', 'Dr', 'Mr', 'Mrs', 'Ms', 'Jr', 'Sr', 'Inc', 'Co', 'No', 'vs', 'Univ'}
+
+TRUTHY = {"1", "1.0", "true", "yes", "y"}
+
+
+# ---- Scalar parsers (row-at-a-time loader)
+
+def parse_bool(value):
+    truthy = {"1", "1.0", "true", "yes", "y", "True", "Yes", "TRUE", "YES"}
+    falsy = {"0", "0.0", "false", "no", "n", "False", "No", "FALSE", "NO", "", "nan"}
+
+    if value is None:
+        return False
+
+    val = str(value).strip().lower()
+
+    if val in truthy:
+        return True
+    elif val in falsy:
+        return False
+
+    return False
+
+
+def parse_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def short_description(text):
+    """First sentence of a description for cards, cut at a word boundary if it's very long."""
+    if not isinstance(text, str) or not text.strip():
+        return None
+    text = ' '.join(text.split())
+    sentence = text
+    for end in _SENTENCE_END.finditer(text):
+        word = text[:end.start()].rsplit(' ', 1)[-1]
+        # Initials and dotted abbreviations ("U.S.", "J. Smith") don't end a sentence either
+        if end.group() == '.' and (word in ABBREVIATIONS or len(word) <= 1 or '.' in word):
+            continue
+        sentence = text[:end.end()]
+        break
+    if len(sentence) > SHORT_DESCRIPTION_LENGTH:
+        sentence = sentence[:SHORT_DESCRIPTION_LENGTH].rsplit(' ', 1)[0].rstrip(',;:') + '...'
+    return sentence
+
+
+# ---- Vectorized typing
+
+def _typed_column(raw: pd.Series, kind: str) -> pd.Series:
+    """One CSV column converted to its model type; missing values become None."""
+    if kind == 'bool':
+        return raw.astype(str).str.strip().str.lower().isin(TRUTHY).astype(object)
+    if kind == 'str':
+        out = raw.astype(object)
+        numeric = out.map(lambda v: isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool))
+        if numeric.any():
+            # ZIPs and the like come back as numbers when the whole column parses
+            out[numeric] = out[numeric].map(lambda v: None if v != v else (str(int(v)) if float(v).is_integer() else str(v)))
+        return out.where(out.notna(), None)
+    values = pd.to_numeric(raw, errors='coerce')
+    if kind == 'int':
+        values = np.trunc(values).astype('Int64')
+    return values.astype(object).where(values.notna(), None)
+
+
+def typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Map a raw Scorecard frame onto College attributes, typing whole columns at once."""
+    out = pd.DataFrame(index=df.index)
+    for attr, source, kind in COLUMN_MAP:
+        raw = df[source] if source in df.columns else pd.Series([None] * len(df), index=df.index)
+        out[attr] = _typed_column(raw, kind)
+    out = out[out['unitid'].notna()]
+    # A unitid appearing twice keeps its last row, like an upsert applied in file order
+    out = out.drop_duplicates(subset='unitid', keep='last')
+    out['short_description'] = out['description'].map(short_description).astype(object)
+    return out
+
+
+def add_hashes(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add `content_hash`: a digest of the row's typed values in `FIELDS` order.
+
+    Values are rendered with `str()` column by column ('None' for NULL, shortest repr for
+    floats), so a row hashes the same however it was read or chunked.
+    """
+    text = frame[FIELDS].astype(str).fillna('None')
+    joined = text[FIELDS[0]].str.cat([text[f] for f in FIELDS[1:]], sep='\x1f')
+    frame['content_hash'] = [
+        hashlib.blake2b(row.encode('utf-8'), digest_size=16).hexdigest() for row in joined
+    ]
+    return frame
+
+
+# ---- Bulk upsert
+
+class LoadSummary:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.resumed_at = 0
+        self.timings: Dict[str, float] = {}
+
+    def timed(self, name: str, started: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    def report(self) -> str:
+        total = sum(self.timings.values())
+        parts = ', '.join(f"{k} {v:.2f}s" for k, v in self.timings.items())
+        resumed = f" (resumed at row {self.resumed_at})" if self.resumed_at else ""
+        return (f"Inserted {self.inserted}, updated {self.updated}, unchanged {self.unchanged}{resumed} "
+                f"in {total:.2f}s ({parts})")
+
+
+def existing_rows(unitids: Optional[List[int]] = None) -> Dict[int, Tuple[int, Optional[str]]]:
+    """unitid -> (id, content_hash) for every College, or only for `unitids`."""
+    query = db.session.query(College.unitid, College.id, College.content_hash)
+    if unitids is None:
+        return {u: (i, h) for u, i, h in query.all()}
+    existing = {}
+    for start in range(0, len(unitids), LOOKUP_BATCH_SIZE):
+        batch = unitids[start:start + LOOKUP_BATCH_SIZE]
+        existing.update({u: (i, h) for u, i, h in query.filter(College.unitid.in_(batch)).all()})
+    return existing
+
+
+def plan_upsert(frame: pd.DataFrame, existing: Dict[int, Tuple[int, Optional[str]]],
+                summary: LoadSummary) -> Tuple[List[dict], List[dict]]:
+    """Split hashed rows into insert and update mappings, counting unchanged rows."""
+    inserts, updates = [], []
+    for values in frame[STORED_FIELDS].itertuples(index=False, name=None):
+        mapping = dict(zip(STORED_FIELDS, values))
+        current = existing.get(mapping['unitid'])
+        if current is None:
+            inserts.append(mapping)
+        elif current[1] == mapping['content_hash']:
+            summary.unchanged += 1
+        else:
+            mapping['id'] = current[0]
+            updates.append(mapping)
+    return inserts, updates
+
+
+def _batches(items: List[dict], size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def write_batches(inserts: List[dict], updates: List[dict], batch_size: int) -> None:
+    # Every mapping carries every field, so each batch is a single executemany
+    insert = College.__table__.insert()
+    for batch in _batches(inserts, batch_size):
+        db.session.execute(insert, batch)
+    for batch in _batches(updates, batch_size):
+        db.session.bulk_update_mappings(College, batch)
+
+
+def copy_upsert(frame: pd.DataFrame, summary: LoadSummary) -> None:
+    """
+    PostgreSQL upsert: COPY into a temp staging table, then one set-based UPDATE for rows
+    whose content hash changed and one INSERT for new unitids.
+    """
+    buf = io.StringIO()
+    frame[STORED_FIELDS].to_csv(buf, index=False, header=False, na_rep='\\N')
+    buf.seek(0)
+
+    cols = ', '.join(STORED_FIELDS)
+    assignments = ', '.join(f"{f} = s.{f}" for f in STORED_FIELDS if f != 'unitid')
+
+    cur = db.session.connection().connection.cursor()
+    try:
+        cur.execute(f"CREATE TEMP TABLE college_stage ON COMMIT DROP AS SELECT {cols} FROM college WITH NO DATA")
+        cur.copy_expert(f"COPY college_stage ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+        cur.execute(f"UPDATE college c SET {assignments} FROM college_stage s "
+                    f"WHERE c.unitid = s.unitid AND c.content_hash IS DISTINCT FROM s.content_hash")
+        summary.updated = cur.rowcount
+        cur.execute(f"INSERT INTO college ({cols}) SELECT {cols} FROM college_stage s "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM college c WHERE c.unitid = s.unitid)")
+        summary.inserted = cur.rowcount
+    finally:
+        cur.close()
+    summary.unchanged = len(frame) - summary.inserted - summary.updated
+
+
+def load_bulk(csv_path: str = DEFAULT_CSV, batch_size: int = DEFAULT_BATCH_SIZE,
+              use_copy: Optional[bool] = None) -> LoadSummary:
+    """
+    Vectorized upsert of a Scorecard CSV keyed on `unitid`. Must run inside an app context.
+
+    `use_copy` defaults to True on PostgreSQL. Returns the counts and per-stage timings.
+    """
+    summary = LoadSummary()
+
+    started = time.perf_counter()
+    frame = add_hashes(typed_frame(pd.read_csv(csv_path, dtype=str)))
+    summary.timed('parse', started)
+
+    if use_copy is None:
+        use_copy = db.engine.dialect.name == 'postgresql'
+
+    started = time.perf_counter()
+    if use_copy:
+        copy_upsert(frame, summary)
+        summary.timed('copy', started)
+    else:
+        inserts, updates = plan_upsert(frame, existing_rows(), summary)
+        summary.timed('diff', started)
+        started = time.perf_counter()
+        write_batches(inserts, updates, batch_size)
+        summary.inserted, summary.updated = len(inserts), len(updates)
+        summary.timed('write', started)
+
+    started = time.perf_counter()
+    db.session.commit()
+    summary.timed('commit', started)
+    return summary
+
+
+# ---- Streaming refresh
+
+def _source_info(csv_path: str) -> dict:
+    st = os.stat(csv_path)
+    return {'csv': os.path.abspath(csv_path), 'size': st.st_size, 'mtime': st.st_mtime}
+
+
+def read_progress(progress_path: str, source: dict) -> Optional[dict]:
+    """Saved progress for this exact file, or None (missing, unreadable or a different file)."""
+    try:
+        with open(progress_path) as fh:
+            progress = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if any(progress.get(k) != v for k, v in source.items()):
+        return None
+    return progress
+
+
+def write_progress(progress_path: str, source: dict, rows: int, summary: LoadSummary) -> None:
+    progress = dict(source, rows=rows, inserted=summary.inserted,
+                    updated=summary.updated, unchanged=summary.unchanged)
+    directory = os.path.dirname(os.path.abspath(progress_path))
+    fd, tmp = tempfile.mkstemp(prefix='.progress-', dir=directory)
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(progress, fh)
+    os.replace(tmp, progress_path)
+
+
+def load_streaming(csv_path: str = DEFAULT_CSV, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   batch_size: int = DEFAULT_BATCH_SIZE,
+                   progress_path: Optional[str] = None) -> LoadSummary:
+    """
+    Chunked, change-detecting upsert keyed on `unitid`. Must run inside an app context.
+
+    - reads `chunk_size` CSV rows at a time (all as text, so typing doesn't depend on
+      which rows share a chunk)
+    - writes only new rows and rows whose content hash changed
+    - commits each chunk and records the rows done in `progress_path`
+      (default `<csv_path>.progress.json`); a rerun on the same file skips those rows
+    - removes the progress file once the whole file is loaded
+    """
+    progress_path = progress_path or csv_path + PROGRESS_SUFFIX
+    source = _source_info(csv_path)
+    summary = LoadSummary()
+
+    done = 0
+    progress = read_progress(progress_path, source)
+    if progress is not None:
+        done = summary.resumed_at = progress['rows']
+        summary.inserted, summary.updated, summary.unchanged = (
+            progress['inserted'], progress['updated'], progress['unchanged'])
+
+    reader = pd.read_csv(csv_path, dtype=str, chunksize=chunk_size,
+                         skiprows=range(1, done + 1) if done else None)
+    started = time.perf_counter()
+    for chunk in reader:
+        frame = add_hashes(typed_frame(chunk))
+        summary.timed('parse', started)
+
+        started = time.perf_counter()
+        existing = existing_rows([int(u) for u in frame['unitid']])
+        inserts, updates = plan_upsert(frame, existing, summary)
+        summary.timed('diff', started)
+
+        started = time.perf_counter()
+        write_batches(inserts, updates, batch_size)
+        db.session.commit()
+        summary.inserted += len(inserts)
+        summary.updated += len(updates)
+        summary.timed('write', started)
+
+        done += len(chunk)
+        write_progress(progress_path, source, done, summary)
+        started = time.perf_counter()
+
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    return summary
+
+
+# ---- Original loader
+
+def load_rowwise(csv_path: str = DEFAULT_CSV) -> LoadSummary:
+    """Row-at-a-time, insert-only load (existing unitids are skipped, never updated)."""
+    summary = LoadSummary()
+    started = time.perf_counter()
+    df = pd.read_csv(csv_path, low_memory=False)
+    parsers = {'int': parse_int, 'float': parse_float, 'bool': parse_bool, 'str': lambda v: v}
+
+    for _, row in df.iterrows():
+        if College.query.filter_by(unitid=row["UNITID"]).first():
+            summary.unchanged += 1
+            continue
+        college = College(**{
+            attr: parsers[kind](row[source]) for attr, source, kind in COLUMN_MAP
+        })
+        college.short_description = short_description(college.description)
+        db.session.add(college)
+        summary.inserted += 1
+
+    db.session.commit()
+    summary.timed('load', started)
+    return summary
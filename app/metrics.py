@@ -0,0 +1,312 @@
+"""
+Request, SQL and recommender-stage metrics, exported in Prometheus text format at /metrics.
+
+    http_request_duration_seconds{endpoint,method,status}   request latency histogram
+    db_queries_per_request{endpoint}                        SQL statements per request
+    db_time_per_request_seconds{endpoint}                   SQL time per request
+    db_query_duration_seconds                               individual statement latency
+    recommender_stage_seconds{stage}                        named stages of one ranking
+
+SQL is timed through SQLAlchemy cursor events on every engine. Recommender stages are
+`stage(name)` blocks; they only count inside `recording_stages()` (the top of a ranking), so
+the same helpers called from elsewhere (e.g. the similar-schools build) don't add samples.
+Stage timings from the recommendation pool's processes are shipped back with each result
+and recorded here.
+
+Every web worker keeps its own metrics; a scrape sees the worker that answered it.
+
+A single request can also be profiled: with `METRICS_PROFILE_TOKEN` set, a request carrying
+`X-Profile: <token>` has its thread's stack sampled every `METRICS_PROFILE_INTERVAL` ms while
+the view runs. The collapsed stacks (flamegraph.pl / speedscope "folded" format) are kept in
+memory and the response's `X-Profile-Id` names them at /metrics/profiles/<id>.
+"""
+import hmac
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+PROFILE_HEADER = 'X-Profile'
+# Profiles kept for /metrics/profiles/<id> (the oldest is dropped first)
+PROFILES_KEPT = 20
+PROFILE_MAX_DEPTH = 128
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination."""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [bucket counts..., sum, count]
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def expose(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="' + _format_number(bound) + '"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}')
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {values[-2]!r}')
+            lines.append(f'{self.name}_count{labels} {values[-1]}')
+        return lines
+
+
+request_latency = Histogram(
+    'http_request_duration_seconds', 'Time to produce a response (streamed bodies excluded).',
+    ['endpoint', 'method', 'status'])
+request_queries = Histogram(
+    'db_queries_per_request', 'SQL statements executed while handling one request.',
+    ['endpoint'], QUERY_COUNT_BUCKETS)
+request_sql_time = Histogram(
+    'db_time_per_request_seconds', 'Time spent in SQL statements while handling one request.',
+    ['endpoint'])
+query_latency = Histogram(
+    'db_query_duration_seconds', 'Latency of individual SQL statements.', (), QUERY_LATENCY_BUCKETS)
+stage_latency = Histogram(
+    'recommender_stage_seconds', 'Time spent in each named stage of one recommender ranking.',
+    ['stage'], STAGE_BUCKETS)
+
+REGISTRY = [request_latency, request_queries, request_sql_time, query_latency, stage_latency]
+
+
+def render() -> str:
+    """Every metric in Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+
+# ---- Recommender stages
+
+_stage_samples: ContextVar[Optional[list]] = ContextVar('stage_samples', default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the block as stage `name` of the ranking being recorded (no-op outside one)."""
+    samples = _stage_samples.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if samples is not None:
+            samples.append((name, time.perf_counter() - started))
+
+
+def observe_stages(samples: Iterable[Tuple[str, float]]) -> None:
+    for name, seconds in samples:
+        stage_latency.observe(seconds, name)
+
+
+@contextmanager
+def recording_stages():
+    """Record the `stage` blocks run inside this one (nested uses defer to the outermost)."""
+    if _stage_samples.get() is not None:
+        yield
+        return
+    samples: list = []
+    token = _stage_samples.set(samples)
+    try:
+        yield
+    finally:
+        _stage_samples.reset(token)
+        observe_stages(samples)
+
+
+def call_collecting_stages(fn, *args, **kwargs):
+    """`(fn(*args, **kwargs), stage samples)`, for work run in another process."""
+    samples: list = []
+    token = _stage_samples.set(samples)
+    try:
+        return fn(*args, **kwargs), samples
+    finally:
+        _stage_samples.reset(token)
+
+
+# ---- SQL
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_query_started')
+    if not started:
+        return
+    took = time.perf_counter() - started.pop()
+    query_latency.observe(took)
+    timing = g.get('_metrics') if has_request_context() else None
+    if timing is not None:
+        timing['queries'] += 1
+        timing['sql_seconds'] += took
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    started = context.connection.info.get('metrics_query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_sql() -> None:
+    for name, fn in (('before_cursor_execute', _before_cursor_execute),
+                     ('after_cursor_execute', _after_cursor_execute),
+                     ('handle_error', _handle_error)):
+        if not event.contains(Engine, name, fn):
+            event.listen(Engine, name, fn)
+
+
+# ---- Sampling profiler
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every `interval` seconds from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self) -> 'SamplingProfiler':
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self._stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> str:
+        """Stop sampling; the collapsed stacks, most frequent first."""
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.most_common())
+
+
+_profiles: 'deque[Tuple[str, str]]' = deque(maxlen=PROFILES_KEPT)
+_profiles_lock = threading.Lock()
+
+
+def get_profile(profile_id: str) -> Optional[str]:
+    with _profiles_lock:
+        for pid, folded in _profiles:
+            if pid == profile_id:
+                return folded
+    return None
+
+
+def _wants_profile(app) -> bool:
+    token = app.config.get('METRICS_PROFILE_TOKEN')
+    given = request.headers.get(PROFILE_HEADER)
+    return bool(token and given and hmac.compare_digest(given.encode(), token.encode()))
+
+
+# ---- Request hooks
+
+def _endpoint() -> str:
+    return request.endpoint or 'unmatched'
+
+
+def init_metrics(app) -> None:
+    """Time every request and its SQL, and answer profiling requests."""
+    instrument_sql()
+    interval = app.config.get('METRICS_PROFILE_INTERVAL', 5) / 1000
+
+    @app.before_request
+    def _start_request_metrics():
+        g._metrics = {'started': time.perf_counter(), 'queries': 0, 'sql_seconds': 0.0}
+        if _wants_profile(app):
+            g._profiler = SamplingProfiler(threading.get_ident(), interval).start()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        timing = g.pop('_metrics', None)
+        if timing is None:
+            return response
+        endpoint = _endpoint()
+        request_latency.observe(time.perf_counter() - timing['started'], endpoint, request.method,
+                                str(response.status_code))
+        request_queries.observe(timing['queries'], endpoint)
+        request_sql_time.observe(timing['sql_seconds'], endpoint)
+
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            folded = profiler.stop()
+            profile_id = uuid.uuid4().hex[:12]
+            with _profiles_lock:
+                _profiles.append((profile_id, folded))
+            response.headers['X-Profile-Id'] = profile_id
+            response.headers['X-Profile-Samples'] = str(profiler.samples)
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(exc):
+        # Only left over when no response was produced
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.stop()
@@ -0,0 +1,182 @@
+"""
+Recommendation work off the request thread.
+
+Ranking runs in a small pool of worker processes (`RECOMMENDATION_WORKERS`), so numpy/pandas
+work never holds the web worker's GIL and at most that many rankings burn CPU at once, no
+matter how many submissions arrive. Each pool process builds its own app and keeps its own
+population/result caches between tasks.
+
+    - Identical in-flight requests (same canonical request key) share one computation.
+    - At most `workers + RECOMMENDATION_QUEUE_DEPTH` distinct computations are in flight, and
+      as many request threads wait on the pool (coalesced ones included); beyond that
+      `RecommenderBusy` is raised at once (the routes answer 503 + Retry-After) instead of
+      queueing more work, or more waiting threads, behind the burst.
+    - A caller waits at most `RECOMMENDATION_TIMEOUT` seconds (`RecommenderTimeout`); the
+      computation still finishes and lands in the caches for the retry.
+
+Results are also stored in this process's `result_cache` (before the in-flight entry is
+released, so a late duplicate finds one or the other), and a repeat skips the pool. The
+recommender's stage timings come back with each result and go into this process's metrics.
+`RECOMMENDATION_WORKERS=0` runs everything inline, as before.
+
+The pool, its coalescing and its limits belong to one web worker process, and a waiting request
+holds its thread. So web workers must be threaded: `gunicorn.conf.py` runs gthread workers with
+more threads than can wait here, which leaves threads serving pages while the pool is
+saturated. With sync workers each process only ever has one request, so nothing coalesces, the
+503 never triggers and a waiting worker serves nothing else for up to the timeout.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Hashable, List, Optional
+
+from app.cache import TTLCache
+from app.metrics import call_collecting_stages, observe_stages
+from app.ml.recommendations import (
+    canonical_request,
+    recommend_batch,
+    recommend_cached,
+    request_key,
+    result_cache,
+)
+from app.snapshot import data_version
+
+RETRY_AFTER_SECONDS = 5
+
+_MISSING = object()
+
+
+class RecommenderBusy(Exception):
+    """The pool is saturated; try again shortly."""
+
+
+class RecommenderTimeout(Exception):
+    """The computation didn't finish within the request timeout."""
+
+
+def _init_worker() -> None:
+    # Pool processes are spawned fresh: give each its own app (DB engine, snapshot store)
+    from app import create_app
+    create_app().app_context().push()
+
+
+class RecommendationPool:
+    def __init__(self, workers: int = 2, queue_depth: int = 8, timeout: float = 20.0):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Hashable, Future] = {}
+        self._waiting = 0
+        self._lock = threading.RLock()
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.broken = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use, i.e. in the serving process rather than a preloading parent
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def _reset(self) -> None:
+        with self._lock:
+            self.broken += 1
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._inflight.clear()
+
+    def _done(self, key: Hashable, future: Future, cache: Optional[TTLCache]) -> None:
+        with self._lock:
+            if not future.cancelled() and future.exception() is None:
+                result, samples = future.result()
+                observe_stages(samples)
+                if cache is not None:
+                    cache.set(key, result)
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def run(self, key: Optional[Hashable], fn, *args, cache: Optional[TTLCache] = None, **kwargs) -> Any:
+        """
+        `fn(*args, **kwargs)` in a pool process, joined with an in-flight call of the same
+        `key` (None never coalesces). With `cache`, a cached value for `key` is returned
+        instead and the result is stored there. Exceptions raised by `fn` propagate.
+        """
+        if self.workers <= 0:
+            return fn(*args, **kwargs)
+        with self._lock:
+            if cache is not None and key is not None:
+                cached = cache.get(key, _MISSING)
+                if cached is not _MISSING:
+                    return cached
+            if self._waiting >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise RecommenderBusy()
+            future = self._inflight.get(key) if key is not None else None
+            if future is not None:
+                self.coalesced += 1
+            else:
+                if len(self._inflight) >= self.workers + self.queue_depth:
+                    self.rejected += 1
+                    raise RecommenderBusy()
+                try:
+                    future = self._get_executor().submit(call_collecting_stages, fn, *args, **kwargs)
+                except BrokenProcessPool:
+                    self._reset()
+                    raise RecommenderBusy()
+                self.submitted += 1
+                slot = key if key is not None else object()
+                self._inflight[slot] = future
+                future.add_done_callback(lambda f, slot=slot: self._done(slot, f, cache))
+            self._waiting += 1
+        try:
+            return future.result(timeout=self.timeout)[0]
+        except FuturesTimeout:
+            with self._lock:
+                self.timeouts += 1
+            raise RecommenderTimeout()
+        except BrokenProcessPool:
+            self._reset()
+            raise RecommenderBusy()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'timeout': self.timeout,
+            'in_flight': len(self._inflight),
+            'waiting': self._waiting,
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'broken': self.broken,
+        }
+
+
+# One pool per web worker process; sized from config in create_app
+recommendation_pool = RecommendationPool()
+
+
+def recommend_pooled(top_n: int = 12, **params) -> List[Dict[str, Any]]:
+    """`recommend_cached` through the pool, coalesced on the canonical request key."""
+    params = canonical_request(**params)
+    result_cache.bind_version(data_version())
+    return recommendation_pool.run(request_key(params, top_n), recommend_cached, top_n,
+                                   cache=result_cache, **params)
+
+
+def recommend_batch_pooled(profiles: List[Dict[str, Any]], top_n: int = 12) -> List[Dict[str, Any]]:
+    """`recommend_batch` in a pool process (batches aren't coalesced)."""
+    return recommendation_pool.run(None, recommend_batch, profiles, top_n)
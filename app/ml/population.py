@@ -0,0 +1,302 @@
+"""
+Filter populations for the recommender.
+
+A `FeaturePopulation` is everything about a set of schools (the rows selected by the
+`states`/`user_cost` filters) that doesn't depend on the student: meta columns, the
+normalized matrix for every candidate scoring feature, per-feature coverage and the
+SAT/ACT/GPA band bounds. Ranking for a given set of weights is then just bucket means,
+one weighted sum and a partial top-N, so a population can be kept around and re-ranked
+cheaply (live slider updates, batch scoring).
+
+Features are normalized column by column, so normalizing all candidates up front gives
+the same values as normalizing only the ones a particular weighting ends up using.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.db import db
+from app.geo import get_geo_index
+from app.metrics import stage
+from app.models import College
+from app.snapshot import Snapshot, get_snapshot
+from app.ml.stats import population_stats
+from app.ml.scoring import (
+    COST_COL,
+    DEFAULT_FEATURES,
+    FEATURE_MAP,
+    band_bounds,
+    band_columns,
+    band_fit,
+    bucket_matrix,
+    coerce_column,
+    coverage,
+    fit_score,
+    inverted_features,
+    keep_by_coverage,
+    nan_mean,
+    normalize,
+    resolve_bands,
+    resolve_weights,
+    select_features,
+    to_matrix,
+    top_n as select_top_n,
+    weighted_scores,
+)
+
+META_COLS = ['name', 'city', 'state', 'unitid']
+
+# Proximity falls from 1 at home to 0 at this distance (or at the radius, when one is given)
+DISTANCE_SCALE_MILES = 500.0
+
+
+def college_columns() -> List[str]:
+    """Column names available on the College table."""
+    return list(College.__table__.columns.keys())
+
+
+def candidate_features(available: List[str]) -> List[str]:
+    """Every column some weighting could score on."""
+    cols = list(DEFAULT_FEATURES)
+    for feats in FEATURE_MAP.values():
+        cols.extend(feats)
+    available = set(available)
+    return [c for c in dict.fromkeys(cols) if c in available]
+
+
+def college_columns_query(columns: List[str], states: Optional[List[str]] = None,
+                          user_cost: Optional[int] = None):
+    """
+    DB query for the requested College columns over the filtered population.
+
+    Rows come back in id order, like the snapshot, so ties rank the same either way
+    whichever index the database picks.
+    """
+    query = db.session.query(*[getattr(College, c) for c in columns])
+    if states:
+        query = query.filter(College.state.in_(states))
+    if user_cost is not None:
+        query = query.filter(getattr(College, COST_COL) <= user_cost)
+    return query.order_by(College.id)
+
+
+def load_college_columns(
+    columns: List[str],
+    states: Optional[List[str]] = None,
+    user_cost: Optional[int] = None,
+    snapshot: Optional[Snapshot] = None,
+) -> Dict[str, list]:
+    """
+    Fetch only the requested College columns for the filtered population, column-wise.
+
+    Reads from `snapshot` when given (and complete), otherwise from the DB.
+    """
+    if snapshot is not None and snapshot.has_columns(columns):
+        rows = snapshot.select(states, user_cost)
+        return {c: snapshot[c][rows] for c in columns}
+
+    rows = college_columns_query(columns, states, user_cost).all()
+    if not rows:
+        return {c: [] for c in columns}
+    return {c: list(values) for c, values in zip(columns, zip(*rows))}
+
+
+class Ranking(NamedTuple):
+    bucket_names: List[str]
+    buckets: np.ndarray   # rows x buckets
+    overall: np.ndarray   # rows
+    picked: np.ndarray    # row positions of the top N, best first
+
+
+class Nearness(NamedTuple):
+    scores: np.ndarray            # rows; proximity in [0, 1], NaN without a location
+    within: Optional[np.ndarray]  # rows; inside the radius (None when there's no radius)
+
+
+class TopRows(NamedTuple):
+    bucket_names: List[str]
+    picked: np.ndarray     # row positions, best first
+    subscores: np.ndarray  # len(picked) x buckets
+    scores: np.ndarray     # len(picked)
+
+
+class FeaturePopulation:
+    """Student-independent scoring inputs for one filtered set of schools."""
+
+    def __init__(self, data: Dict[str, list], meta_cols: List[str], columns: List[str],
+                 norm: np.ndarray, usable: np.ndarray, cov: np.ndarray,
+                 bounds: Dict[str, tuple]):
+        self.data = data
+        self.meta_cols = meta_cols
+        self.columns = columns
+        self.norm = norm
+        self.usable = usable
+        self.coverage = cov
+        self.bounds = bounds
+        self._position = {c: j for j, c in enumerate(columns)}
+        self._bucket_memo: Dict[tuple, tuple] = {}
+
+    @property
+    def rows(self) -> int:
+        return self.norm.shape[0]
+
+    def fit(self, user_sat=None, user_act=None, user_gpa=None) -> Optional[np.ndarray]:
+        """Academic fit per school for one student, None if nothing could be scored."""
+        return fit_score({'sat': user_sat, 'act': user_act, 'gpa': user_gpa}, self.bounds)
+
+    def nearness(self, home: Tuple[float, float], radius_miles: Optional[float] = None) -> Nearness:
+        """Proximity of every school to `home` (lat, lon), and the radius mask if one is given."""
+        miles = get_geo_index().distances(*home, self.data['id'])
+        scale = radius_miles or DISTANCE_SCALE_MILES
+        scores = np.clip(1.0 - miles / scale, 0.0, 1.0)
+        within = None
+        if radius_miles:
+            with np.errstate(invalid='ignore'):
+                within = miles <= radius_miles
+        return Nearness(scores, within)
+
+    def scored_columns(self, user_priorities: Optional[Dict[str, float]]) -> List[str]:
+        """Features a weighting scores on, after the coverage and all-NaN drops."""
+        feats = select_features(user_priorities, self.columns)
+        if not feats:
+            raise ValueError("No usable features found in the dataset. Check your columns/dataset.")
+        keep = keep_by_coverage(feats, self.coverage[[self._position[f] for f in feats]])
+        cols = [f for f in keep if self.usable[self._position[f]]]
+        if not cols:
+            raise ValueError('No usable numeric features after NA handling. Consider loosening coverage threshold or priorities.')
+        return cols
+
+    def bucket_scores(self, user_priorities: Optional[Dict[str, float]], fit: Optional[np.ndarray],
+                      near: Optional[Nearness] = None):
+        """
+        Bucket names and the (rows x buckets) score matrix, followed by 'fit' and 'distance'
+        when present.
+        """
+        cols = tuple(self.scored_columns(user_priorities))
+        memo = self._bucket_memo.get(cols)
+        if memo is None:
+            # Only a handful of column sets exist, so re-ranks reuse the bucket means
+            memo = bucket_matrix(self.norm[:, [self._position[c] for c in cols]], list(cols))
+            self._bucket_memo[cols] = memo
+        names, buckets = list(memo[0]), memo[1]
+        if fit is not None:
+            names.append('fit')
+            buckets = np.column_stack([buckets, fit])
+        if near is not None:
+            names.append('distance')
+            buckets = np.column_stack([buckets, near.scores])
+        return names, buckets
+
+    def rank(self, user_priorities: Optional[Dict[str, float]], fit: Optional[np.ndarray], top_n: int,
+             near: Optional[Nearness] = None) -> Ranking:
+        """Score and pick the top N; with a radius in `near`, only schools inside it are picked."""
+        with stage('score'):
+            names, buckets = self.bucket_scores(user_priorities, fit, near)
+            overall = weighted_scores(buckets, resolve_weights(user_priorities, names))
+        with stage('select'):
+            if near is not None and near.within is not None:
+                candidates = np.flatnonzero(near.within)
+                picked = candidates[select_top_n(overall[candidates], top_n)]
+            else:
+                picked = select_top_n(overall, top_n)
+        return Ranking(names, buckets, overall, picked)
+
+    # ---- Many students at once
+
+    def fit_matrix(self, scores: Sequence[Dict[str, Optional[float]]]) -> np.ndarray:
+        """
+        Academic fit for many students as a (rows x students) matrix.
+
+        Same values as calling `fit` per student; a column is all-NaN when that student's
+        fit couldn't be scored (where `fit` would return None).
+        """
+        components = []
+        for test, (lo, hi) in self.bounds.items():
+            user = np.array([np.nan if s.get(test) is None else s[test] for s in scores], dtype=np.float64)
+            if np.isnan(user).all():
+                continue
+            comp = band_fit(user[None, :], lo[:, None], hi[:, None])
+            # Students who didn't give this score contribute no component at all
+            components.append(np.where(np.isnan(user)[None, :], np.nan, comp))
+        if not components:
+            return np.full((self.rows, len(scores)), np.nan)
+        return nan_mean(np.stack(components))
+
+    def rank_many(self, priorities: Sequence[Optional[Dict[str, float]]], fits: np.ndarray,
+                  top_n: int) -> List[Union['TopRows', ValueError]]:
+        """
+        Rank many students on this population with 2-D array operations.
+
+        `fits` is the (rows x students) matrix from `fit_matrix`. Students that share the same
+        scored columns and fit presence are scored together with one matrix product; the
+        result per student is a `TopRows`, or the ValueError a single ranking would raise.
+        """
+        has_fit = ~np.isnan(fits).all(axis=0) if fits.size else np.zeros(len(priorities), dtype=bool)
+        results: List[Union[TopRows, ValueError]] = [None] * len(priorities)
+        groups: Dict[tuple, List[int]] = {}
+        for j, prio in enumerate(priorities):
+            try:
+                cols = tuple(self.scored_columns(prio))
+            except ValueError as e:
+                results[j] = e
+                continue
+            groups.setdefault((cols, bool(has_fit[j])), []).append(j)
+
+        for (cols, with_fit), members in groups.items():
+            names, buckets = self.bucket_scores(priorities[members[0]], None)
+            all_names = names + ['fit'] if with_fit else names
+            weights = np.column_stack([resolve_weights(priorities[j], all_names) for j in members])
+            if with_fit:
+                overall = weighted_scores(buckets, weights[:-1], fits[:, members], weights[-1])
+            else:
+                overall = weighted_scores(buckets, weights)
+            for col, j in enumerate(members):
+                picked = select_top_n(overall[:, col], top_n)
+                sub = buckets[picked]
+                if with_fit:
+                    sub = np.column_stack([sub, fits[picked, j]])
+                results[j] = TopRows(all_names, picked, sub, overall[picked, col])
+        return results
+
+
+def load_population(
+    states: Optional[List[str]] = None,
+    user_cost: Optional[int] = None,
+    prefer_selectivity: bool = True,
+) -> FeaturePopulation:
+    """Load and normalize every candidate feature for the population the filters select."""
+    available = college_columns()
+    feats = candidate_features(available)
+    bands = resolve_bands(available)
+    meta_cols = [c for c in META_COLS if c in available]
+    band_cols = band_columns(bands)
+    load_cols = list(dict.fromkeys(['id'] + meta_cols + feats + band_cols))
+
+    # ---- Load data from the shared snapshot (or the DB if none is published)
+    snapshot = get_snapshot()
+    if snapshot is not None and not snapshot.has_columns(load_cols):
+        snapshot = None
+    with stage('load'):
+        data = load_college_columns(load_cols, states, user_cost, snapshot)
+    if not len(data['id']):
+        raise ValueError("No schools match the selected filters. Try broadening your search.")
+
+    # ---- Population statistics: precomputed per state for uncapped requests, else computed here
+    stats = None
+    pop = population_stats(snapshot) if user_cost is None else None
+    if pop is not None and pop.has_columns(feats):
+        stats = pop.lookup(states, feats)
+
+    # ---- Winsorize, impute, scale and flip directional features in one pass
+    with stage('matrix'):
+        x = to_matrix([data[f] for f in feats])
+    invert = inverted_features(prefer_selectivity)
+    norm, usable = normalize(x, np.array([f in invert for f in feats], dtype=bool), stats)
+
+    # ---- SAT/ACT/GPA bands for fit scoring, independent of normalization
+    with stage('bands'):
+        band_values = {c: coerce_column(data[c]) for c in band_cols}
+        bounds = {test: band_bounds(band_values, band) for test, band in bands.items()}
+
+    meta = {c: data[c] for c in ['id'] + meta_cols}
+    return FeaturePopulation(meta, meta_cols, feats, norm, usable, coverage(x, stats), bounds)
@@ -1,9 +1,23 @@
-from typing import List, Optional, Dict
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Dict, Sequence, Tuple
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from app.models import College
-from app.db import db
+from app.cache import TTLCache
+from app.snapshot import data_version
+from app.geo import get_geo_index, parse_radius
+from app.metrics import recording_stages, stage
+from app.ml.population import FeaturePopulation, Nearness, Ranking, load_population
+from app.ml.scoring import IGNORED_PRIORITIES
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported where a frame is built (see app/preload.py)
+
+# Uppercase Scorecard aliases the templates still read
+META_ALIASES = {'name': 'INSTNM', 'city': 'CITY', 'state': 'STABBR', 'unitid': 'UNITID'}
+
+# Top-N results per canonical request, per worker; sized from config in create_app
+result_cache = TTLCache(maxsize=512, ttl=600)
+
+# Populations plus student fit, kept for live re-weighting; sized from config in create_app
+profile_cache = TTLCache(maxsize=64, ttl=900)
 
 
 def recommend_colleges_filtered(
@@ -16,7 +30,10 @@ def recommend_colleges_filtered(
     user_cost: Optional[int] = None,
     top_n: int = 10,
     prefer_selectivity: bool = True,  # if True, lower admission_rate => higher score
-) -> pd.DataFrame:
+    home: Optional[Tuple[float, float]] = None,
+    home_zip: Optional[str] = None,
+    radius_miles: Optional[float] = None,
+) -> 'pd.DataFrame':
     """
     College recommender with key improvements:
       - Robust NA handling with low-coverage feature drop (keeps SAT/ACT/GPA columns for fit scoring).
@@ -25,240 +42,307 @@ def recommend_colleges_filtered(
       - Explicit direction handling: cost metrics are inverted; admissions rate inversion is controlled by `prefer_selectivity`.
       - Academic fit score (SAT/ACT/GPA bands) is added as its own bucket when user scores are provided.
       - Row-wise, NaN-safe weighted average across buckets (missing buckets don't poison the overall score).
+      - Optional distance bucket from a home location (`home` as (lat, lon), or `home_zip`), with
+        `radius_miles` limiting picks to schools inside the radius.
+
+    All numeric work runs on a single float matrix (see `app.ml.scoring`), and the top N
+    are picked with a partial selection instead of sorting every school. Each stage (load,
+    matrix, winsorize, scale, bands, fit, score, select, result) is timed for `/metrics`.
 
     Returns the top-N schools with overall score and per-bucket subscores for explainability.
     """
+    with recording_stages():
+        population = load_population(states, user_cost, prefer_selectivity)
+        with stage('fit'):
+            fit = population.fit(user_sat, user_act, user_gpa)
+            near = nearness(population, home, home_zip, radius_miles)
+        ranking = population.rank(user_priorities, fit, top_n, near)
+        with stage('result'):
+            return ranked_frame(population, ranking)
+
+
+def nearness(population: FeaturePopulation, home: Optional[Tuple[float, float]] = None,
+             home_zip: Optional[str] = None, radius_miles: Optional[float] = None) -> Optional[Nearness]:
+    """Distance bucket for a home location (coordinates win over a ZIP), None without one."""
+    if home is None and home_zip:
+        home = get_geo_index().locate(home_zip)
+        if home is None:
+            raise ValueError(f"Couldn't find a location for ZIP code {home_zip}.")
+    if home is None:
+        return None
+    return population.nearness(tuple(home), radius_miles)
+
+
+def ranked_frame(population: FeaturePopulation, ranking: Ranking) -> 'pd.DataFrame':
+    """Result frame for a ranking, raising if nothing could be ranked."""
+    picked = ranking.picked
+    if not len(picked):
+        raise ValueError("No schools match the criteria after ranking. Try broadening filters.")
+    return build_result_frame(
+        population.data, population.meta_cols,
+        ranking.bucket_names, ranking.buckets[picked], ranking.overall[picked], picked,
+    )
 
-    # ---- Column mappings (prefer your DB's lowercase schema)
-    cost_col = 'cost_of_attendance'
-    feature_map = {
-        'academics': ['retention_rate_ft', 'graduation_rate_150'],
-        'admissions': ['admission_rate'],
-        'cost': [cost_col, 'median_debt'],
-        'faculty': ['avg_faculty_salary'],
-        'diversity': ['diversity_score'],
-        'location': ['urbanicity_score'],
-        'prestige': ['admission_rate'],  # Lower admission rate = higher prestige
-    }
-
-    # SAT/ACT/GPA columns we want to keep for fit scoring (do not drop for coverage)
-    sat_act_gpa_cols = [
-        'sat_avg',
-        'sat_verbal_25', 'sat_verbal_75',
-        'sat_math_25', 'sat_math_75',
-        'act_composite_25', 'act_composite_75',
-        'act_math_25', 'act_math_75',
-        'gpa25', 'gpa75',
-        # add more if your DB has different spellings
-        # legacy/uppercase variants (handled in logic below too):
-        'ACTCM25', 'ACTCM75', 'ACTCMMID', 'GPA25', 'GPA75'
-    ]
 
-    # Columns where lower is better (we might add 'admission_rate' below)
-    invert_after_norm = {cost_col, 'median_debt'}
-    if prefer_selectivity:
-        invert_after_norm.add('admission_rate')
+def build_result_frame(
+    data: Dict[str, list],
+    meta_cols: List[str],
+    bucket_names: List[str],
+    subscores: np.ndarray,
+    scores: np.ndarray,
+    picked: np.ndarray,
+) -> 'pd.DataFrame':
+    """
+    Assemble the ranked rows with meta columns, compatibility aliases and subscores.
 
-    # ---- Load data from DB
-    query = College.query
-    if states:
-        query = query.filter(College.state.in_(states))
-    if user_cost is not None:
-        query = query.filter(getattr(College, cost_col) <= user_cost)
+    `picked` are row positions into `data`; `subscores` and `scores` are already restricted
+    to those rows, in the same order.
+    """
+    out = {m: np.asarray(data[m])[picked].tolist() for m in meta_cols}
+    for m in meta_cols:
+        out[META_ALIASES[m]] = out[m]
+    out['id'] = np.asarray(data['id'])[picked].tolist()
+    for k in sorted(bucket_names):
+        out[f"score_{k}"] = subscores[:, bucket_names.index(k)]
+    out['score'] = scores
+    import pandas as pd
+    return pd.DataFrame(out, index=picked)  # final ranked DataFrame
+
+
+def build_records(
+    data: Dict[str, list],
+    meta_cols: List[str],
+    bucket_names: List[str],
+    subscores: np.ndarray,
+    scores: np.ndarray,
+    picked: np.ndarray,
+) -> List[Dict[str, Any]]:
+    """Same rows as `build_result_frame(...).to_dict('records')`, without building a frame."""
+    columns = {m: np.asarray(data[m])[picked].tolist() for m in meta_cols}
+    values = [columns[m] for m in meta_cols] * 2 + [np.asarray(data['id'])[picked].tolist()]
+    for k in sorted(bucket_names):
+        values.append(subscores[:, bucket_names.index(k)].tolist())
+    values.append(scores.tolist())
+    keys = record_columns(meta_cols, bucket_names)
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def record_columns(meta_cols: List[str], bucket_names: List[str]) -> List[str]:
+    """Keys of a result record, in order."""
+    return (list(meta_cols) + [META_ALIASES[m] for m in meta_cols] + ['id']
+            + [f"score_{k}" for k in sorted(bucket_names)] + ['score'])
+
+
+def ranked_records(population: FeaturePopulation, ranking: Ranking) -> List[Dict[str, Any]]:
+    """Records for a ranking, raising if nothing could be ranked."""
+    picked = ranking.picked
+    if not len(picked):
+        raise ValueError("No schools match the criteria after ranking. Try broadening filters.")
+    return build_records(
+        population.data, population.meta_cols,
+        ranking.bucket_names, ranking.buckets[picked], ranking.overall[picked], picked,
+    )
 
-    colleges = query.all()
-    if not colleges:
-        raise ValueError("No schools match the selected filters. Try broadening your search.")
 
-    df = pd.DataFrame([c.__dict__ for c in colleges])
-    if '_sa_instance_state' in df.columns:
-        df = df.drop(columns=['_sa_instance_state'])
+# ---- Result caching
 
-    # ---- Collect features from priorities that actually exist in the data
-    feats = []
+def canonical_request(
+    states: Optional[List[str]] = None,
+    user_sat: Optional[float] = None,
+    user_act: Optional[float] = None,
+    user_gpa: Optional[float] = None,
+    user_priorities: Optional[Dict[str, float]] = None,
+    user_cost: Optional[float] = None,
+    home: Optional[Sequence[float]] = None,
+    home_zip: Optional[str] = None,
+    radius_miles: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Recommender inputs in canonical form, so equivalent submissions share a cache entry.
+
+    States are upper-cased, de-duplicated and sorted; scores are rounded to the form's
+    precision (whole SAT/ACT points, GPA to 0.01); weights are rounded to 1e-4, and weights
+    that can't affect the ranking (ignored keys, non-positive values) become 0. 'admissions'
+    keeps its value because it also sets the fit weight. Home coordinates are rounded to 1e-4
+    degrees, a ZIP to its 5 digits (and dropped when coordinates are given) and the radius to
+    whole miles. The recommender is always called
+    with these canonical values, so a cached result is exactly what recomputing would give.
+    """
+    priorities = None
     if user_priorities:
-        for k, w in user_priorities.items():
-            if k in ('value', 'campus'):
-                continue
-            if w and w > 0:
-                feats.extend(feature_map.get(k, []))
-    feats = sorted(set(f for f in feats if f in df.columns))
-
-    # ---- Fallback defaults (lowercase DB names)
-    if not feats:
-        default_feats = [
-            'retention_rate_ft', 'graduation_rate_150', 'admission_rate',
-            cost_col, 'median_debt', 'avg_faculty_salary',
-            'diversity_score', 'urbanicity_score'
-        ]
-        feats = [f for f in default_feats if f in df.columns]
-
-    if not feats:
-        raise ValueError("No usable features found in the dataset. Check your columns/dataset.")
-
-    # ---- Build ranking frame with meta + selected features + SAT/ACT/GPA (protected from removal)
-    meta_cols = [c for c in ['name', 'city', 'state', 'unitid'] if c in df.columns]
-    sat_act_present = [c for c in sat_act_gpa_cols if c in df.columns]
-    df_rank = df[meta_cols + feats + sat_act_present].copy()
-
-    # ---- Numeric conversion for scoring feats
-    num_df = df_rank[feats].apply(pd.to_numeric, errors='coerce')
-
-    # ---- Drop low-coverage features (<60% non-null), but keep at least something
-    coverage = num_df.notna().mean()
-    keep_feats = [f for f in feats if coverage.get(f, 0) >= 0.60]
-    if not keep_feats:
-        keep_feats = feats  # fallback: keep and impute
-
-    num_df = num_df[keep_feats]
-
-    # ---- Outlier winsorization (1st–99th percentile) before imputation & scaling
-    def winsorize_series(s: pd.Series, lo: float = 0.01, hi: float = 0.99) -> pd.Series:
-        s_no_na = s.dropna()
-        if s_no_na.empty:
-            return s
-        ql, qu = s_no_na.quantile(lo), s_no_na.quantile(hi)
-        return s.clip(lower=ql, upper=qu)
-
-    for col in num_df.columns:
-        num_df[col] = winsorize_series(num_df[col])
-
-    # ---- Median imputation
-    num_df = num_df.apply(pd.to_numeric, errors='coerce')
-    num_df = num_df.fillna(num_df.median(numeric_only=True))
-
-    # Drop any columns still entirely NaN (extremely sparse)
-    non_empty_cols = [c for c in num_df.columns if num_df[c].notna().any()]
-    num_df = num_df[non_empty_cols]
-    if num_df.empty:
-        raise ValueError('No usable numeric features after NA handling. Consider loosening coverage threshold or priorities.')
-
-    # ---- Normalize 0–1
-    scaler = MinMaxScaler()
-    norm = pd.DataFrame(
-        scaler.fit_transform(num_df),
-        columns=num_df.columns,
-        index=df_rank.index
+        priorities = {}
+        for k in sorted(user_priorities):
+            v = round(float(user_priorities[k] or 0), 4)
+            if k != 'admissions' and (k in IGNORED_PRIORITIES or v <= 0):
+                v = 0.0
+            priorities[k] = v
+    return {
+        'states': sorted({s.strip().upper() for s in states or [] if s and s.strip()}),
+        'user_sat': None if user_sat is None else int(round(user_sat)),
+        'user_act': None if user_act is None else int(round(user_act)),
+        'user_gpa': None if user_gpa is None else round(float(user_gpa), 2),
+        'user_priorities': priorities,
+        'user_cost': None if user_cost is None else int(round(user_cost)),
+        'home': None if home is None else [round(float(home[0]), 4), round(float(home[1]), 4)],
+        'home_zip': str(home_zip).strip()[:5] if home_zip and home is None else None,
+        'radius_miles': None if radius_miles is None else int(round(parse_radius(radius_miles))),
+    }
+
+
+def request_key(params: Dict[str, Any], top_n: int) -> Tuple:
+    """Hashable key for canonical request params."""
+    priorities = params['user_priorities']
+    return (
+        tuple(params['states']),
+        params['user_sat'],
+        params['user_act'],
+        params['user_gpa'],
+        None if priorities is None else tuple(priorities.items()),
+        params['user_cost'],
+        *_home_key(params),
+        top_n,
     )
 
-    # ---- Flip directional features so "lower is better" becomes higher score
-    for feat in norm.columns:
-        if feat in invert_after_norm:
-            norm[feat] = 1 - norm[feat]
 
-    # ---- Build per-priority bucket means (each bucket contributes equally)
-    bucket_scores: Dict[str, pd.Series] = {}
-    for k, cols in feature_map.items():
-        if k in ('value', 'campus'):
-            continue
-        cols = [c for c in cols if c in norm.columns]
-        if cols:
-            bucket_scores[k] = norm[cols].mean(axis=1)
-
-    # ---- Academic fit score (SAT/ACT/GPA), independent of normalization
-    def band_fit_series(user_val: float, lo: pd.Series, hi: pd.Series) -> pd.Series:
-        out = pd.Series(np.nan, index=lo.index, dtype=float)
-        width = (hi - lo).where((~lo.isna()) & (~hi.isna()) & ((hi - lo) > 0), np.nan)
-        inside = (user_val >= lo) & (user_val <= hi)
-        out[inside] = 1.0
-        below = (user_val < lo) & (~lo.isna()) & (~width.isna())
-        out[below] = np.clip(1 - (lo[below] - user_val) / (width[below].abs() + 1e-6), 0, 1)
-        above = (user_val > hi) & (~hi.isna()) & (~width.isna())
-        out[above] = np.clip(1 - (user_val - hi[above]) / (width[above].abs() + 1e-6), 0, 1)
-        return out
-
-    fit_components = []
-
-    # SAT fit: prefer band if both 25/75 present; else approximate from sat_avg ± 100
-    if user_sat is not None:
-        # lowercase band variant
-        if {'sat_verbal_25', 'sat_verbal_75', 'sat_math_25', 'sat_math_75'}.issubset(df_rank.columns):
-            sat_lo = pd.to_numeric(df_rank['sat_verbal_25'], errors='coerce') + pd.to_numeric(df_rank['sat_math_25'], errors='coerce')
-            sat_hi = pd.to_numeric(df_rank['sat_verbal_75'], errors='coerce') + pd.to_numeric(df_rank['sat_math_75'], errors='coerce')
-            fit_components.append(band_fit_series(user_sat, sat_lo, sat_hi))
-        elif 'sat_avg' in df_rank.columns:
-            sat_avg = pd.to_numeric(df_rank['sat_avg'], errors='coerce')
-            fit_components.append(band_fit_series(user_sat, sat_avg - 100, sat_avg + 100))
-
-    # ACT fit: support lowercase and uppercase variants
-    if user_act is not None:
-        if {'act_composite_25', 'act_composite_75'}.issubset(df_rank.columns):
-            act_lo = pd.to_numeric(df_rank['act_composite_25'], errors='coerce')
-            act_hi = pd.to_numeric(df_rank['act_composite_75'], errors='coerce')
-            fit_components.append(band_fit_series(user_act, act_lo, act_hi))
-        elif {'ACTCM25', 'ACTCM75'}.issubset(df_rank.columns):
-            act_lo = pd.to_numeric(df_rank['ACTCM25'], errors='coerce')
-            act_hi = pd.to_numeric(df_rank['ACTCM75'], errors='coerce')
-            fit_components.append(band_fit_series(user_act, act_lo, act_hi))
-        elif 'ACTCMMID' in df_rank.columns:
-            act_mid = pd.to_numeric(df_rank['ACTCMMID'], errors='coerce')
-            fit_components.append(band_fit_series(user_act, act_mid - 2, act_mid + 2))
-
-    # GPA fit: support lowercase and uppercase variants
-    if user_gpa is not None:
-        if {'gpa25', 'gpa75'}.issubset(df_rank.columns):
-            gpa_lo = pd.to_numeric(df_rank['gpa25'], errors='coerce')
-            gpa_hi = pd.to_numeric(df_rank['gpa75'], errors='coerce')
-            fit_components.append(band_fit_series(user_gpa, gpa_lo, gpa_hi))
-        elif {'GPA25', 'GPA75'}.issubset(df_rank.columns):
-            gpa_lo = pd.to_numeric(df_rank['GPA25'], errors='coerce')
-            gpa_hi = pd.to_numeric(df_rank['GPA75'], errors='coerce')
-            fit_components.append(band_fit_series(user_gpa, gpa_lo, gpa_hi))
-
-    if fit_components:
-        fit_score = pd.concat(fit_components, axis=1).mean(axis=1, skipna=True)
-        if fit_score.notna().any():
-            bucket_scores['fit'] = fit_score
-
-    # ---- Compute weighted score across buckets (NaN-safe, row-wise)
-    score_df = pd.DataFrame({k: bucket_scores[k] for k in bucket_scores.keys()})
-    if user_priorities:
-        weights = {
-            k: float(v)
-            for k, v in user_priorities.items()
-            if k not in ('value', 'campus') and v and v > 0 and k in score_df.columns
-        }
-        # If we computed 'fit' but no explicit weight, align it to 'admissions' weight or default 1.0
-        if 'fit' in score_df.columns and 'fit' not in weights:
-            weights['fit'] = float(user_priorities.get('admissions', 1.0))
-        if not weights:
-            weights = {k: 1.0 for k in score_df.columns}
-    else:
-        weights = {k: 1.0 for k in score_df.columns}
-
-    w_series = pd.Series(weights).reindex(score_df.columns).fillna(0.0)
-    valid_mask = score_df.notna()
-    row_den = (valid_mask * w_series).sum(axis=1)
-    row_num = (score_df.fillna(0.0) * w_series).sum(axis=1)
-    overall = row_num / row_den.replace(0, np.nan)  # NaN if no valid buckets for a row
-
-    # ---- Assemble result with meta + subscores
-    out = pd.DataFrame(index=df_rank.index)
-    for m in meta_cols:
-        out[m] = df_rank[m]
-
-    # Aliases for compatibility
-    if 'name' in out.columns:
-        out['INSTNM'] = out['name']
-    if 'city' in out.columns:
-        out['CITY'] = out['city']
-    if 'state' in out.columns:
-        out['STABBR'] = out['state']
-    if 'unitid' in out.columns:
-        out['UNITID'] = out['unitid']
-
-    # Include DB primary key if present
-    if 'id' in df.columns:
-        out['id'] = df['id']
-
-    # Subscores
-    for k in sorted(score_df.columns):
-        out[f"score_{k}"] = score_df[k]
-    out['score'] = overall
-
-    # ---- Sort and return top N
-    out = out.sort_values('score', ascending=False).head(top_n)
-    if out.empty:
+def _home_key(params: Dict[str, Any]) -> Tuple:
+    home = params.get('home')
+    return (None if home is None else tuple(home), params.get('home_zip'), params.get('radius_miles'))
+
+
+def recommend_cached(top_n: int = 12, **params) -> List[Dict[str, Any]]:
+    """
+    Top-N recommendations as records, served from `result_cache` when the same canonical
+    request was answered recently for the current data version.
+
+    Misses rank a population from `profile_cache`, so a request that only changes the
+    weights (e.g. a slider move) skips loading and normalization entirely.
+    """
+    params = canonical_request(**params)
+    result_cache.bind_version(data_version())
+    key = request_key(params, top_n)
+    records = result_cache.get(key)
+    if records is None:
+        with recording_stages():
+            population, fit, near = get_profile(params)
+            ranking = population.rank(params['user_priorities'], fit, top_n, near)
+            with stage('result'):
+                records = ranked_records(population, ranking)
+        result_cache.set(key, records)
+    return records
+
+
+# ---- Full rankings (exports)
+
+def ranking_batches(batch_size: int, **params) -> Tuple[List[str], Iterator[List[Dict[str, Any]]]]:
+    """
+    Every school a request ranks (the whole population, or everything inside the radius),
+    best first, as record keys and a generator of record lists of up to `batch_size`.
+
+    The ranking itself is one array over the population; records are only built a batch
+    at a time as the generator is consumed.
+    """
+    params = canonical_request(**params)
+    population, fit, near = get_profile(params)
+    ranking = population.rank(params['user_priorities'], fit, population.rows, near)
+    if not len(ranking.picked):
         raise ValueError("No schools match the criteria after ranking. Try broadening filters.")
 
-    return out  # final ranked DataFrame
+    def batches():
+        for start in range(0, len(ranking.picked), batch_size):
+            picked = ranking.picked[start:start + batch_size]
+            yield build_records(
+                population.data, population.meta_cols,
+                ranking.bucket_names, ranking.buckets[picked], ranking.overall[picked], picked,
+            )
+    return record_columns(population.meta_cols, ranking.bucket_names), batches()
+
+
+# ---- Batch scoring
+
+def recommend_batch(profiles: List[Dict[str, Any]], top_n: int = 12) -> List[Dict[str, Any]]:
+    """
+    Recommendations for many student profiles at once.
+
+    Each profile takes the keyword arguments of `recommend_colleges_filtered` (states,
+    user_sat, user_act, user_gpa, user_priorities, user_cost, home, home_zip, radius_miles).
+    Profiles are canonicalized and grouped by filter population, so each population is loaded
+    and normalized once; fit and weighted scores for the whole group are computed as
+    (schools x profiles) arrays. Profiles with a home location are ranked one at a time.
+
+    Returns one entry per profile, in order: {'results': [records]} or {'error': message}.
+    """
+    params = [canonical_request(**p) for p in profiles]
+    out: List[Optional[Dict[str, Any]]] = [None] * len(params)
+    groups: Dict[tuple, List[int]] = {}
+    for i, p in enumerate(params):
+        groups.setdefault((tuple(p['states']), p['user_cost']), []).append(i)
+
+    for (states, user_cost), members in groups.items():
+        try:
+            population = load_population(list(states), user_cost)
+        except ValueError as e:
+            for i in members:
+                out[i] = {'error': str(e)}
+            continue
+        located = [i for i in members if params[i]['home'] is not None or params[i]['home_zip']]
+        for i in located:
+            p = params[i]
+            try:
+                near = nearness(population, p['home'], p['home_zip'], p['radius_miles'])
+                ranking = population.rank(p['user_priorities'], population.fit(
+                    p['user_sat'], p['user_act'], p['user_gpa']), top_n, near)
+                out[i] = {'results': ranked_records(population, ranking)}
+            except ValueError as e:
+                out[i] = {'error': str(e)}
+        members = [i for i in members if i not in set(located)]
+        if not members:
+            continue
+        fits = population.fit_matrix([
+            {'sat': params[i]['user_sat'], 'act': params[i]['user_act'], 'gpa': params[i]['user_gpa']}
+            for i in members
+        ])
+        ranked = population.rank_many([params[i]['user_priorities'] for i in members], fits, top_n)
+        for i, top in zip(members, ranked):
+            if isinstance(top, ValueError):
+                out[i] = {'error': str(top)}
+            elif not len(top.picked):
+                out[i] = {'error': "No schools match the criteria after ranking. Try broadening filters."}
+            else:
+                out[i] = {'results': build_records(
+                    population.data, population.meta_cols,
+                    top.bucket_names, top.subscores, top.scores, top.picked,
+                )}
+    return out
+
+
+# ---- Live re-weighting
+
+def profile_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """The weight-independent part of canonical request params."""
+    return {k: v for k, v in params.items() if k != 'user_priorities'}
+
+
+def get_profile(profile: Dict[str, Any]) -> Tuple[FeaturePopulation, Optional[np.ndarray], Optional[Nearness]]:
+    """Population, student fit and distance bucket for canonical profile params, via `profile_cache`."""
+    profile_cache.bind_version(data_version())
+    key = (tuple(profile['states']), profile['user_sat'], profile['user_act'],
+           profile['user_gpa'], profile['user_cost'], *_home_key(profile))
+    entry = profile_cache.get(key)
+    if entry is None:
+        population = load_population(profile['states'], profile['user_cost'])
+        with stage('fit'):
+            entry = (
+                population,
+                population.fit(profile['user_sat'], profile['user_act'], profile['user_gpa']),
+                nearness(population, profile.get('home'), profile.get('home_zip'), profile.get('radius_miles')),
+            )
+        profile_cache.set(key, entry)
+    return entry
+
+
+def json_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Records with NaN scores replaced by None so they serialize as JSON null."""
+    return [
+        {k: (None if isinstance(v, float) and v != v else v) for k, v in r.items()}
+        for r in records
+    ]
@@ -0,0 +1,386 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from app.metrics import stage
+
+
+# ---- Scoring configuration shared by the recommender entry points
+COST_COL = 'cost_of_attendance'
+
+FEATURE_MAP: Dict[str, List[str]] = {
+    'academics': ['retention_rate_ft', 'graduation_rate_150'],
+    'admissions': ['admission_rate'],
+    'cost': [COST_COL, 'median_debt'],
+    'faculty': ['avg_faculty_salary'],
+    'diversity': ['diversity_score'],
+    'location': ['urbanicity_score'],
+    'prestige': ['admission_rate'],  # Lower admission rate = higher prestige
+}
+
+DEFAULT_FEATURES = [
+    'retention_rate_ft', 'graduation_rate_150', 'admission_rate',
+    COST_COL, 'median_debt', 'avg_faculty_salary',
+    'diversity_score', 'urbanicity_score',
+]
+
+# Priority keys that are accepted from the form but have no features behind them
+IGNORED_PRIORITIES = ('value', 'campus')
+
+# Features must be at least this populated to be scored (before the keep-everything fallback)
+MIN_COVERAGE = 0.60
+WINSOR_LIMITS = (0.01, 0.99)
+
+# Band-fit sources per test, in order of preference. Each variant is
+# (low columns, high columns, low offset, high offset); multiple columns are summed.
+BAND_RULES: Dict[str, List[Tuple[Tuple[str, ...], Tuple[str, ...], float, float]]] = {
+    'sat': [
+        (('sat_verbal_25', 'sat_math_25'), ('sat_verbal_75', 'sat_math_75'), 0.0, 0.0),
+        (('sat_avg',), ('sat_avg',), -100.0, 100.0),
+    ],
+    'act': [
+        (('act_composite_25',), ('act_composite_75',), 0.0, 0.0),
+        (('ACTCM25',), ('ACTCM75',), 0.0, 0.0),
+        (('ACTCMMID',), ('ACTCMMID',), -2.0, 2.0),
+    ],
+    'gpa': [
+        (('gpa25',), ('gpa75',), 0.0, 0.0),
+        (('GPA25',), ('GPA75',), 0.0, 0.0),
+    ],
+}
+
+BAND_EPS = 1e-6
+
+
+def inverted_features(prefer_selectivity: bool = True) -> set:
+    """Columns where lower is better and the normalized value gets flipped."""
+    inverted = {COST_COL, 'median_debt'}
+    if prefer_selectivity:
+        inverted.add('admission_rate')
+    return inverted
+
+
+def select_features(user_priorities: Optional[Dict[str, float]], available: Iterable[str]) -> List[str]:
+    """Features implied by the positive priorities, falling back to the defaults."""
+    available = set(available)
+    feats = []
+    if user_priorities:
+        for k, w in user_priorities.items():
+            if k in IGNORED_PRIORITIES:
+                continue
+            if w and w > 0:
+                feats.extend(FEATURE_MAP.get(k, []))
+    feats = sorted(set(f for f in feats if f in available))
+    if not feats:
+        feats = [f for f in DEFAULT_FEATURES if f in available]
+    return feats
+
+
+def resolve_bands(available: Iterable[str]) -> Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...], float, float]]:
+    """Pick the first band variant per test whose columns all exist."""
+    available = set(available)
+    bands = {}
+    for test, variants in BAND_RULES.items():
+        for lo_cols, hi_cols, lo_off, hi_off in variants:
+            if set(lo_cols).issubset(available) and set(hi_cols).issubset(available):
+                bands[test] = (lo_cols, hi_cols, lo_off, hi_off)
+                break
+    return bands
+
+
+def band_columns(bands: Dict[str, tuple]) -> List[str]:
+    """Unique source columns needed by the resolved bands."""
+    cols: List[str] = []
+    for lo_cols, hi_cols, _, _ in bands.values():
+        for c in lo_cols + hi_cols:
+            if c not in cols:
+                cols.append(c)
+    return cols
+
+
+# ---- Coercion
+
+def _coerce_value(v) -> float:
+    if v is None:
+        return np.nan
+    if isinstance(v, str):
+        v = v.strip()
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def coerce_column(values: Sequence) -> np.ndarray:
+    """Convert a column of raw values to float64, mapping anything non-numeric to NaN."""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.fromiter((_coerce_value(v) for v in values), dtype=np.float64, count=len(values))
+
+
+def to_matrix(columns: Sequence[Sequence]) -> np.ndarray:
+    """Stack raw columns into a contiguous (rows x columns) float64 matrix."""
+    if not columns:
+        return np.empty((0, 0), dtype=np.float64)
+    out = np.empty((len(columns[0]), len(columns)), dtype=np.float64)
+    for j, col in enumerate(columns):
+        out[:, j] = coerce_column(col)
+    return out
+
+
+# ---- Column statistics
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # Same formulation as numpy's 'linear' quantile so results match pandas bit for bit
+    diff = b - a
+    out = a + diff * t
+    return np.where(t >= 0.5, b - diff * (1 - t), out)
+
+
+def sorted_quantile(sorted_x: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolated quantile per column of a column-sorted matrix (NaNs last)."""
+    virtual = (counts - 1) * q
+    prev = np.floor(virtual).astype(np.intp)
+    nxt = np.minimum(prev + 1, counts - 1)
+    prev = np.clip(prev, 0, None)
+    nxt = np.clip(nxt, 0, None)
+    cols = np.arange(sorted_x.shape[1])
+    out = _lerp(sorted_x[prev, cols], sorted_x[nxt, cols], virtual - np.floor(virtual))
+    return np.where(counts > 0, out, np.nan)
+
+
+def sorted_median(sorted_x: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median per column of a column-sorted matrix (NaNs last)."""
+    cols = np.arange(sorted_x.shape[1])
+    lo = np.clip((counts - 1) // 2, 0, None)
+    hi = np.clip(counts // 2, 0, None)
+    out = (sorted_x[lo, cols] + sorted_x[hi, cols]) / 2
+    return np.where(counts > 0, out, np.nan)
+
+
+def column_stats(x: np.ndarray, limits: Tuple[float, float] = WINSOR_LIMITS) -> Dict[str, np.ndarray]:
+    """
+    Everything the normalization step needs from a population, in one sort per column:
+    row/non-null counts, winsor bounds, post-winsor median and post-winsor min/max.
+    """
+    counts = np.count_nonzero(~np.isnan(x), axis=0)
+    return _padded_stats(np.sort(x, axis=0), counts, x.shape[0], limits)  # NaNs sort to the end
+
+
+def stats_from_sorted(sorted_cols: Sequence[np.ndarray], rows: int, limits: Tuple[float, float] = WINSOR_LIMITS) -> Dict[str, np.ndarray]:
+    """Same as `column_stats`, from per-column ascending arrays that already exclude NaNs."""
+    counts = np.array([len(c) for c in sorted_cols], dtype=np.intp)
+    padded = np.full((max(int(counts.max(initial=0)), 1), len(sorted_cols)), np.nan)
+    for j, col in enumerate(sorted_cols):
+        padded[:len(col), j] = col
+    return _padded_stats(padded, counts, rows, limits)
+
+
+def _padded_stats(sorted_x: np.ndarray, counts: np.ndarray, rows: int, limits: Tuple[float, float]) -> Dict[str, np.ndarray]:
+    n_cols = sorted_x.shape[1]
+    if sorted_x.shape[0] == 0:
+        empty = np.full(n_cols, np.nan)
+        return {'rows': np.full(n_cols, rows), 'count': counts, 'lower': empty, 'upper': empty,
+                'median': empty, 'min': empty, 'max': empty}
+    ql = sorted_quantile(sorted_x, counts, limits[0])
+    qu = sorted_quantile(sorted_x, counts, limits[1])
+    clipped = np.clip(sorted_x, ql, qu)  # still sorted, NaNs stay NaN
+    cols = np.arange(n_cols)
+    last = np.clip(counts - 1, 0, None)
+    return {
+        'rows': np.full(n_cols, rows),
+        'count': counts,
+        'lower': ql,
+        'upper': qu,
+        'median': sorted_median(clipped, counts),
+        'min': np.where(counts > 0, clipped[0, cols], np.nan),
+        'max': np.where(counts > 0, clipped[last, cols], np.nan),
+    }
+
+
+def take_stats(stats: Dict[str, np.ndarray], idx: Sequence[int]) -> Dict[str, np.ndarray]:
+    """Subset every per-column statistic to the given column positions."""
+    idx = np.asarray(idx, dtype=np.intp)
+    return {k: v[idx] for k, v in stats.items()}
+
+
+def coverage(x: np.ndarray, stats: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+    """Share of non-null values per column (read off `stats` when already computed)."""
+    if stats is not None:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(stats['rows'] > 0, stats['count'] / np.maximum(stats['rows'], 1), np.nan)
+    if len(x) == 0:
+        return np.full(x.shape[1], np.nan)
+    return np.count_nonzero(~np.isnan(x), axis=0) / x.shape[0]
+
+
+def keep_by_coverage(feats: List[str], cov: np.ndarray) -> List[str]:
+    """Drop low-coverage features, but keep at least something."""
+    keep = [f for f, c in zip(feats, cov) if c >= MIN_COVERAGE]
+    return keep or list(feats)
+
+
+# ---- Normalization
+
+def normalize(x: np.ndarray, invert: np.ndarray, stats: Optional[Dict[str, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Winsorize, median-impute, MinMax-scale and direction-flip every column of `x` at once.
+
+    Returns the normalized matrix and a mask of usable (not entirely NaN) columns.
+    Scaling follows sklearn's MinMaxScaler, including its handling of constant columns.
+    """
+    with stage('winsorize'):
+        if stats is None:
+            stats = column_stats(x)
+        usable = stats['count'] > 0
+        out = np.clip(x, stats['lower'], stats['upper'])
+        out = np.where(np.isnan(out), stats['median'], out)
+    with stage('scale'):
+        data_range = stats['max'] - stats['min']
+        data_range = np.where(data_range < 10 * np.finfo(np.float64).eps, 1.0, data_range)
+        scale = 1.0 / data_range
+        out = out * scale + (0 - stats['min'] * scale)
+        out = np.where(invert, 1 - out, out)
+    return out, usable
+
+
+def bucket_matrix(norm: np.ndarray, columns: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Average normalized columns into one score per priority bucket."""
+    position = {c: j for j, c in enumerate(columns)}
+    names, scores = [], []
+    for k, cols in FEATURE_MAP.items():
+        if k in IGNORED_PRIORITIES:
+            continue
+        idx = [position[c] for c in cols if c in position]
+        if idx:
+            names.append(k)
+            scores.append(norm[:, idx].mean(axis=1))
+    if not scores:
+        return names, np.empty((norm.shape[0], 0))
+    return names, np.column_stack(scores)
+
+
+# ---- Academic fit
+
+def band_fit(user_val, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """
+    1.0 inside the [lo, hi] band, decaying linearly by band widths outside it, NaN when unknown.
+
+    `user_val` may be a scalar or an array that broadcasts against `lo`/`hi`.
+    """
+    user_val = np.asarray(user_val, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        width = hi - lo
+        ok = width > 0  # false for NaN bounds and empty bands
+        below = (user_val < lo) & ok
+        above = (user_val > hi) & ok
+        inside = (user_val >= lo) & (user_val <= hi)
+        dist = np.where(below, lo - user_val, user_val - hi)
+        decay = np.clip(1 - dist / (np.abs(width) + BAND_EPS), 0, 1)
+    out = np.where(below | above, decay, np.nan)
+    return np.where(inside, 1.0, out)
+
+
+def band_bounds(values: Dict[str, np.ndarray], band: tuple) -> Tuple[np.ndarray, np.ndarray]:
+    """Low/high band arrays for one resolved band variant."""
+    lo_cols, hi_cols, lo_off, hi_off = band
+    lo, hi = values[lo_cols[0]], values[hi_cols[0]]
+    for c in lo_cols[1:]:
+        lo = lo + values[c]
+    for c in hi_cols[1:]:
+        hi = hi + values[c]
+    if lo_off:
+        lo = lo + lo_off
+    if hi_off:
+        hi = hi + hi_off
+    return lo, hi
+
+
+def nan_mean(stack: np.ndarray, axis: int = 0) -> np.ndarray:
+    """Mean ignoring NaNs; NaN where every value is missing (no warnings)."""
+    valid = ~np.isnan(stack)
+    counts = valid.sum(axis=axis)
+    totals = np.where(valid, stack, 0.0).sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+
+def fit_score(user_scores: Dict[str, Optional[float]], bounds: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> Optional[np.ndarray]:
+    """Mean band fit across the tests the student supplied; None if nothing could be scored."""
+    components = [
+        band_fit(user_scores[test], lo, hi)
+        for test, (lo, hi) in bounds.items()
+        if user_scores.get(test) is not None
+    ]
+    if not components:
+        return None
+    fit = nan_mean(np.stack(components))
+    if np.isnan(fit).all():
+        return None
+    return fit
+
+
+# ---- Weighting and selection
+
+def resolve_weights(user_priorities: Optional[Dict[str, float]], buckets: List[str]) -> np.ndarray:
+    """Weight vector aligned with `buckets`; unweighted buckets get 0, no weights at all means equal."""
+    if user_priorities:
+        weights = {
+            k: float(v)
+            for k, v in user_priorities.items()
+            if k not in IGNORED_PRIORITIES and v and v > 0 and k in buckets
+        }
+        # If we computed 'fit' but no explicit weight, align it to 'admissions' weight or default 1.0
+        if 'fit' in buckets and 'fit' not in weights:
+            weights['fit'] = float(user_priorities.get('admissions', 1.0))
+        # A distance bucket only exists when a home location was given; weigh it 1.0 unless set
+        if 'distance' in buckets and 'distance' not in weights:
+            weights['distance'] = 1.0
+        if not weights:
+            weights = {k: 1.0 for k in buckets}
+    else:
+        weights = {k: 1.0 for k in buckets}
+    return np.array([weights.get(k, 0.0) for k in buckets], dtype=np.float64)
+
+
+def weighted_scores(buckets: np.ndarray, weights: np.ndarray,
+                    fit: Optional[np.ndarray] = None, fit_weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Row-wise NaN-safe weighted average of bucket scores.
+
+    `weights` may be a vector (one profile) or a (buckets x profiles) matrix, in which case
+    the result has one column per profile. For batches, a per-profile fit bucket can be passed
+    separately as `fit` (rows x profiles) with `fit_weights` (profiles) instead of being stacked
+    onto `buckets`. Rows with no weighted, non-missing bucket get NaN.
+    """
+    valid = ~np.isnan(buckets)
+    num = np.where(valid, buckets, 0.0) @ weights
+    den = valid.astype(np.float64) @ weights
+    if fit is not None:
+        fit_valid = ~np.isnan(fit)
+        num = num + np.where(fit_valid, fit, 0.0) * fit_weights
+        den = den + fit_valid * fit_weights
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den != 0, num / np.where(den != 0, den, 1.0), np.nan)
+
+
+def top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """
+    Indices of the `n` best scores, best first.
+
+    Uses a partial selection rather than a full sort. Ties keep their original row order
+    and NaN scores rank last, matching a stable descending sort.
+    """
+    size = len(scores)
+    n = min(max(n, 0), size)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    key = np.where(np.isnan(scores), -np.inf, scores)
+    if n < size:
+        kth = np.partition(key, size - n)[size - n]
+        candidates = np.flatnonzero(key >= kth)
+    else:
+        candidates = np.arange(size)
+    nan_last = np.isnan(scores[candidates])
+    order = np.lexsort((candidates, -key[candidates], nan_last))
+    return candidates[order][:n]
@@ -0,0 +1,114 @@
+"""
+Precomputed normalization statistics per filter population.
+
+Winsor bounds, medians, coverage and min/max depend only on the data and on which schools
+the `states` filter selects, never on the student's scores or weights. `PopulationStats`
+sorts every scoring feature once per snapshot version for the whole country and for each
+state. Single-state and national lookups are O(1). Multi-state populations merge the
+per-state sorted arrays, which gives exactly the statistics a fresh pass would, and are
+memoized. A new snapshot version rebuilds everything.
+
+Cost-capped populations (`user_cost`) aren't precomputed because the cap is free-form; the
+recommender computes those per request as before.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.ml.scoring import DEFAULT_FEATURES, FEATURE_MAP, stats_from_sorted, take_stats
+from app.snapshot import Snapshot
+
+COMBINED_CACHE_SIZE = 256
+
+
+def feature_columns(snapshot: Snapshot) -> List[str]:
+    """Every scoring feature the snapshot can supply."""
+    cols = list(DEFAULT_FEATURES)
+    for feats in FEATURE_MAP.values():
+        cols.extend(feats)
+    return [c for c in dict.fromkeys(cols) if c in snapshot]
+
+
+class PopulationStats:
+    """Normalization statistics for one snapshot version, by state population."""
+
+    def __init__(self, snapshot: Snapshot):
+        self.version = snapshot.version
+        self.columns = feature_columns(snapshot)
+        self._position = {c: j for j, c in enumerate(self.columns)}
+
+        states = np.asarray(snapshot['state'])
+        values = [np.asarray(snapshot[c], dtype=np.float64) for c in self.columns]
+
+        # Per-state sorted, NaN-free values; the national stats reuse the same arrays
+        self._sorted: Dict[str, List[np.ndarray]] = {}
+        self._rows: Dict[str, int] = {}
+        self._stats: Dict[str, Dict[str, np.ndarray]] = {}
+        order = np.argsort(states, kind='stable')
+        names, starts = np.unique(states[order], return_index=True)
+        bounds = list(starts) + [len(order)]
+        for i, state in enumerate(names):
+            rows = order[bounds[i]:bounds[i + 1]]
+            cols = [np.sort(v[rows][~np.isnan(v[rows])]) for v in values]
+            self._sorted[str(state)] = cols
+            self._rows[str(state)] = len(rows)
+            self._stats[str(state)] = stats_from_sorted(cols, len(rows))
+
+        self._national = stats_from_sorted(
+            [np.sort(v[~np.isnan(v)]) for v in values], len(states)
+        )
+        self._combined: 'OrderedDict[Tuple[str, ...], Dict[str, np.ndarray]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def has_columns(self, names: Iterable[str]) -> bool:
+        return all(n in self._position for n in names)
+
+    def lookup(self, states: Optional[List[str]], columns: List[str]) -> Dict[str, np.ndarray]:
+        """Stats for the population selected by `states`, aligned with `columns`."""
+        return take_stats(self._population(states), [self._position[c] for c in columns])
+
+    def _population(self, states: Optional[List[str]]) -> Dict[str, np.ndarray]:
+        if not states:
+            return self._national
+        key = tuple(sorted(set(states)))
+        if len(key) == 1:
+            return self._stats.get(key[0]) or self._merge(key)
+        with self._lock:
+            stats = self._combined.get(key)
+            if stats is not None:
+                self._combined.move_to_end(key)
+                return stats
+        stats = self._merge(key)
+        with self._lock:
+            self._combined[key] = stats
+            while len(self._combined) > COMBINED_CACHE_SIZE:
+                self._combined.popitem(last=False)
+        return stats
+
+    def _merge(self, states: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+        present = [s for s in states if s in self._sorted]
+        cols = [
+            np.sort(np.concatenate([self._sorted[s][j] for s in present])) if present else np.empty(0)
+            for j in range(len(self.columns))
+        ]
+        return stats_from_sorted(cols, sum(self._rows[s] for s in present))
+
+
+_current: Optional[PopulationStats] = None
+_build_lock = threading.Lock()
+
+
+def population_stats(snapshot: Optional[Snapshot]) -> Optional[PopulationStats]:
+    """Stats for `snapshot`'s version, built on first use and rebuilt when the version changes."""
+    global _current
+    if snapshot is None:
+        return None
+    current = _current
+    if current is not None and current.version == snapshot.version:
+        return current
+    with _build_lock:
+        if _current is None or _current.version != snapshot.version:
+            _current = PopulationStats(snapshot)
+        return _current
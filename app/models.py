@@ -1,4 +1,5 @@
 from datetime import datetime, timezone as dt_timezone
+from sqlalchemy.orm import deferred
 from .db import db
 from flask_login import UserMixin
 
@@ -10,6 +11,8 @@ class User(db.Model, UserMixin):
     last_name = db.Column(db.String(64))
     password_hash = db.Column(db.String(256), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
+    # Bumped whenever any of the user's lists change; part of their list pages' ETag
+    lists_updated_at = db.Column(db.DateTime)
 
     reviews = db.relationship('Review', backref='user', lazy=True)
 
@@ -20,7 +23,7 @@ class College(db.Model):
     __tablename__ = 'college'
     id = db.Column(db.Integer, primary_key=True)
 
-    unitid = db.Column(db.Integer)
+    unitid = db.Column(db.Integer, unique=True, index=True)
     name = db.Column(db.String(255))  # INSTNM
     website = db.Column(db.String(255))  # INSTURL
     net_price_url = db.Column(db.String(255))  # NPCURL
@@ -53,7 +56,7 @@ class College(db.Model):
     is_women_only = db.Column(db.Boolean)  # WOMENONLY
     is_tribal = db.Column(db.Boolean)  # HBCU.1 (possibly tribal colleges — confirm context)
 
-    cost_of_attendance = db.Column(db.Float)  # COSTT4_A
+    cost_of_attendance = db.Column(db.Float, index=True)  # COSTT4_A
     tuition_in_state = db.Column(db.Float)  # TUITIONFEE_IN
     tuition_out_of_state = db.Column(db.Float)  # TUITIONFEE_OUT
 
@@ -72,7 +75,7 @@ class College(db.Model):
     graduation_rate_less_than_4 = db.Column(db.Float)  # C150_L4
     graduation_rate_200 = db.Column(db.Float)  # C200_4
 
-    admission_rate = db.Column(db.Float)  # ADM_RATE
+    admission_rate = db.Column(db.Float, index=True)  # ADM_RATE
     sat_avg = db.Column(db.Float)  # SAT_AVG
     sat_verbal_25 = db.Column(db.Float)  # SATVR25
     sat_math_25 = db.Column(db.Float)  # SATMT25
@@ -93,9 +96,13 @@ class College(db.Model):
     pct_pell = db.Column(db.Float)  # PELL_EVER
     avg_faculty_salary = db.Column(db.Float)
 
-    #wiki api
-    description = db.Column(db.Text) # college description
-    photo_url = db.Column(db.Text) # image URL
+    #wiki api (deferred: only the detail page reads them, via undefer_group('text'))
+    description = deferred(db.Column(db.Text), group='text') # college description
+    photo_url = deferred(db.Column(db.Text), group='text') # image URL
+    short_description = db.Column(db.String(400)) # first sentence of description, set by the loader
+
+    # hash of the mapped CSV row, used by the streaming refresh to skip unchanged rows
+    content_hash = db.Column(db.String(32))
 
 
 class Program(db.Model):
@@ -123,13 +130,53 @@ class CollegeList(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(dt_timezone.utc))
     colleges = db.relationship('CollegeListEntry', backref='list', lazy=True)
 
 class CollegeListEntry(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('list_id', 'college_id', name='uq_college_list_entry_list_college'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     list_id = db.Column(db.Integer, db.ForeignKey('college_list.id'))
     college_id = db.Column(db.Integer, db.ForeignKey('college.id'))
     added_at = db.Column(db.DateTime, default=lambda: datetime.now(dt_timezone.utc))
-    notes = db.Column(db.Text)
\ No newline at end of file
+    notes = db.Column(db.Text)
+
+
+# ---- College listing indexes
+# /colleges filters `undergrad_population IS NOT NULL` and orders by
+# `undergrad_population DESC NULLS LAST`, so the listing indexes end in that order (plus id
+# as a tie-breaker). PostgreSQL only serves the order from an index declared NULLS LAST;
+# SQLite already puts NULLs last in a DESC index and rejects the clause, hence one
+# definition per dialect.
+
+def _listing_index(name, *leading, where=None):
+    db.Index(
+        name, *leading, College.undergrad_population.desc().nulls_last(), College.id,
+        postgresql_where=where,
+    ).ddl_if(dialect='postgresql')
+    db.Index(
+        name, *leading, College.undergrad_population.desc(), College.id,
+        sqlite_where=where,
+    ).ddl_if(callable_=lambda ddl, target, bind, dialect=None, **kw: dialect.name != 'postgresql')
+
+
+POPULATION_KNOWN = College.undergrad_population.isnot(None)
+
+SPECIALTY_FLAGS = {
+    'women_only': College.is_women_only,
+    'men_only': College.is_men_only,
+    'annhi': College.is_annhi,
+    'hbcu': College.is_hbcu,
+    'tribal': College.is_tribal,
+}
+
+_listing_index('ix_college_population', where=POPULATION_KNOWN)
+_listing_index('ix_college_control_population', College.control, where=POPULATION_KNOWN)
+# Not partial: the recommender's DB fallback filters `state IN (...)` without the population check
+_listing_index('ix_college_state_population', College.state)
+for _name, _flag in SPECIALTY_FLAGS.items():
+    # Partial: only the few flagged schools are indexed
+    _listing_index(f'ix_college_{_name}_population', where=db.and_(_flag.is_(True), POPULATION_KNOWN))
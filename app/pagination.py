@@ -0,0 +1,170 @@
+"""
+Keyset ("seek") pagination with opaque cursors.
+
+A page is fetched by seeking past the sort key of the previous page's last row (or before
+the next page's first row) instead of OFFSET, so every page costs the same however deep it
+is. Cursors are URL-safe base64 JSON; a damaged or foreign cursor just starts over at the
+first page.
+
+`keyset_page` orders by `sort_col DESC, id ASC` and expects callers to have filtered out
+NULL sort values.
+"""
+import base64
+import binascii
+import json
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import or_
+
+# Cursor fields and the JSON types they must have; any other value discards the whole cursor
+_FIELD_TYPES = {'d': str, 'k': (int, float), 'i': int, 'n': int, 'o': int}
+# Bound parameters must fit a 64-bit integer
+_INT_LIMIT = 2 ** 63
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    raw = json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    for field, types in _FIELD_TYPES.items():
+        value = data.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, types):
+            return None
+        if isinstance(value, int) and abs(value) >= _INT_LIMIT:
+            return None
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+    return data
+
+
+class Page:
+    """One page of results plus what the template needs to link around it."""
+
+    def __init__(self, items: List[Any], number: int, per_page: int,
+                 next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None,
+                 total: Optional[int] = None, estimated: bool = False):
+        self.items = items
+        self.page = number
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.estimated = estimated
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+    @property
+    def pages(self) -> Optional[int]:
+        if self.total is None:
+            return None
+        return max(1, math.ceil(self.total / self.per_page))
+
+
+def _key_cursor(row, sort_attr: str, direction: str, number: int) -> str:
+    return encode_cursor({'d': direction, 'k': getattr(row, sort_attr), 'i': row.id, 'n': number})
+
+
+def keyset_page(query, sort_col, id_col, per_page: int, cursor: Optional[Dict[str, Any]] = None,
+                page: Optional[int] = None) -> Page:
+    """
+    Fetch one page of `query` ordered by `sort_col DESC, id_col ASC`.
+
+    `cursor` is a decoded cursor from a previous page. Without one, `page` (a legacy page
+    number) is resolved to its first row through a key-only OFFSET lookup, then paged from
+    there like any other cursor.
+    """
+    sort_attr = sort_col.key
+    forward_order = (sort_col.desc().nullslast(), id_col.asc())
+    # Walking the same index backwards, hence NULLS FIRST (no NULL rows are present anyway)
+    backward_order = (sort_col.asc().nullsfirst(), id_col.desc())
+
+    number = 1
+    key = ident = None
+    direction = 'next'
+    inclusive = False
+    if cursor and cursor.get('d') in ('next', 'prev') and cursor.get('k') is not None and cursor.get('i') is not None:
+        direction, key, ident = cursor['d'], cursor['k'], cursor['i']
+        number = max(1, cursor.get('n') or 1)
+    elif page and page > 1:
+        anchor = (
+            query.with_entities(sort_col, id_col)
+            .order_by(*forward_order)
+            .offset((page - 1) * per_page)
+            .limit(1)
+            .first()
+        )
+        if anchor is None:
+            return Page([], page, per_page, prev_cursor=encode_cursor({'n': 1}))
+        key, ident = anchor
+        number = page
+        inclusive = True
+
+    if key is None:
+        rows = query.order_by(*forward_order).limit(per_page + 1).all()
+        more_before = False
+    elif direction == 'next':
+        after = id_col >= ident if inclusive else id_col > ident
+        rows = (
+            query.filter(sort_col <= key, or_(sort_col < key, after))
+            .order_by(*forward_order)
+            .limit(per_page + 1)
+            .all()
+        )
+        more_before = number > 1
+    else:
+        rows = (
+            query.filter(sort_col >= key, or_(sort_col > key, id_col < ident))
+            .order_by(*backward_order)
+            .limit(per_page + 1)
+            .all()
+        )
+        more_before = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        more_after = True
+
+    if key is None or direction == 'next':
+        more_after = len(rows) > per_page
+        rows = rows[:per_page]
+
+    next_cursor = _key_cursor(rows[-1], sort_attr, 'next', number + 1) if rows and more_after else None
+    prev_cursor = _key_cursor(rows[0], sort_attr, 'prev', number - 1) if rows and more_before else None
+    return Page(rows, number, per_page, next_cursor, prev_cursor)
+
+
+def id_list_page(ids: Sequence[int], fetch: Callable[[List[int]], List[Any]], per_page: int,
+                 cursor: Optional[Dict[str, Any]] = None, page: Optional[int] = None) -> Page:
+    """
+    Cursor-style paging by position through `ids`, an already ordered list of every match
+    (e.g. ranked search results). Only the page's ids reach `fetch`, which returns their rows
+    in that order; the total is `len(ids)`.
+    """
+    if cursor and cursor.get('o') is not None:
+        offset = max(0, cursor['o'])
+    else:
+        offset = max(0, ((page or 1) - 1) * per_page)
+    page_ids = list(ids[offset:offset + per_page])
+    number = offset // per_page + 1
+    next_cursor = encode_cursor({'o': offset + per_page}) if offset + per_page < len(ids) else None
+    prev_cursor = encode_cursor({'o': max(0, offset - per_page)}) if offset > 0 else None
+    return Page(fetch(page_ids) if page_ids else [], number, per_page, next_cursor, prev_cursor,
+                total=len(ids))
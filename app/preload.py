@@ -0,0 +1,72 @@
+"""
+Build the read-only per-worker data once, before the web server forks its workers.
+
+Run with `PRELOAD_WARM=1 gunicorn --preload run:app`: `run.py` then calls `warm(app)` in the
+gunicorn master, which maps the snapshot, builds the search, facet, geo, similar-schools and
+population-stats indexes, imports the ML stack and compiles the templates. Every forked
+worker starts with all of it in place and shares the pages copy-on-write with the master
+and its siblings, instead of building (and holding) its own copies on its first requests.
+
+Without it nothing heavy happens at import: pandas and scikit-learn load on first use (the
+geo KD-tree, a recommendation result frame), and each index is built by the first request
+that needs it. The similar-schools table comes precomputed with the snapshot.
+
+Before returning, `warm` drops the master's database connections (a forked worker must not
+reuse its parent's sockets) and freezes the garbage collector's view of the objects built so
+far, so collections in the workers don't write to (and so copy) the shared pages. An index
+rebuilt after a data version change lives in the worker that rebuilt it, as before.
+"""
+import gc
+import time
+from typing import Dict
+
+
+def import_ml_stack() -> None:
+    import pandas  # noqa: F401
+    import sklearn.neighbors  # noqa: F401
+
+
+def _compile_templates(app) -> None:
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+
+def warm(app) -> Dict[str, float]:
+    """Build every shared read-only structure in this process; seconds taken per step."""
+    from app.db import db
+    from app.facets import get_facet_index
+    from app.geo import get_geo_index
+    from app.ml.similar import get_similar_index
+    from app.ml.stats import population_stats
+    from app.search import MemoryBackend, get_search_backend
+    from app.snapshot import get_snapshot
+
+    def _search_index():
+        backend = get_search_backend()
+        if isinstance(backend, MemoryBackend):
+            backend.index()
+
+    steps = [
+        ('ml_imports', import_ml_stack),
+        ('snapshot', get_snapshot),
+        ('search', _search_index),
+        ('facets', get_facet_index),
+        ('geo', get_geo_index),
+        ('similar', get_similar_index),
+        ('population_stats', lambda: population_stats(get_snapshot())),
+        ('templates', lambda: _compile_templates(app)),
+    ]
+    timings: Dict[str, float] = {}
+    with app.app_context():
+        for name, build in steps:
+            started = time.perf_counter()
+            build()
+            timings[name] = time.perf_counter() - started
+        db.session.remove()
+        db.engine.dispose()
+
+    gc.collect()
+    gc.freeze()
+    app.logger.info('Preloaded shared data in %.2fs (%s)', sum(timings.values()),
+                    ', '.join(f'{name} {seconds:.2f}s' for name, seconds in timings.items()))
+    return timings
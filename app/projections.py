@@ -0,0 +1,45 @@
+"""
+Named column projections of College.
+
+Browse pages show a handful of fields per school, so they select just those columns and get
+compact rows (attribute access, like the model) instead of hydrating ~70-column College
+objects. The heavy text columns (`description`, `photo_url`) are deferred on the model in the
+'text' group; only the detail projection loads them. The recommender already reads its
+scoring columns column-wise (see `app.ml.population.college_columns_query`).
+"""
+from typing import Dict, List
+
+from sqlalchemy.orm import undefer_group
+
+from app.models import College
+
+PROJECTIONS: Dict[str, List[str]] = {
+    # /colleges cards and list detail cards
+    'card': [
+        'id', 'name', 'city', 'state', 'admission_rate', 'cost_of_attendance',
+        'undergrad_population', 'short_description',
+    ],
+    # default columns of /api/colleges/export
+    'export': [
+        'id', 'unitid', 'name', 'city', 'state', 'zip', 'website', 'control', 'undergrad_population',
+        'admission_rate', 'sat_avg', 'cost_of_attendance', 'tuition_in_state', 'tuition_out_of_state',
+        'graduation_rate_150', 'retention_rate', 'median_debt', 'earnings_income1',
+    ],
+}
+
+# Columns an export may ask for (everything but loader bookkeeping)
+EXPORTABLE_COLUMNS = [c for c in College.__table__.columns.keys() if c != 'content_hash']
+
+
+def columns(name: str) -> list:
+    return [getattr(College, c) for c in PROJECTIONS[name]]
+
+
+def project(query, name: str):
+    """`query` (over College) returning only projection `name`'s columns, as rows."""
+    return query.with_entities(*columns(name))
+
+
+def detail_query():
+    """College query for the detail page: full objects, deferred text columns included."""
+    return College.query.options(undefer_group('text'))
@@ -0,0 +1,168 @@
+"""
+Per-route SQL query budgets and N+1 detection, for development and tests.
+
+With `QUERY_BUDGET_MODE` set to `log` or `raise`, every SQL statement a request issues is
+recorded with its shape (the SQL text, with IN-lists collapsed) and where it came from: the
+innermost line of app code and, when a template triggered it (e.g. a lazy relationship in a
+loop), the template line. After the view a request is flagged when
+
+    - it ran more statements than its budget (`@query_budget(n)` on the view, else
+      `QUERY_BUDGET_DEFAULT`), or
+    - one statement shape ran more than `QUERY_REPEAT_LIMIT` times (one query per row).
+
+`log` writes the report as a warning; `raise` raises `QueryBudgetExceeded` with it, so a test
+client request fails loudly. The default (`off`) installs nothing. Statements a streamed
+response runs while its body is sent come after the check and aren't counted.
+
+Budgets are declared as the constant a route should keep however much data it shows:
+
+    @lists_bp.route('/lists/<int:list_id>')
+    @query_budget(4)
+    def list_detail(list_id): ...
+"""
+import os
+import re
+import sys
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MODES = ('off', 'log', 'raise')
+DEFAULT_BUDGET = 10
+DEFAULT_REPEAT_LIMIT = 3
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_APP_DIR)
+# App modules that sit between a query and the code that asked for it
+_SKIPPED_FILES = {os.path.join(_APP_DIR, name) for name in ('query_budget.py', 'metrics.py', 'db.py')}
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))+\s*\)')
+_PARAM = re.compile(r'%\(\w+\)s|\$\d+')
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more SQL than its route's budget, or repeated one statement per row."""
+
+
+def query_budget(queries: int, repeats: Optional[int] = None):
+    """Declare the most SQL statements (and repeats of one shape) a view may run per request."""
+    def decorator(fn):
+        # functools.wraps in outer decorators carries these attributes up to the registered view
+        fn.query_budget = queries
+        fn.query_repeat_limit = repeats
+        return fn
+    return decorator
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with whitespace normalized and IN-lists of any length collapsed."""
+    shape = _SPACE.sub(' ', statement).strip()
+    shape = _PARAM.sub('?', shape)
+    return _IN_LIST.sub('(?, ...)', shape)
+
+
+def _template_line(frame) -> Optional[int]:
+    # Jinja's compiled modules carry "template_line=code_line&..." pairs as `debug_info`
+    debug_info = frame.f_globals.get('debug_info')
+    if not debug_info:
+        return None
+    line = None
+    for pair in debug_info.split('&'):
+        template_line, code_line = map(int, pair.split('='))
+        if code_line > frame.f_lineno:
+            break
+        line = template_line
+    return line
+
+
+def _relative(path: str) -> str:
+    return os.path.relpath(path, _ROOT) if path.startswith(_ROOT) else path
+
+
+def statement_origin(frame=None) -> Tuple[Optional[str], Optional[str]]:
+    """(innermost app code line, innermost template line) on the current stack."""
+    frame = frame or sys._getframe(1)
+    code_line = template = None
+    while frame is not None and (code_line is None or template is None):
+        filename = frame.f_code.co_filename
+        if template is None and filename.endswith(('.html', '.jinja', '.j2')):
+            line = _template_line(frame)
+            template = f'{_relative(filename)}:{line}' if line else _relative(filename)
+        elif (code_line is None and filename.startswith(_APP_DIR) and filename not in _SKIPPED_FILES):
+            code_line = f'{_relative(filename)}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return code_line, template
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    log = g.get('_query_log') if has_request_context() else None
+    if log is not None:
+        log.append((statement_shape(statement), *statement_origin()))
+
+
+def _limits() -> Tuple[int, int]:
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    repeats = getattr(view, 'query_repeat_limit', None)
+    if budget is None:
+        budget = current_app.config.get('QUERY_BUDGET_DEFAULT', DEFAULT_BUDGET)
+    if repeats is None:
+        repeats = current_app.config.get('QUERY_REPEAT_LIMIT', DEFAULT_REPEAT_LIMIT)
+    return budget, repeats
+
+
+def budget_report(log: List[tuple], budget: int, repeat_limit: int) -> Optional[str]:
+    """Human-readable violation report for one request's statements, or None."""
+    shapes = Counter(shape for shape, _, _ in log)
+    repeated = [(shape, n) for shape, n in shapes.most_common() if n > repeat_limit]
+    if len(log) <= budget and not repeated:
+        return None
+
+    origins: Dict[str, Counter] = {}
+    for shape, code_line, template in log:
+        where = ' <- '.join(filter(None, [template, code_line])) or 'unknown'
+        origins.setdefault(shape, Counter())[where] += 1
+
+    lines = [f'{request.method} {request.full_path.rstrip("?")} ({request.endpoint}): '
+             f'{len(log)} SQL statements, budget {budget}']
+    for shape, n in repeated:
+        lines.append(f'  repeated {n}x (limit {repeat_limit}): {shape[:200]}')
+        lines.extend(f'      {count}x at {where}' for where, count in origins[shape].most_common(3))
+    if len(log) > budget:
+        lines.append('  statements in order:')
+        for i, (shape, code_line, template) in enumerate(log, 1):
+            where = ' <- '.join(filter(None, [template, code_line])) or 'unknown'
+            lines.append(f'    {i:>3}. {shape[:160]}  [{where}]')
+    return '\n'.join(lines)
+
+
+def init_query_budget(app) -> None:
+    """Install the statement log and after-request check when QUERY_BUDGET_MODE isn't 'off'."""
+    mode = app.config.get('QUERY_BUDGET_MODE', 'off')
+    if mode not in MODES:
+        raise ValueError(f"QUERY_BUDGET_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    if mode == 'off':
+        return
+    if not event.contains(Engine, 'before_cursor_execute', _record_statement):
+        event.listen(Engine, 'before_cursor_execute', _record_statement)
+
+    @app.before_request
+    def _start_query_log():
+        g._query_log = []
+
+    @app.after_request
+    def _check_query_budget(response):
+        log = g.pop('_query_log', None)
+        if log is None or request.endpoint is None:
+            return response
+        report = budget_report(log, *_limits())
+        if report is None:
+            return response
+        if mode == 'raise':
+            raise QueryBudgetExceeded(report)
+        app.logger.warning('Query budget exceeded: %s', report)
+        return response
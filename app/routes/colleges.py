@@ -1,109 +1,292 @@
-from flask import Blueprint, render_template, request
+import json
+from typing import List, NamedTuple, Optional, Tuple
+
+from flask import Blueprint, current_app, render_template, request, jsonify
 from sqlalchemy import or_, and_
 from app.models import College
 from app import db
+from app.cache import TTLCache
+from app.facets import (
+    CONTROL_CODES, SELECTIVITY_BANDS, SIZE_BANDS, SPECIALTY_COLUMNS, band_condition, get_facet_index,
+)
+from app.export import EXPORT_FORMATS, export_response, id_batches, parse_columns, query_batches
+from app.pagination import decode_cursor, id_list_page, keyset_page
+from app.projections import EXPORTABLE_COLUMNS, PROJECTIONS, detail_query, project
+from app.query_budget import query_budget
+from app.geo import get_geo_index, parse_radius
+from app.http_cache import conditional, data_stamp, viewer_stamp
+from app.ml.similar import get_similar_index
+from app.search import search_college_ids, suggest_colleges
+from app.snapshot import data_version
+
+PER_PAGE = 7
+SIMILAR_COUNT = 6
+TYPEAHEAD_LIMIT = 10
+MAX_TYPEAHEAD_LIMIT = 25
+
+# Results this small are fetched by the ids the facet bitmaps matched
+FACET_ID_LOOKUP_LIMIT = 500
+
+# Query-string keys that select a page rather than a result set
+PAGING_ARGS = ('page', 'cursor')
+
+LISTING_ORDER = (College.undergrad_population.desc().nullslast(), College.id)
+
+# Exact listing totals per filter combination, dropped whenever the data version changes
+count_cache = TTLCache(maxsize=256, ttl=300)
 
 colleges_bp = Blueprint('colleges', __name__)
 
-@colleges_bp.route('/colleges')
-# College list route: displays filtered/paginated list of colleges
-def college_list():
+
+class CollegeFilters(NamedTuple):
+    query: object                  # College query with the column filters, unordered
+    applied: List[str]             # description of each filter applied
+    search_ids: Optional[list]     # every search match, best first; None without a search term
+    near_ids: Optional[list]       # colleges within the radius, None without a location
+    location: Optional[Tuple[float, float]]  # resolved `near` (lat, lon)
+
+    @property
+    def restricted(self) -> bool:
+        """Whether a search or location limits the results to an id set (not part of `query`)."""
+        return self.search_ids is not None or self.near_ids is not None
+
+
+def college_filters(args):
+    """
+    Filtered (unordered) College query for the /colleges query-string `args`.
+
+    Search matches and the proximity radius can be tens of thousands of ids, too many to bind
+    into SQL, so they're returned alongside the query instead of filtering it; `matching_ids`
+    applies them, with the column filters, through the facet bitmaps.
+    """
     query = College.query
     filters_applied = []
 
-    # Search by name
-    search = request.args.get('search', '').strip()
+    # Search by name (every match from the search index, best first)
+    search = args.get('search', '').strip()
+    ids = None
     if search:
-        query = query.filter(College.name.ilike(f"%{search}%"))
+        ids = search_college_ids(search)
         filters_applied.append(f"Search: {search}")
 
+    # Near a ZIP code or "lat,lon" (KD-tree radius query)
+    near = args.get('near', '').strip()
+    near_ids = location = None
+    if near:
+        geo = get_geo_index()
+        location = geo.locate(near)
+        if location is not None:
+            radius = parse_radius(args.get('radius'))
+            near_ids = geo.within(*location, radius)[0].tolist()
+            filters_applied.append(f"Near: {near} within {radius:g} miles")
+        else:
+            filters_applied.append(f"Near: {near} (location not found)")
+
     # State
-    state = request.args.get('state')
+    state = args.get('state')
     if state:
         query = query.filter(College.state == state)
         filters_applied.append(f"State: {state}")
 
     # Control type
-    control_map = {'public': 1, 'private': 2}
-    control_filters = request.args.getlist('control')
+    control_filters = args.getlist('control')
     if control_filters:
-        values = [control_map[c] for c in control_filters if c in control_map]
+        values = [CONTROL_CODES[c] for c in control_filters if c in CONTROL_CODES]
         query = query.filter(College.control.in_(values))
         filters_applied.append(f"Control: {control_filters}")
 
     # Max Cost of Attendance
-    max_cost = request.args.get('max_cost', type=float)
+    max_cost = args.get('max_cost', type=float)
     if max_cost is not None:
         query = query.filter(College.cost_of_attendance <= max_cost)
         filters_applied.append(f"Max Cost: {max_cost}")
 
     # Student Body Size
-    sizes = request.args.getlist('size')
-    size_conditions = []
-    for s in sizes:
-        if s == 'small':
-            size_conditions.append(College.undergrad_population < 5000)
-        elif s == 'medium':
-            size_conditions.append(College.undergrad_population.between(5000, 15000))
-        elif s == 'large':
-            size_conditions.append(College.undergrad_population > 15000)
+    sizes = args.getlist('size')
+    size_conditions = [
+        band_condition(College.undergrad_population, SIZE_BANDS[s]) for s in sizes if s in SIZE_BANDS
+    ]
     if size_conditions:
         query = query.filter(or_(*size_conditions))
         filters_applied.append(f"Size: {sizes}")
 
     # Specialties
-    specialty_map = {
-        'All-Women': College.is_women_only,
-        'All-Men': College.is_men_only,
-        'AANAPISI': College.is_annhi,
-        'HBCU': College.is_hbcu,
-        'NATIVE AMERICAN': College.is_tribal
-    }
-    specialties = request.args.getlist('specialties')
+    specialties = args.getlist('specialties')
     for spec in specialties:
-        column = specialty_map.get(spec)
+        column = SPECIALTY_COLUMNS.get(spec)
         if column is not None:
-            query = query.filter(column.is_(True))
+            query = query.filter(getattr(College, column).is_(True))
     if specialties:
         filters_applied.append(f"Specialties: {specialties}")
 
     # Selectivity by admission rate
-    selectivity_map = {
-        'Extremely Selective': College.admission_rate <= 0.10,
-        'Very Selective': College.admission_rate.between(0.10, 0.25),
-        'Selective': College.admission_rate.between(0.25, 0.50),
-        'Average': College.admission_rate.between(0.50, 0.75),
-        'Safety': College.admission_rate > 0.75
-    }
-    selectivity_levels = request.args.getlist('selectivity')
-    selectivity_filters = [selectivity_map[s] for s in selectivity_levels if s in selectivity_map]
+    selectivity_levels = args.getlist('selectivity')
+    selectivity_filters = [
+        band_condition(College.admission_rate, SELECTIVITY_BANDS[s])
+        for s in selectivity_levels if s in SELECTIVITY_BANDS
+    ]
     if selectivity_filters:
         query = query.filter(or_(*selectivity_filters))
         filters_applied.append(f"Selectivity: {selectivity_levels}")
 
     # Query Definition
     query = query.filter(College.undergrad_population.isnot(None))
-    query = query.order_by(College.undergrad_population.desc().nullslast())
-    
-    # Final Query
-    page = request.args.get('page', 1, type=int)
-    per_page = 7
-    colleges = query.paginate(page=page, per_page=per_page)
-
-    # Debug Output (for development only)
-    if filters_applied:
-        print("Filters applied:")
-        for f in filters_applied:
-            print(f"- {f}")
-        print(f"Total colleges returned: {len(colleges.items)}")
-
-    return render_template('colleges_list.html', colleges=colleges)
+    return CollegeFilters(query, filters_applied, ids, near_ids, location)
+
+
+def college_query(args):
+    """Column-filtered College query in listing order for the /colleges query-string `args`.
+
+    Returns the query and a description of each filter applied. Searches and locations aren't
+    part of it (see `college_filters`).
+    """
+    filters = college_filters(args)
+    return filters.query.order_by(*LISTING_ORDER), filters.applied
+
+
+def matching_ids(filters, facets):
+    """Every result id of a search or proximity listing: search rank order, else listing order."""
+    if filters.search_ids is not None:
+        return facets.select(filters.search_ids)
+    return facets.ordered_ids()
+
+
+def card_rows(ids):
+    """Card rows for `ids`, in that order (one query)."""
+    rows = {row.id: row for row in project(College.query.filter(College.id.in_(ids)), 'card')}
+    return [rows[i] for i in ids if i in rows]
+
+
+def _filter_key(args):
+    return tuple(sorted((k, tuple(v)) for k, v in args.lists() if k not in PAGING_ARGS))
+
+
+def _estimated_count(query):
+    """Planner row estimate for `query` (PostgreSQL only), or None."""
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    sql = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    plan = db.session.execute(db.text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def listing_total(query, args, facets=None):
+    """
+    Total result count for the listing per COLLEGE_LIST_COUNT: 'cached' (the facet bitmaps'
+    exact total, else an exact COUNT cached per filter combination and data version),
+    'estimate' (planner estimate on PostgreSQL, as 'cached' elsewhere) or 'off'. `query` is
+    None when it doesn't hold every filter (searches, locations); only the bitmaps count those.
+    Returns (total or None, is_estimate).
+    """
+    mode = current_app.config.get('COLLEGE_LIST_COUNT', 'cached')
+    if mode == 'off':
+        return None, False
+    if mode == 'estimate' and query is not None:
+        estimate = _estimated_count(query)
+        if estimate is not None:
+            return estimate, True
+    if facets is not None:
+        return facets.total, False
+
+    count_cache.bind_version(data_version())
+    key = _filter_key(args)
+    total = count_cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        count_cache.set(key, total)
+    return total, False
+
+
+def college_page(args):
+    """
+    One page of the /colleges listing. Ordinary listings are keyset-paginated on
+    (undergrad_population, id) via `cursor`. Searches (in rank order) and proximity listings
+    page by position through their full match list from the facet bitmaps, and only the page's
+    ids are queried. A bare `page=N` (old links) still lands on the same page.
+
+    Returns the page, the facet counts for the sidebar and the `CollegeFilters`.
+    """
+    filters = college_filters(args)
+    query = filters.query
+    cursor = decode_cursor(args.get('cursor'))
+    page = args.get('page', 1, type=int)
+    facets = get_facet_index().evaluate(args, search_ids=filters.search_ids, near_ids=filters.near_ids)
+
+    if filters.restricted:
+        colleges = id_list_page(matching_ids(filters, facets), card_rows, PER_PAGE, cursor=cursor, page=page)
+    else:
+        # A narrow filter combination is cheaper to fetch by primary key than to scan for
+        page_query = query
+        if facets.total <= FACET_ID_LOOKUP_LIMIT:
+            page_query = College.query.filter(College.id.in_(facets.ids()))
+        colleges = keyset_page(project(page_query, 'card'), College.undergrad_population, College.id, PER_PAGE,
+                               cursor=cursor, page=page)
+    colleges.total, colleges.estimated = listing_total(None if filters.restricted else query, args, facets)
+    return colleges, facets.counts, filters
+
+
+@colleges_bp.route('/colleges')
+@conditional(data_stamp, viewer_stamp, shared=True)
+@query_budget(3)
+# College list route: displays filtered/paginated list of colleges
+def college_list():
+    colleges, facet_counts, filters = college_page(request.args)
+
+    if filters.applied:
+        current_app.logger.debug("Filters applied: %s; %d colleges on this page",
+                                 "; ".join(filters.applied), len(colleges.items))
+
+    # Filters carried over into the Previous/Next links
+    base_args = {k: v for k, v in request.args.lists() if k not in PAGING_ARGS}
+    return render_template('colleges_list.html', colleges=colleges, facet_counts=facet_counts,
+                           location=filters.location, base_args=base_args)
+
+@colleges_bp.route('/api/colleges/search', methods=['GET'])
+@conditional(data_stamp, shared=True)
+@query_budget(1)
+# Typeahead suggestions for the college search box (JSON)
+def api_college_search():
+    q = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', TYPEAHEAD_LIMIT, type=int), 1), MAX_TYPEAHEAD_LIMIT)
+    return jsonify({'query': q, 'results': suggest_colleges(q, limit) if q else []})
+
+@colleges_bp.route('/api/colleges/export', methods=['GET'])
+@conditional(data_stamp, shared=True)
+@query_budget(2)
+# Whole filtered /colleges result set as CSV or NDJSON (?format=, ?columns=), streamed in batches
+def api_college_export():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        columns = parse_columns(request.args.get('columns'), EXPORTABLE_COLUMNS, PROJECTIONS['export'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filters = college_filters(request.args)
+    query = filters.query.with_entities(*[getattr(College, c) for c in columns])
+    if filters.restricted:
+        facets = get_facet_index().evaluate(request.args, search_ids=filters.search_ids,
+                                            near_ids=filters.near_ids)
+        batches = id_batches(query, College.id, matching_ids(filters, facets))
+    else:
+        batches = query_batches(query.order_by(*LISTING_ORDER))
+    return export_response(columns, batches, fmt, 'colleges')
 
 @colleges_bp.route('/college/<int:college_id>', endpoint='college_detail')
+@conditional(data_stamp, viewer_stamp, shared=True)
+@query_budget(3)
 # College detail route: displays details for a specific college
 def college_detail(college_id):
-    college = College.query.get_or_404(college_id)
-    return render_template('college_detail.html', college=college)
+    college = detail_query().get_or_404(college_id)
+    return render_template('college_detail.html', college=college, similar=similar_colleges(college.id))
+
+
+def similar_colleges(college_id, k=SIMILAR_COUNT):
+    """Card rows of the `k` schools most like `college_id`, from the precomputed neighbour table."""
+    ids = get_similar_index().similar(college_id, k)
+    return card_rows(ids) if ids else []
 
 
 
@@ -1,16 +1,55 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy import and_, bindparam, func, tuple_
 from app.db import db
+from app.http_cache import (
+    conditional, data_stamp, list_owner_stamp, touch_lists, user_lists_stamp, viewer_stamp,
+)
 from app.models import CollegeList, CollegeListEntry, College
+from app.projections import project
+from app.query_budget import query_budget
 
 lists_bp = Blueprint('lists', __name__)
 
+# Most operations accepted by one /api/lists/batch request
+MAX_BATCH_OPERATIONS = 500
+BATCH_OPS = ('add', 'remove', 'rename', 'annotate')
+
 @lists_bp.route('/my-lists')
 @login_required
+@conditional(user_lists_stamp, viewer_stamp)
+@query_budget(3)
 # Display all lists for the current user in the UI
 def my_lists():
     lists = CollegeList.query.filter_by(user_id=current_user.id).all()
-    return render_template('my_lists.html', lists=lists)
+    return render_template('my_lists.html', lists=lists, counts=list_counts(current_user.id))
+
+
+def list_counts(user_id):
+    """Number of colleges in each of the user's lists, from one grouped query."""
+    rows = (
+        db.session.query(CollegeListEntry.list_id, func.count(CollegeListEntry.id))
+        .join(CollegeList, CollegeList.id == CollegeListEntry.list_id)
+        .filter(CollegeList.user_id == user_id)
+        .group_by(CollegeListEntry.list_id)
+    )
+    return dict(rows.all())
+
+
+def list_colleges(list_id):
+    """The list's colleges (card rows) in the order they were added, in one joined query."""
+    return (
+        project(College.query, 'card')
+        .join(CollegeListEntry, CollegeListEntry.college_id == College.id)
+        .filter(CollegeListEntry.list_id == list_id)
+        .order_by(CollegeListEntry.id)
+        .all()
+    )
+
+
+def _list_owner(list_id):
+    """Owner of `list_id` as a scalar subquery, for `touch_lists`."""
+    return db.session.query(CollegeList.user_id).filter(CollegeList.id == list_id).scalar_subquery()
 
 @lists_bp.route('/lists/create', methods=['POST'])
 @login_required
@@ -22,13 +61,16 @@ def create_list():
         return redirect(url_for('lists.my_lists'))
     new_list = CollegeList(name=name, user_id=current_user.id)
     db.session.add(new_list)
+    touch_lists(current_user.id)
     db.session.commit()
     return redirect(url_for('lists.my_lists'))
 
 @lists_bp.route('/lists/<int:list_id>')
+@conditional(data_stamp, list_owner_stamp, viewer_stamp)
+@query_budget(4)
 def list_detail(list_id):
     college_list = CollegeList.query.get_or_404(list_id)
-    colleges = [College.query.get(entry.college_id) for entry in college_list.colleges]
+    colleges = list_colleges(list_id)
     return render_template('list_detail.html', college_list=college_list, colleges=colleges)
 
 @lists_bp.route('/lists/<int:list_id>/add', methods=['POST'])
@@ -39,9 +81,11 @@ def add_to_list(list_id):
     if not college_id:
         flash('college_id required', 'error')
         return redirect(url_for('lists.my_lists'))
-    entry = CollegeListEntry(list_id=list_id, college_id=college_id)
-    db.session.add(entry)
-    db.session.commit()
+    if not CollegeListEntry.query.filter_by(list_id=list_id, college_id=college_id).first():
+        entry = CollegeListEntry(list_id=list_id, college_id=college_id)
+        db.session.add(entry)
+        touch_lists(_list_owner(list_id))
+        db.session.commit()
     return redirect(url_for('lists.my_lists'))
 
 ############################################################
@@ -51,13 +95,21 @@ def add_to_list(list_id):
 # Get all lists and their colleges for the current user (AJAX)
 @lists_bp.route('/api/lists', methods=['GET'])
 @login_required
+@conditional(user_lists_stamp)
+@query_budget(3)
 def api_get_lists():
     lists = CollegeList.query.filter_by(user_id=current_user.id).all()
-    result = []
-    for l in lists:
-        colleges = [entry.college_id for entry in l.colleges]
-        result.append({'id': l.id, 'name': l.name, 'colleges': colleges})
-    return jsonify(result)
+    # Every entry of every list in one query, grouped here
+    entries = (
+        db.session.query(CollegeListEntry.list_id, CollegeListEntry.college_id)
+        .join(CollegeList, CollegeList.id == CollegeListEntry.list_id)
+        .filter(CollegeList.user_id == current_user.id)
+        .order_by(CollegeListEntry.id)
+    )
+    colleges = {l.id: [] for l in lists}
+    for list_id, college_id in entries:
+        colleges[list_id].append(college_id)
+    return jsonify([{'id': l.id, 'name': l.name, 'colleges': colleges[l.id]} for l in lists])
 
 # Create a new list for the current user (AJAX)
 @lists_bp.route('/api/lists', methods=['POST'])
@@ -69,6 +121,7 @@ def api_create_list():
         return jsonify({'error': 'List name required'}), 400
     new_list = CollegeList(name=name, user_id=current_user.id)
     db.session.add(new_list)
+    touch_lists(current_user.id)
     db.session.commit()
     return jsonify({'id': new_list.id, 'name': new_list.name})
 
@@ -82,6 +135,7 @@ def api_rename_list(list_id):
     if not clist:
         return jsonify({'error': 'List not found'}), 404
     clist.name = name
+    touch_lists(current_user.id)
     db.session.commit()
     return jsonify({'id': clist.id, 'name': clist.name})
 
@@ -93,6 +147,7 @@ def api_delete_list(list_id):
     if not clist:
         return jsonify({'error': 'List not found'}), 404
     db.session.delete(clist)
+    touch_lists(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -111,6 +166,7 @@ def api_add_college_to_list(list_id):
         return jsonify({'error': 'College already in list'}), 400
     new_entry = CollegeListEntry(list_id=list_id, college_id=college_id)
     db.session.add(new_entry)
+    touch_lists(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -122,9 +178,148 @@ def api_remove_college_from_list(list_id, college_id):
     if not entry:
         return jsonify({'error': 'Entry not found'}), 404
     db.session.delete(entry)
+    touch_lists(_list_owner(list_id))
     db.session.commit()
     return jsonify({'success': True})
 
+# Apply many list changes in one transaction (AJAX)
+@lists_bp.route('/api/lists/batch', methods=['POST'])
+@login_required
+@query_budget(8)
+def api_lists_batch():
+    """
+    Body: {"operations": [...]}, each one of
+        {"op": "add", "list_id": 1, "college_ids": [...], "notes": "..."}   (notes optional)
+        {"op": "remove", "list_id": 1, "college_ids": [...]}
+        {"op": "rename", "list_id": 1, "name": "..."}
+        {"op": "annotate", "list_id": 1, "college_id": 5, "notes": "..."}
+    Operations apply in order; list ownership, colleges and existing entries are each checked
+    with one query up front, and everything is committed once. Returns one result per
+    operation: {"ok": true, ...} or {"error": "..."}.
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'operations must be a non-empty list'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+    try:
+        ops = [_parse_batch_op(op) for op in operations]
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid operation: {e}'}), 400
+
+    list_ids = {op['list_id'] for op in ops}
+    college_ids = {c for op in ops for c in op.get('college_ids', ())}
+    lists = {
+        l.id: l for l in CollegeList.query.filter(
+            CollegeList.id.in_(list_ids), CollegeList.user_id == current_user.id
+        )
+    }
+    colleges = {
+        c for (c,) in db.session.query(College.id).filter(College.id.in_(college_ids))
+    } if college_ids else set()
+    initial = set()
+    if lists and college_ids:
+        initial = set(
+            db.session.query(CollegeListEntry.list_id, CollegeListEntry.college_id)
+            .filter(CollegeListEntry.list_id.in_(lists), CollegeListEntry.college_id.in_(college_ids))
+        )
+
+    pairs = set(initial)
+    # Existing entries removed by an earlier operation: re-adding one makes a fresh row
+    removed = set()
+    notes = {}
+    results = []
+    for op in ops:
+        clist = lists.get(op['list_id'])
+        if clist is None:
+            results.append({'error': 'List not found'})
+            continue
+        kind = op['op']
+        if kind == 'rename':
+            clist.name = op['name']
+            results.append({'ok': True, 'id': clist.id, 'name': clist.name})
+        elif kind == 'add':
+            added, present, missing = [], [], []
+            for college_id in op['college_ids']:
+                pair = (clist.id, college_id)
+                if college_id not in colleges:
+                    missing.append(college_id)
+                elif pair in pairs:
+                    present.append(college_id)
+                else:
+                    pairs.add(pair)
+                    added.append(college_id)
+                    if op.get('notes') is not None:
+                        notes[pair] = op['notes']
+            results.append({'ok': True, 'added': added, 'already_in_list': present, 'not_found': missing})
+        elif kind == 'remove':
+            dropped, missing = [], []
+            for college_id in op['college_ids']:
+                pair = (clist.id, college_id)
+                if pair in pairs:
+                    pairs.discard(pair)
+                    notes.pop(pair, None)
+                    if pair in initial:
+                        removed.add(pair)
+                    dropped.append(college_id)
+                else:
+                    missing.append(college_id)
+            results.append({'ok': True, 'removed': dropped, 'not_in_list': missing})
+        else:
+            pair = (clist.id, op['college_ids'][0])
+            if pair not in pairs:
+                results.append({'error': 'Entry not found'})
+                continue
+            notes[pair] = op['notes']
+            results.append({'ok': True})
+
+    table = CollegeListEntry.__table__
+    # Removed and added back: delete the old row and insert a new one, as the operations would one by one
+    replaced = removed & pairs
+    inserts = (pairs - initial) | replaced
+    deletes = (initial - pairs) | replaced
+    updates = [pair for pair in notes if pair not in inserts]
+    if deletes:
+        db.session.execute(table.delete().where(
+            tuple_(table.c.list_id, table.c.college_id).in_(sorted(deletes))
+        ))
+    if inserts:
+        db.session.execute(table.insert(), [
+            {'list_id': l, 'college_id': c, 'notes': notes.get((l, c))} for l, c in sorted(inserts)
+        ])
+    if updates:
+        db.session.execute(
+            table.update()
+            .where(and_(table.c.list_id == bindparam('l'), table.c.college_id == bindparam('c')))
+            .values(notes=bindparam('n')),
+            [{'l': l, 'c': c, 'n': notes[(l, c)]} for l, c in updates],
+        )
+    if any('ok' in r for r in results):
+        touch_lists(current_user.id)
+    db.session.commit()
+    return jsonify({'results': results})
+
+
+def _parse_batch_op(op):
+    kind = op.get('op')
+    if kind not in BATCH_OPS:
+        raise ValueError(f"op must be one of {', '.join(BATCH_OPS)}")
+    parsed = {'op': kind, 'list_id': int(op['list_id'])}
+    if kind == 'rename':
+        name = str(op.get('name') or '').strip()
+        if not name:
+            raise ValueError('List name required')
+        parsed['name'] = name
+    elif kind == 'annotate':
+        parsed['college_ids'] = [int(op['college_id'])]
+        parsed['notes'] = None if op.get('notes') is None else str(op['notes'])
+    else:
+        parsed['college_ids'] = [int(c) for c in op.get('college_ids') or []]
+        if kind == 'add' and op.get('notes') is not None:
+            parsed['notes'] = str(op['notes'])
+    return parsed
+
 #list details bp
 @lists_bp.route('/lists/<int:list_id>/remove', methods=['POST'])
 @login_required
@@ -135,11 +330,15 @@ def remove_colleges(list_id):
     if not college_ids:
         flash('No colleges selected for removal.', 'error')
         return redirect(url_for('lists.list_detail', list_id=list_id))
-    for college_id in college_ids:
-        entry = next((e for e in college_list.colleges if e.college_id == int(college_id)), None)
-        if entry:
-            db.session.delete(entry)
+    ids = {int(c) for c in college_ids if c.isdigit()}
+    removed = (
+        CollegeListEntry.query
+        .filter(CollegeListEntry.list_id == college_list.id, CollegeListEntry.college_id.in_(ids))
+        .delete(synchronize_session=False)
+    )
+    if removed:
+        touch_lists(college_list.user_id)
     db.session.commit()
-    flash(f'Removed {len(college_ids)} college(s) from the list.', 'success')
+    flash(f'Removed {removed} college(s) from the list.', 'success')
     return redirect(url_for('lists.list_detail', list_id=list_id))
 
@@ -1,10 +1,52 @@
 # app/routes/main.py
-from flask import Blueprint, render_template
+import hmac
+
+from flask import Blueprint, Response, render_template, jsonify, abort, current_app, request
+from flask_login import login_required, current_user
+from app.http_cache import conditional_stats
+from app import metrics
+from app.query_budget import query_budget
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
+@query_budget(1)
 # Home route: renders the landing page
 def home():
     return render_template('home.html')
 
+@main_bp.route('/api/http-cache', methods=['GET'])
+@login_required
+# Conditional GET counters per endpoint (admins only)
+def http_cache_stats():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify(conditional_stats.stats())
+
+
+def _metrics_allowed():
+    # A scraper sends METRICS_TOKEN as a bearer token; signed-in admins may look too
+    token = current_app.config.get('METRICS_TOKEN')
+    auth = request.headers.get('Authorization', '')
+    if token and auth.startswith('Bearer ') and hmac.compare_digest(auth[7:].encode(), token.encode()):
+        return True
+    return current_user.is_authenticated and current_user.is_admin
+
+
+@main_bp.route('/metrics', methods=['GET'])
+# Prometheus scrape endpoint for this worker's request, SQL and recommender metrics
+def prometheus_metrics():
+    if not _metrics_allowed():
+        abort(403)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@main_bp.route('/metrics/profiles/<profile_id>', methods=['GET'])
+# Collapsed stacks of one profiled request (see X-Profile in app/metrics.py)
+def request_profile(profile_id):
+    if not _metrics_allowed():
+        abort(403)
+    folded = metrics.get_profile(profile_id)
+    if folded is None:
+        abort(404)
+    return Response(folded, mimetype='text/plain')
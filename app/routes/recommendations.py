@@ -1,17 +1,65 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, jsonify, abort, current_app
 from flask_login import login_required, current_user
+from itsdangerous import BadSignature, URLSafeSerializer
 from app.models import CollegeList
-from app.ml.recommendations import recommend_colleges_filtered
-from flask import current_app
+from app.export import EXPORT_BATCH_SIZE, EXPORT_FORMATS, export_response, parse_columns
+from app.query_budget import query_budget
+from app.ml.recommendations import (
+    META_ALIASES,
+    canonical_request,
+    json_records,
+    profile_cache,
+    profile_params,
+    ranking_batches,
+    result_cache,
+)
+from app.ml.pool import (
+    RETRY_AFTER_SECONDS,
+    RecommenderBusy,
+    RecommenderTimeout,
+    recommend_batch_pooled,
+    recommend_pooled,
+    recommendation_pool,
+)
 
 recommendations_bp = Blueprint('recommendations', __name__)
 
+PRIORITY_KEYS = ['academics', 'value', 'professors', 'diversity', 'urbanicity', 'campus', 'prestige']
+TOP_N = 12
+MAX_BATCH_TOP_N = 100
+
+
+def _profile_serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='recommendation-profile')
+
+
+def profile_handle(params):
+    """Opaque, signed handle for the weight-independent part of a request.
+
+    The handle carries the profile itself, so any worker can rebuild the cached
+    population if the one that served the form didn't keep it.
+    """
+    return _profile_serializer().dumps(profile_params(params))
+
+
+def overload_response(e):
+    """JSON 503 (pool saturated) or 504 (timed out), with a Retry-After hint."""
+    if isinstance(e, RecommenderBusy):
+        body, status = {'error': 'The recommender is busy, please retry shortly'}, 503
+    else:
+        body, status = {'error': 'The recommendation took too long, please retry shortly'}, 504
+    return jsonify(body), status, {'Retry-After': str(RETRY_AFTER_SECONDS)}
+
+
 @recommendations_bp.route('/recommendations', methods=['GET', 'POST'])
 @login_required
+@query_budget(2)
 # Recommendations route: handles form input and displays recommended colleges
 def get_recommendations():
     user_lists = CollegeList.query.filter_by(user_id=current_user.id).all()
     results = []
+    handle = error = None
+    status, headers = 200, {}
     if request.method == 'POST':
         states_raw = request.form.get('states', '')
         states = [s.strip().upper() for s in states_raw.split(',') if s.strip()]
@@ -19,17 +67,138 @@ def get_recommendations():
         user_act = request.form.get('act', type=int)
         user_gpa = request.form.get('gpa', type=float)
         user_cost = request.form.get('cost', type=int)
-        priorities = {
-            'academics': float(request.form.get('academics', 0) or 0),
-            'value': float(request.form.get('value', 0) or 0),
-            'professors': float(request.form.get('professors', 0) or 0),
-            'diversity': float(request.form.get('diversity', 0) or 0),
-            'urbanicity': float(request.form.get('urbanicity', 0) or 0),
-            'campus': float(request.form.get('campus', 0) or 0),
-            'prestige': float(request.form.get('prestige', 0) or 0),
-        }
-        data_path = current_app.config.get('COLLEGE_DATA_PATH', 'data/college_data_filtered.csv')
-        results = recommend_colleges_filtered(
-            data_path, states, user_sat, user_act, user_gpa, priorities, user_cost=user_cost, top_n=12
-        ).to_dict('records')
-    return render_template('recommendations.html', user_lists=user_lists, results=results)
\ No newline at end of file
+        priorities = {k: float(request.form.get(k, 0) or 0) for k in PRIORITY_KEYS}
+        home_zip = request.form.get('home_zip', '').strip() or None
+        radius = request.form.get('radius', type=float) if home_zip else None
+        params = canonical_request(
+            states=states, user_sat=user_sat, user_act=user_act, user_gpa=user_gpa,
+            user_priorities=priorities, user_cost=user_cost, home_zip=home_zip, radius_miles=radius
+        )
+        try:
+            results = recommend_pooled(top_n=TOP_N, **params)
+            handle = profile_handle(params)
+        except ValueError as e:
+            error = str(e)
+        except (RecommenderBusy, RecommenderTimeout) as e:
+            error = 'The recommender is busy right now. Please submit again in a few seconds.'
+            status = 503 if isinstance(e, RecommenderBusy) else 504
+            headers = {'Retry-After': str(RETRY_AFTER_SECONDS)}
+    return render_template('recommendations.html', user_lists=user_lists, results=results, handle=handle,
+                           error=error), status, headers
+
+@recommendations_bp.route('/api/recommendations/reweight', methods=['POST'])
+@login_required
+@query_budget(1)
+# Re-rank a previous result set on new slider weights (AJAX)
+def api_reweight():
+    data = request.get_json(silent=True) or {}
+    try:
+        profile = _profile_serializer().loads(data.get('handle', ''))
+    except BadSignature:
+        return jsonify({'error': 'Invalid or expired handle'}), 400
+    raw = data.get('priorities') or {}
+    try:
+        priorities = {k: float(raw.get(k, 0) or 0) for k in PRIORITY_KEYS}
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Priorities must be numbers'}), 400
+    try:
+        results = recommend_pooled(top_n=TOP_N, user_priorities=priorities, **profile)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except (RecommenderBusy, RecommenderTimeout) as e:
+        return overload_response(e)
+    return jsonify({'handle': data['handle'], 'results': json_records(results)})
+
+def _optional_number(value, cast):
+    if value is None or value == '':
+        return None
+    return cast(value)
+
+
+def _optional_location(value):
+    if value is None:
+        return None
+    lat, lon = (float(v) for v in value)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('home must be [latitude, longitude]')
+    return [lat, lon]
+
+
+def parse_profile(data):
+    """
+    Recommender kwargs from one JSON profile (same fields as the form; states may be a list,
+    and `home` may be given as [lat, lon] instead of `home_zip`).
+    """
+    states = data.get('states') or []
+    if isinstance(states, str):
+        states = states.split(',')
+    priorities = data.get('priorities')
+    if priorities is not None:
+        priorities = {k: float(priorities.get(k, 0) or 0) for k in PRIORITY_KEYS}
+    return {
+        'states': [str(s).strip().upper() for s in states if str(s).strip()],
+        'user_sat': _optional_number(data.get('sat'), int),
+        'user_act': _optional_number(data.get('act'), int),
+        'user_gpa': _optional_number(data.get('gpa'), float),
+        'user_cost': _optional_number(data.get('cost'), int),
+        'user_priorities': priorities,
+        'home': _optional_location(data.get('home')),
+        'home_zip': _optional_number(data.get('home_zip'), str),
+        'radius_miles': _optional_number(data.get('radius'), float),
+    }
+
+@recommendations_bp.route('/api/recommendations/batch', methods=['POST'])
+@login_required
+@query_budget(1)
+# Score a whole cohort of student profiles in one request
+def api_recommend_batch():
+    data = request.get_json(silent=True) or {}
+    raw_profiles = data.get('profiles')
+    if not isinstance(raw_profiles, list) or not raw_profiles:
+        return jsonify({'error': 'profiles must be a non-empty list'}), 400
+    limit = current_app.config.get('RECOMMENDATION_BATCH_LIMIT', 1000)
+    if len(raw_profiles) > limit:
+        return jsonify({'error': f'At most {limit} profiles per batch'}), 400
+    try:
+        top_n = min(max(int(data.get('top_n', TOP_N)), 1), MAX_BATCH_TOP_N)
+        profiles = [parse_profile(p) for p in raw_profiles]
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'error': 'Invalid profile fields'}), 400
+    try:
+        results = recommend_batch_pooled(profiles, top_n=top_n)
+    except (RecommenderBusy, RecommenderTimeout) as e:
+        return overload_response(e)
+    return jsonify({'results': [
+        {'results': json_records(r['results'])} if 'results' in r else r for r in results
+    ]})
+
+@recommendations_bp.route('/api/recommendations/export', methods=['POST'])
+@login_required
+@query_budget(1)
+# Full ranking for one JSON profile as CSV or NDJSON (?format=, ?columns=), streamed in batches
+def api_recommendations_export():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        params = parse_profile(request.get_json(silent=True) or {})
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'error': 'Invalid profile fields'}), 400
+    try:
+        keys, batches = ranking_batches(EXPORT_BATCH_SIZE, **params)
+        # The uppercase aliases only exist for the templates
+        default = [k for k in keys if k not in META_ALIASES.values()]
+        columns = parse_columns(request.args.get('columns'), keys, default)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = ([tuple(r[c] for c in columns) for r in records] for records in batches)
+    return export_response(columns, rows, fmt, 'recommendations')
+
+@recommendations_bp.route('/api/recommendations/cache', methods=['GET'])
+@login_required
+# Recommendation cache counters (admins only)
+def recommendation_cache_stats():
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify({'results': result_cache.stats(), 'profiles': profile_cache.stats(),
+                    'pool': recommendation_pool.stats()})
@@ -0,0 +1,454 @@
+"""
+College name search for the /colleges search box and the typeahead endpoint.
+
+Three backends, chosen with `SEARCH_BACKEND`:
+
+- `memory` (default): an in-process inverted index over name, city and alias tokens,
+  rebuilt whenever the College data version changes. Whole-token and prefix matches come
+  from a sorted vocabulary, typos from a trigram index over the vocabulary (confirmed with
+  a bounded edit distance), and results are ranked by match quality with a small boost for
+  larger schools. Aliases are generated acronyms ("mit", "ucla") plus a few common
+  nicknames.
+- `postgres`: pg_trgm word similarity over `college.name`/`college.city` (GIN indexes from
+  the migrations).
+- `sqlite`: an FTS5 table over name and city with prefix queries. It has no typo tolerance
+  and is meant for local development.
+
+Every backend returns College ids best first: the top `limit` for the typeahead, every match
+(`limit=None`) for the /colleges search box, whose listing pages through them.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from app.db import db
+from app.models import College
+from app.snapshot import data_version, get_snapshot
+
+DEFAULT_BACKEND = 'memory'
+DEFAULT_LIMIT = 10
+
+STOPWORDS = {'of', 'the', 'at', 'and', 'in', 'for', 'a', 'an', 'de', 'la'}
+
+# Nicknames that acronyms don't produce, keyed on the normalized Scorecard name
+ALIASES: Dict[str, List[str]] = {
+    'university of pennsylvania': ['upenn', 'penn'],
+    'california institute of technology': ['caltech'],
+    'georgia institute of technology main campus': ['georgia tech', 'gatech'],
+    'virginia polytechnic institute and state university': ['virginia tech'],
+    'university of michigan ann arbor': ['umich'],
+    'the university of texas at austin': ['ut austin'],
+    'louisiana state university and agricultural and mechanical college': ['lsu'],
+    'texas a and m university college station': ['tamu'],
+    'university of wisconsin madison': ['uw madison'],
+    'university of illinois urbana champaign': ['uiuc'],
+}
+
+# Relative weight of a token match by field
+NAME, ALIAS, CITY = 1.0, 1.0, 0.5
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.6
+PRIOR_WEIGHT = 0.15
+MAX_FUZZY_CANDIDATES = 64
+
+
+# ---- Text normalization
+
+def normalize(value: Optional[str]) -> str:
+    """Lowercase ASCII words separated by single spaces ('&' becomes 'and')."""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
+    value = value.lower().replace('&', ' and ')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', value).split())
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return normalize(value).split()
+
+
+def acronyms(name: str) -> List[str]:
+    """Initials of the significant words, for the full name and for the part before a '-'."""
+    out = []
+    for part in (name, name.split('-')[0]):
+        words = [w for w in tokenize(part) if w not in STOPWORDS]
+        if len(words) >= 2:
+            out.append(''.join(w[0] for w in words))
+    return list(dict.fromkeys(out))
+
+
+def trigrams(token: str) -> List[str]:
+    padded = f'  {token} '
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance counting an adjacent transposition as one edit (optimal string alignment),
+    giving up (returning limit + 1) once it must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            d = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                d = min(d, before[j - 2] + 1)
+            current.append(d)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def typo_limit(token: str) -> int:
+    return 1 if len(token) <= 7 else 2
+
+
+# ---- In-memory index
+
+class SearchIndex:
+    """
+    Inverted token index over College names, aliases and cities.
+
+    Postings are stored CSR-style in vocabulary order (`offsets` into `post_docs` /
+    `post_weights`), so every token sharing a prefix is one contiguous slice and a query
+    word is scored for all documents with a few array operations.
+    """
+
+    def __init__(self, ids: Sequence[int], names: Sequence[str], cities: Sequence[str],
+                 states: Sequence[str], populations: Sequence[float], version: Optional[str] = None):
+        self.version = version
+        self.ids = [int(i) for i in ids]
+        self.names = [str(n or '') for n in names]
+        self.cities = [str(c or '') for c in cities]
+        self.states = [str(s or '') for s in states]
+        self.norm_names = [normalize(n) for n in self.names]
+
+        pop = np.array([p if p is not None else np.nan for p in populations], dtype=np.float64)
+        logs = np.log1p(np.clip(np.nan_to_num(pop, nan=0.0), 0, None))
+        top = logs.max() if len(logs) and logs.max() > 0 else 1.0
+        self.prior = PRIOR_WEIGHT * logs / top
+
+        postings: Dict[str, Dict[int, float]] = {}
+        self.phrases: Dict[str, List[int]] = {}
+
+        def add(token: str, doc: int, weight: float) -> None:
+            docs = postings.setdefault(token, {})
+            if docs.get(doc, 0.0) < weight:
+                docs[doc] = weight
+
+        for doc, (name, norm, city) in enumerate(zip(self.names, self.norm_names, self.cities)):
+            for token in norm.split():
+                add(token, doc, NAME)
+            for token in tokenize(city):
+                add(token, doc, CITY)
+            aliases = acronyms(name) + ALIASES.get(norm, [])
+            for alias in aliases:
+                for token in tokenize(alias):
+                    add(token, doc, ALIAS)
+            for phrase in [norm] + [normalize(a) for a in aliases]:
+                self.phrases.setdefault(phrase, []).append(doc)
+
+        self.vocab = sorted(postings)
+        self._token_id = {t: i for i, t in enumerate(self.vocab)}
+        docs, weights, lengths, offsets = [], [], [], [0]
+        for token in self.vocab:
+            p = postings[token]
+            docs.extend(p.keys())
+            weights.extend(p.values())
+            lengths.extend([len(token)] * len(p))
+            offsets.append(len(docs))
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.post_docs = np.array(docs, dtype=np.int64)
+        self.post_weights = np.array(weights, dtype=np.float64)
+        self.post_lengths = np.array(lengths, dtype=np.float64)
+
+        grams: Dict[str, List[int]] = {}
+        for tid, token in enumerate(self.vocab):
+            for gram in trigrams(token):
+                grams.setdefault(gram, []).append(tid)
+        self.grams = grams
+
+        # Leading-phrase lookups and the substring fallback
+        order = sorted(range(len(self.norm_names)), key=self.norm_names.__getitem__)
+        self._sorted_names = [self.norm_names[d] for d in order]
+        self._sorted_docs = np.array(order, dtype=np.int64)
+        self._haystack = '\n'.join(self.norm_names)
+        self._line_starts = []
+        pos = 0
+        for name in self.norm_names:
+            self._line_starts.append(pos)
+            pos += len(name) + 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---- Token matching
+
+    def _prefix_range(self, token: str) -> Tuple[int, int]:
+        lo = bisect_left(self.vocab, token)
+        return lo, bisect_left(self.vocab, token + '\x7f', lo)
+
+    def _fuzzy_ids(self, token: str, prefix: bool) -> List[Tuple[int, float]]:
+        """Vocabulary tokens within a small edit distance of `token` (of its prefix when typing)."""
+        grams = trigrams(token)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.grams.get(gram, ()))
+        limit = typo_limit(token)
+        # One edit changes at most three trigrams, so a close token shares most of them
+        needed = max(1, len(grams) - 3 * limit)
+        out = []
+        for tid, shared in counts.most_common(MAX_FUZZY_CANDIDATES):
+            if shared < needed:
+                break
+            candidate = self.vocab[tid]
+            if len(candidate) < len(token) - limit or (not prefix and len(candidate) > len(token) + limit):
+                continue
+            if prefix and len(candidate) > len(token):
+                dist = min(edit_distance(token, candidate, limit),
+                           edit_distance(token, candidate[:len(token)], limit))
+            else:
+                dist = edit_distance(token, candidate, limit)
+            if dist <= limit:
+                out.append((tid, 1.0 - dist / (len(token) + 1)))
+        return out
+
+    def _token_scores(self, token: str, last: bool) -> np.ndarray:
+        """Best match score of `token` against each document (0 where it doesn't match)."""
+        scores = np.zeros(len(self.ids))
+        exact = self._token_id.get(token)
+        # Prefix matches for the word being typed, and for longer earlier words
+        if last or len(token) >= 3:
+            lo, hi = self._prefix_range(token)
+        elif exact is not None:
+            lo, hi = exact, exact + 1
+        else:
+            lo = hi = 0
+        if hi > lo:
+            a, b = self.offsets[lo], self.offsets[hi]
+            lengths = self.post_lengths[a:b]
+            factor = np.where(lengths == len(token), EXACT, PREFIX * np.sqrt(len(token) / lengths))
+            np.maximum.at(scores, self.post_docs[a:b], self.post_weights[a:b] * factor)
+        elif len(token) >= 3:
+            for tid, similarity in self._fuzzy_ids(token, prefix=last):
+                a, b = self.offsets[tid], self.offsets[tid + 1]
+                np.maximum.at(scores, self.post_docs[a:b], self.post_weights[a:b] * (FUZZY * similarity))
+        return scores
+
+    def _substring_docs(self, fragment: str, skip: np.ndarray, wanted: int) -> List[int]:
+        found = []
+        starts = self._line_starts
+        pos = self._haystack.find(fragment)
+        while pos != -1 and len(found) < wanted:
+            doc = bisect_left(starts, pos + 1) - 1
+            if not skip[doc]:
+                found.append(doc)
+            nxt = starts[doc + 1] if doc + 1 < len(starts) else len(self._haystack)
+            pos = self._haystack.find(fragment, nxt)
+        return found
+
+    # ---- Queries
+
+    def search(self, query: str, limit: Optional[int] = DEFAULT_LIMIT) -> List[int]:
+        """Row positions of the best `limit` matches for `query` (all of them for None), best first."""
+        norm = normalize(query)
+        tokens = norm.split()
+        if not tokens or not self.ids:
+            return []
+        total = np.zeros(len(self.ids))
+        matched = np.ones(len(self.ids), dtype=bool)
+        for i, token in enumerate(tokens):
+            scores = self._token_scores(token, last=i == len(tokens) - 1)
+            # Every word of the query has to match something
+            matched &= scores > 0
+            total += scores
+            if not matched.any():
+                break
+
+        # Whole-name (or alias) and leading-phrase matches rank first
+        phrase_docs = self.phrases.get(norm)
+        if phrase_docs:
+            total[phrase_docs] += 1.0
+        lo = bisect_left(self._sorted_names, norm)
+        hi = bisect_left(self._sorted_names, norm + '\x7f', lo)
+        total[self._sorted_docs[lo:hi]] += 0.5
+
+        candidates = np.flatnonzero(matched)
+        wanted = len(self.ids) if limit is None else limit
+        if len(candidates) < wanted and len(norm) >= 3:
+            # Fall back to plain substring matches (e.g. a fragment inside a word)
+            extra = self._substring_docs(norm, matched, wanted - len(candidates))
+            if extra:
+                total[extra] = 0.1
+                candidates = np.concatenate([candidates, np.array(extra, dtype=np.int64)])
+
+        key = total[candidates] + self.prior[candidates]
+        if limit is not None and len(candidates) > limit:
+            top = np.argpartition(-key, limit - 1)[:limit]
+            candidates, key = candidates[top], key[top]
+        order = np.lexsort((candidates, -key))
+        return candidates[order].tolist()
+
+    def search_ids(self, query: str, limit: Optional[int] = DEFAULT_LIMIT) -> List[int]:
+        return [self.ids[doc] for doc in self.search(query, limit)]
+
+    def suggestions(self, query: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        return [
+            {'id': self.ids[d], 'name': self.names[d], 'city': self.cities[d], 'state': self.states[d]}
+            for d in self.search(query, limit)
+        ]
+
+
+def build_index(version: Optional[str] = None) -> SearchIndex:
+    """Index the current snapshot, or the College table when no snapshot is published."""
+    snapshot = get_snapshot()
+    columns = ['id', 'name', 'city', 'state', 'undergrad_population']
+    if snapshot is not None and snapshot.has_columns(columns):
+        return SearchIndex(*(snapshot[c].tolist() for c in columns), version=snapshot.version)
+    rows = db.session.query(*[getattr(College, c) for c in columns]).order_by(College.id).all()
+    return SearchIndex(*(list(col) for col in zip(*rows)) if rows else ([],) * 5, version=version)
+
+
+# ---- Backends
+
+class MemoryBackend:
+    name = 'memory'
+
+    def __init__(self):
+        self._index: Optional[SearchIndex] = None
+        self._lock = threading.Lock()
+
+    def index(self) -> SearchIndex:
+        version = data_version()
+        index = self._index
+        if index is None or index.version != version:
+            with self._lock:
+                index = self._index
+                if index is None or index.version != version:
+                    index = self._index = build_index(version)
+        return index
+
+    def search_ids(self, query: str, limit: Optional[int]) -> List[int]:
+        return self.index().search_ids(query, limit)
+
+    def suggestions(self, query: str, limit: int) -> List[dict]:
+        return self.index().suggestions(query, limit)
+
+
+class _DatabaseBackend:
+    def suggestions(self, query: str, limit: int) -> List[dict]:
+        ids = self.search_ids(query, limit)
+        if not ids:
+            return []
+        rows = db.session.query(College.id, College.name, College.city, College.state) \
+            .filter(College.id.in_(ids)).all()
+        by_id = {r.id: {'id': r.id, 'name': r.name, 'city': r.city, 'state': r.state} for r in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+
+class PostgresBackend(_DatabaseBackend):
+    """pg_trgm word similarity; `<%` and ILIKE are both served by the GIN trigram indexes."""
+    name = 'postgres'
+
+    SQL = text(
+        "SELECT id FROM college "
+        "WHERE :q <% name OR :q <% city OR name ILIKE :like "
+        "ORDER BY GREATEST(word_similarity(:q, name), 0.5 * word_similarity(:q, city)) DESC, "
+        "undergrad_population DESC NULLS LAST, id "
+        "LIMIT :limit"
+    )
+
+    def search_ids(self, query: str, limit: Optional[int]) -> List[int]:
+        query = query.strip()
+        if not query:
+            return []
+        like = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        # LIMIT NULL is LIMIT ALL
+        rows = db.session.execute(self.SQL, {'q': query, 'like': like, 'limit': limit})
+        return [r[0] for r in rows]
+
+
+class SqliteBackend(_DatabaseBackend):
+    """FTS5 table over name and city, rebuilt from `college` when the data version changes."""
+    name = 'sqlite'
+    TABLE = 'college_fts'
+
+    def __init__(self):
+        self._built_version: Optional[str] = None
+        self._built = False
+        self._lock = threading.Lock()
+
+    def ensure(self) -> None:
+        version = data_version()
+        if self._built and self._built_version == version:
+            return
+        with self._lock:
+            if self._built and self._built_version == version:
+                return
+            rebuild_fts()
+            self._built, self._built_version = True, version
+
+    def search_ids(self, query: str, limit: Optional[int]) -> List[int]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self.ensure()
+        match = ' '.join(f'"{t}"*' for t in tokens)
+        rows = db.session.execute(
+            text(f"SELECT rowid FROM {self.TABLE} WHERE {self.TABLE} MATCH :match "
+                 f"ORDER BY bm25({self.TABLE}, 1.0, 0.5) LIMIT :limit"),
+            {'match': match, 'limit': -1 if limit is None else limit},  # negative: no limit
+        )
+        return [r[0] for r in rows]
+
+
+def rebuild_fts() -> None:
+    """(Re)create the SQLite FTS5 table from the College rows."""
+    table = SqliteBackend.TABLE
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+        f"name, city, content='college', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ))
+    db.session.execute(text(f"INSERT INTO {table}({table}) VALUES('rebuild')"))
+    db.session.commit()
+
+
+BACKENDS = {'memory': MemoryBackend, 'postgres': PostgresBackend, 'sqlite': SqliteBackend}
+
+_backend = None
+
+
+def init_search(app) -> None:
+    """Pick the search backend from `SEARCH_BACKEND` (the index itself is built on first use)."""
+    global _backend
+    name = (app.config.get('SEARCH_BACKEND') or DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SEARCH_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    _backend = BACKENDS[name]()
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        _backend = MemoryBackend()
+    return _backend
+
+
+def search_college_ids(query: str, limit: Optional[int] = None) -> List[int]:
+    """College ids matching `query` (every match by default), best match first."""
+    return get_search_backend().search_ids(query, limit)
+
+
+def suggest_colleges(query: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+    """Typeahead suggestions ({id, name, city, state}) for `query`, best first."""
+    return get_search_backend().suggestions(query, limit)
@@ -0,0 +1,240 @@
+"""
+Versioned, memory-mapped columnar snapshot of the College table.
+
+`scripts/snapshot.py` (also run at the end of `scripts/load.py`) writes one `.npy` file per
+column into `<COLLEGE_SNAPSHOT_DIR>/<version>/` and then points `<COLLEGE_SNAPSHOT_DIR>/CURRENT`
+at it. Every worker memory-maps the current version read-only, so the pages are shared
+through the OS page cache instead of being copied into each process. Workers re-read
+`CURRENT` every few seconds and switch over when the loader publishes a new version.
+
+Layout:
+    CURRENT                 -> text file holding the active version name
+    <version>/manifest.json -> version, created_at, rows, {column: dtype}, {table: dtype}
+    <version>/<column>.npy  -> one array per column, rows ordered by College.id
+    <version>/<table>.npy   -> derived per-college tables (rows x k), same row order
+
+Numeric columns are float64 with NaN for NULL (booleans become 0/1). `id` and `unitid` are
+int64 (a NULL unitid is stored as 0). Text columns are fixed-width unicode with '' for NULL.
+The derived tables are the similar-schools neighbour ids and distances (`app/ml/similar.py`),
+computed here once so no worker has to.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import Boolean, Float, Integer
+
+from app.db import db
+from app.models import College
+
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+DEFAULT_SNAPSHOT_DIR = 'data/snapshot'
+DEFAULT_CHECK_INTERVAL = 5.0
+KEEP_VERSIONS = 3
+
+ID_COLS = ['id', 'unitid']
+TEXT_COLS = ['name', 'city', 'state', 'zip']
+
+
+def numeric_columns() -> List[str]:
+    """Every numeric/boolean College column except the ids."""
+    return [
+        c.name for c in College.__table__.columns
+        if isinstance(c.type, (Integer, Float, Boolean)) and c.name not in ID_COLS
+    ]
+
+
+def snapshot_columns() -> List[str]:
+    return ID_COLS + TEXT_COLS + numeric_columns()
+
+
+class Snapshot:
+    """Read-only view over one snapshot version; columns are numpy memmaps."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as fh:
+            self.manifest = json.load(fh)
+        self.version: str = self.manifest['version']
+        self.rows: int = self.manifest['rows']
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            for name in self.manifest['columns']
+        }
+        self.tables: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            for name in self.manifest.get('tables', {})
+        }
+        self._id_index: Optional[Dict[int, int]] = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def has_columns(self, names: Iterable[str]) -> bool:
+        return all(n in self.columns for n in names)
+
+    def select(self, states: Optional[List[str]] = None, max_cost: Optional[float] = None) -> np.ndarray:
+        """Row positions matching the recommender's state/cost filters (SQL NULL semantics)."""
+        mask = np.ones(self.rows, dtype=bool)
+        if states:
+            mask &= np.isin(self.columns['state'], list(states))
+        if max_cost is not None:
+            with np.errstate(invalid='ignore'):
+                mask &= self.columns['cost_of_attendance'] <= max_cost
+        return np.flatnonzero(mask)
+
+    def positions(self, ids: Iterable[int]) -> np.ndarray:
+        """Row positions for College ids; unknown ids are skipped."""
+        if self._id_index is None:
+            self._id_index = {int(i): pos for pos, i in enumerate(self.columns['id'])}
+        index = self._id_index
+        return np.array([index[i] for i in ids if i in index], dtype=np.intp)
+
+
+# ---- Writing
+
+def _column_array(name: str, values: list) -> np.ndarray:
+    if name in ID_COLS:
+        return np.array([v if v is not None else 0 for v in values], dtype=np.int64)
+    if name in TEXT_COLS:
+        return np.array([v if v is not None else '' for v in values], dtype=str)
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def write_snapshot(directory: str, keep: int = KEEP_VERSIONS) -> str:
+    """
+    Dump the College table into a new snapshot version and publish it as CURRENT.
+
+    Also computes the derived tables (see the module docstring), which takes a few seconds on
+    large tables. Must run inside an app context. Returns the new version name.
+    """
+    from app.ml.similar import similar_tables  # app.ml.similar imports this module
+
+    os.makedirs(directory, exist_ok=True)
+    columns = snapshot_columns()
+    rows = (
+        db.session.query(*[getattr(College, c) for c in columns])
+        .order_by(College.id)
+        .all()
+    )
+    by_column = list(zip(*rows)) if rows else [()] * len(columns)
+
+    version = datetime.now(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ') + '-' + uuid.uuid4().hex[:8]
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=directory)
+    try:
+        arrays = {name: _column_array(name, list(values)) for name, values in zip(columns, by_column)}
+        tables = similar_tables(arrays)
+        dtypes, table_dtypes = {}, {}
+        for out, group in ((dtypes, arrays), (table_dtypes, tables)):
+            for name, arr in group.items():
+                np.save(os.path.join(staging, f'{name}.npy'), arr)
+                out[name] = arr.dtype.str
+        manifest = {
+            'version': version,
+            'created_at': datetime.now(dt_timezone.utc).isoformat(),
+            'rows': len(rows),
+            'columns': dtypes,
+            'tables': table_dtypes,
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+        os.rename(staging, os.path.join(directory, version))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Atomically repoint CURRENT so readers never see a half-written version
+    fd, tmp = tempfile.mkstemp(prefix='.current-', dir=directory)
+    with os.fdopen(fd, 'w') as fh:
+        fh.write(version)
+    os.replace(tmp, os.path.join(directory, CURRENT_FILE))
+
+    _prune(directory, keep)
+    return version
+
+
+def _prune(directory: str, keep: int) -> None:
+    # Older versions can go once a few newer ones exist; workers still mapping them keep
+    # their pages until they switch, since unlinking a mapped file is safe on POSIX.
+    versions = sorted(
+        d for d in os.listdir(directory)
+        if not d.startswith('.') and os.path.isfile(os.path.join(directory, d, MANIFEST_FILE))
+    )
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+
+
+# ---- Reading (one shared Snapshot per process)
+
+def read_current_version(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as fh:
+            return fh.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class SnapshotStore:
+    """Holds the process's mapped snapshot and swaps it when CURRENT changes."""
+
+    def __init__(self, directory: str, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._snapshot: Optional[Snapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[Snapshot]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self.refresh(now)
+        return self._snapshot
+
+    def refresh(self, now: Optional[float] = None) -> Optional[Snapshot]:
+        with self._lock:
+            self._checked_at = time.monotonic() if now is None else now
+            version = read_current_version(self.directory)
+            current = self._snapshot
+            if version is None:
+                self._snapshot = None
+            elif current is None or current.version != version:
+                try:
+                    self._snapshot = Snapshot(os.path.join(self.directory, version))
+                except (OSError, ValueError, KeyError):
+                    pass  # keep serving the previous version if the new one is unreadable
+            return self._snapshot
+
+
+_store: Optional[SnapshotStore] = None
+
+
+def init_snapshot(app) -> None:
+    """Map the current snapshot (if any) at startup."""
+    global _store
+    _store = SnapshotStore(
+        app.config.get('COLLEGE_SNAPSHOT_DIR') or DEFAULT_SNAPSHOT_DIR,
+        float(app.config.get('COLLEGE_SNAPSHOT_CHECK_INTERVAL') or DEFAULT_CHECK_INTERVAL),
+    )
+    _store.refresh()
+
+
+def get_snapshot() -> Optional[Snapshot]:
+    """The current snapshot for this process, or None when no snapshot has been written."""
+    return _store.get() if _store is not None else None
+
+
+def data_version() -> Optional[str]:
+    """Version of the College data this process is serving (None without a snapshot)."""
+    snapshot = get_snapshot()
+    return snapshot.version if snapshot is not None else None
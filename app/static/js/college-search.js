@@ -0,0 +1,89 @@
+// Typeahead for the college name box on /colleges: suggestions come from the search index
+// as you type; picking one opens that college, Enter without a pick submits the filter form.
+
+document.addEventListener('DOMContentLoaded', function() {
+  const input = document.querySelector('input[data-suggest-url]');
+  if (!input) return;
+
+  const box = document.createElement('ul');
+  box.className = 'search-suggestions';
+  box.hidden = true;
+  input.setAttribute('autocomplete', 'off');
+  input.insertAdjacentElement('afterend', box);
+
+  let timer = null;
+  let latest = 0;
+  let active = -1;
+
+  function detailUrl(id) {
+    return input.dataset.detailUrl.replace(/\/0$/, '/' + id);
+  }
+
+  function close() {
+    box.hidden = true;
+    box.replaceChildren();
+    active = -1;
+  }
+
+  function highlight(index) {
+    const items = box.querySelectorAll('li');
+    items.forEach((li, i) => li.classList.toggle('active', i === index));
+    active = index;
+  }
+
+  function render(results) {
+    if (!results.length) return close();
+    box.replaceChildren(...results.map(function(r) {
+      const li = document.createElement('li');
+      const link = document.createElement('a');
+      link.href = detailUrl(r.id);
+      link.textContent = r.name;
+      const where = document.createElement('span');
+      where.className = 'suggestion-location';
+      where.textContent = [r.city, r.state].filter(Boolean).join(', ');
+      li.append(link, where);
+      return li;
+    }));
+    box.hidden = false;
+    active = -1;
+  }
+
+  function suggest() {
+    const q = input.value.trim();
+    if (!q) return close();
+    const requestId = ++latest;
+    fetch(input.dataset.suggestUrl + '?' + new URLSearchParams({ q: q, limit: 8 }))
+      .then(res => res.json())
+      .then(data => {
+        // Ignore responses that arrive after a newer keystroke was sent
+        if (requestId !== latest) return;
+        render(data.results || []);
+      });
+  }
+
+  input.addEventListener('input', function() {
+    clearTimeout(timer);
+    timer = setTimeout(suggest, 100);
+  });
+
+  input.addEventListener('keydown', function(e) {
+    const items = box.querySelectorAll('li');
+    if (box.hidden || !items.length) return;
+    if (e.key === 'ArrowDown') {
+      e.preventDefault();
+      highlight((active + 1) % items.length);
+    } else if (e.key === 'ArrowUp') {
+      e.preventDefault();
+      highlight((active - 1 + items.length) % items.length);
+    } else if (e.key === 'Enter' && active >= 0) {
+      e.preventDefault();
+      window.location = items[active].querySelector('a').href;
+    } else if (e.key === 'Escape') {
+      close();
+    }
+  });
+
+  document.addEventListener('click', function(e) {
+    if (e.target !== input && !box.contains(e.target)) close();
+  });
+});
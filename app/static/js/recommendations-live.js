@@ -0,0 +1,55 @@
+// Re-ranks recommendation results as the weight sliders move, without resubmitting the form.
+// The server keeps the normalized scores for the submitted profile; we only send new weights.
+
+document.addEventListener('DOMContentLoaded', function() {
+  const container = document.querySelector('.recommendations-results[data-handle]');
+  const list = container && container.querySelector('.results-list');
+  const template = document.getElementById('result-item-template');
+  if (!container || !list || !template) return;
+
+  const form = document.querySelector('.recommendations-form form');
+  const sliders = Array.from(form.querySelectorAll('input[type="range"]'));
+  let timer = null;
+  let latest = 0;
+
+  function renderRow(r) {
+    // Reuse the existing row for a college so open dropdowns and loaded lists survive
+    const existing = list.querySelector(`:scope > li[data-college-id="${r.id}"]`);
+    const li = existing || template.content.firstElementChild.cloneNode(true);
+    if (!existing) {
+      li.querySelectorAll('[data-college-id]').forEach(el => el.setAttribute('data-college-id', r.id));
+      li.setAttribute('data-college-id', r.id);
+      const link = li.querySelector('.college-link');
+      link.href = link.getAttribute('href').replace(/\/0$/, '/' + r.id);
+      link.textContent = r.INSTNM;
+      li.querySelector('.result-location').textContent = `(${r.CITY}, ${r.STABBR})`;
+    }
+    li.querySelector('.result-score').textContent = r.score === null ? 'nan' : r.score.toFixed(2);
+    return li;
+  }
+
+  function reweight() {
+    const priorities = {};
+    sliders.forEach(s => { priorities[s.name] = parseFloat(s.value) || 0; });
+    const requestId = ++latest;
+    fetch(container.dataset.reweightUrl, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ handle: container.dataset.handle, priorities: priorities })
+    })
+    .then(res => res.json())
+    .then(data => {
+      // Ignore responses that arrive after a newer slider position was sent
+      if (requestId !== latest || !data.results) return;
+      const rows = data.results.map(renderRow);
+      list.replaceChildren(...rows);
+    });
+  }
+
+  sliders.forEach(function(slider) {
+    slider.addEventListener('input', function() {
+      clearTimeout(timer);
+      timer = setTimeout(reweight, 120);
+    });
+  });
+});
@@ -0,0 +1,77 @@
+"""
+Per-worker cache of signed-in users for Flask-Login's user loader.
+
+Every authenticated request (each add-to-list or my-lists AJAX call included) needs
+`current_user`. `load_user` keeps the user's profile columns in a small TTL cache, and on a hit
+attaches a `User` rebuilt from them to the request's session without any SQL (`merge(load=False)`).
+Relationships still load on access, and changes to the object are flushed as usual.
+
+Two columns are left out and stay unloaded until read, so reading them always hits the database:
+
+    password_hash      only password checks need it
+    lists_updated_at   bumped by `touch_lists` with a Core UPDATE (no ORM event) by any worker,
+                       and part of the list pages' ETags, so it must never be stale
+
+A user updated or deleted through the ORM (profile or password change) is dropped from this
+worker's cache at once; other workers see the change within `USER_CACHE_TTL` seconds. A user
+is cached when they log in, so their first page after login needs no user query either.
+"""
+from typing import Any, Dict, Optional
+
+from flask_login import user_logged_in
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.cache import TTLCache
+from app.db import db
+from app.models import User
+
+# Profile columns kept per user; everything else is loaded on access
+CACHED_COLUMNS = ['id', 'email', 'username', 'first_name', 'last_name', 'is_admin']
+
+# Sized from config in init_user_cache
+user_cache = TTLCache(maxsize=1024, ttl=60)
+
+
+def _cached_columns(user: User) -> Dict[str, Any]:
+    return {c: getattr(user, c) for c in CACHED_COLUMNS}
+
+
+def remember_user(user: User) -> None:
+    user_cache.set(user.id, _cached_columns(user))
+
+
+def forget_user(user_id: int) -> None:
+    user_cache.pop(user_id)
+
+
+def load_user(user_id: int) -> Optional[User]:
+    """The user with `user_id`, from the cache when possible, attached to the current session."""
+    columns = user_cache.get(user_id)
+    if columns is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            remember_user(user)
+        return user
+    user = User(**columns)
+    # Marks the columns as loaded and the rest as expired, so merging needs no SELECT
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def _forget_target(mapper, connection, target) -> None:
+    forget_user(target.id)
+
+
+def _remember_logged_in(sender, user, **extra) -> None:
+    remember_user(user)
+
+
+def init_user_cache(app) -> None:
+    """Size the cache from config and drop users as they're changed through the ORM."""
+    user_cache.maxsize = app.config.get('USER_CACHE_SIZE', user_cache.maxsize)
+    user_cache.ttl = app.config.get('USER_CACHE_TTL', user_cache.ttl)
+    for name in ('after_update', 'after_delete'):
+        if not event.contains(User, name, _forget_target):
+            event.listen(User, name, _forget_target)
+    user_logged_in.connect(_remember_logged_in, app)
@@ -0,0 +1,20 @@
+"""
+Reproducible benchmarks on synthetic Scorecard-scale data.
+
+    python -m benchmarks generate --size 50k
+    python -m benchmarks run --size 50k [--scenario NAME ...] [--output results.json]
+    python -m benchmarks compare baseline.json results.json [--threshold 0.1]
+    python -m benchmarks budgets [--size 7k]
+    python -m benchmarks startup [--size 7k] [--workers 4]
+    python -m benchmarks saturation [--size 7k]
+
+`generate` builds a seeded synthetic dataset (7k, 50k or 250k colleges) in SQLite;
+`run` generates it if needed, times every scenario in its own process and writes JSON
+(ops/sec, p50/p95/p99 latency and peak RSS per scenario); `compare` prints the changes
+between two result files and exits 1 if any scenario regressed beyond the threshold;
+`budgets` requests every read route with its SQL query budget enforced and exits 1 on a
+violation (see `app/query_budget.py`); `startup` reports import/warm time and per-worker
+memory for lazy workers and for workers forked from a preloaded parent (see `startup.py`);
+`saturation` runs gunicorn and exits 1 unless pages stay fast while the recommendation pool
+is saturated and answering 503 (see `saturation.py`).
+"""
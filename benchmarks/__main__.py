@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks import __doc__ as usage
+from benchmarks.datasets import ROOT, dataset_dir, generate_dataset, read_dataset
+from benchmarks.harness import (
+    DEFAULT_THRESHOLD,
+    compare,
+    format_comparison,
+    read_results,
+    run_metadata,
+    write_results,
+)
+from benchmarks.synthetic import DEFAULT_SEED, SIZES
+
+# Scenario names, without importing the app into this (parent) process
+SCENARIO_NAMES = ['recommend', 'colleges_filters', 'colleges_deep_pages', 'colleges_page_jump',
+                  'list_views', 'load_bulk', 'load_refresh', 'load_stream']
+
+
+def _child(args_list, module='benchmarks'):
+    """Run `python -m benchmarks ...` in a fresh process (each gets its own app config and RSS)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    return subprocess.run([sys.executable, '-m', module] + args_list, cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+
+
+def cmd_generate(args):
+    directory = generate_dataset(args.size, args.seed, force=args.force)
+    print(json.dumps(read_dataset(directory), indent=2))
+
+
+def _ensure_dataset(args):
+    directory = dataset_dir(args.size, args.seed)
+    if args.force or read_dataset(directory) is None:
+        print(f'Generating {args.size} dataset (seed {args.seed})...', file=sys.stderr)
+        done = _child(['generate', '--size', args.size, '--seed', str(args.seed)]
+                      + (['--force'] if args.force else []))
+        if done.returncode != 0:
+            sys.exit(done.stderr)
+    return directory, read_dataset(directory)
+
+
+def cmd_run(args):
+    directory, dataset = _ensure_dataset(args)
+
+    results = {'meta': run_metadata(dataset), 'scenarios': {}}
+    for name in args.scenario or SCENARIO_NAMES:
+        fd, out = tempfile.mkstemp(prefix='bench-', suffix='.json')
+        os.close(fd)
+        try:
+            done = _child(['scenario', name, '--data', directory, '--out', out,
+                           '--warmup', str(args.warmup), '--min-iterations', str(args.min_iterations),
+                           '--min-seconds', str(args.min_seconds)])
+            if done.returncode == 0:
+                results['scenarios'][name] = read_results(out)
+            else:
+                lines = done.stderr.strip().splitlines() or [f'exit status {done.returncode}']
+                results['scenarios'][name] = {'error': lines[-1]}
+        finally:
+            os.remove(out)
+        result = results['scenarios'][name]
+        if 'error' in result:
+            print(f'{name:<22} FAILED {result["error"]}', file=sys.stderr)
+        else:
+            print(f"{name:<22} {result['ops_per_sec']:>10.2f} ops/s  p50 {result['p50_ms']:>9.2f} ms  "
+                  f"p95 {result['p95_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+                  f"peak RSS {result['peak_rss_mb']:>7.1f} MB", file=sys.stderr)
+
+    commit = results['meta']['commit'] or 'local'
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f'{args.size}-{commit}.json')
+    write_results(output, results)
+    print(output)
+    if args.baseline:
+        rows = compare(read_results(args.baseline), results, args.threshold)
+        print(format_comparison(rows))
+        if any(row['regressed'] for row in rows):
+            sys.exit(1)
+    if any('error' in r for r in results['scenarios'].values()):
+        sys.exit(2)
+
+
+def cmd_compare(args):
+    rows = compare(read_results(args.baseline), read_results(args.current), args.threshold)
+    print(format_comparison(rows))
+    if any(row['regressed'] for row in rows):
+        sys.exit(1)
+
+
+def cmd_budgets(args):
+    from benchmarks.budgets import check, format_rows
+
+    directory, dataset = _ensure_dataset(args)
+    rows = check(directory, dataset)
+    print(format_rows(rows))
+    if any('violation' in row for row in rows):
+        sys.exit(1)
+
+
+def cmd_startup(args):
+    from benchmarks.startup import MODES, format_report
+
+    directory, dataset = _ensure_dataset(args)
+    reports = []
+    for mode in MODES:
+        fd, out = tempfile.mkstemp(prefix='bench-startup-', suffix='.json')
+        os.close(fd)
+        try:
+            # Not `python -m benchmarks`: this module imports pandas (via synthetic) up front
+            done = _child([mode, '--data', directory, '--workers', str(args.workers), '--out', out],
+                          module='benchmarks.startup')
+            if done.returncode != 0:
+                lines = done.stderr.strip().splitlines() or [f'exit status {done.returncode}']
+                sys.exit(f'{mode}: {lines[-1]}')
+            reports.append(read_results(out))
+        finally:
+            os.remove(out)
+    print(format_report(reports))
+    if args.output:
+        write_results(args.output, {'meta': run_metadata(dataset), 'modes': reports})
+        print(args.output)
+
+
+def cmd_saturation(args):
+    from benchmarks.saturation import check, format_report
+
+    directory, _ = _ensure_dataset(args)
+    report = check(directory)
+    print(format_report(report))
+    if report['violations']:
+        sys.exit(1)
+
+
+def cmd_scenario(args):
+    from benchmarks.scenarios import run_scenario
+
+    result = run_scenario(args.name, args.data, read_dataset(args.data), warmup=args.warmup,
+                          min_iterations=args.min_iterations, min_seconds=args.min_seconds)
+    write_results(args.out, result)
+
+
+parser = argparse.ArgumentParser(prog='python -m benchmarks', description=usage.strip().splitlines()[0],
+                                 formatter_class=argparse.RawDescriptionHelpFormatter, epilog=usage)
+commands = parser.add_subparsers(dest='command', required=True)
+
+
+def _dataset_args(p):
+    p.add_argument('--size', choices=list(SIZES), default='7k')
+    p.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    p.add_argument('--force', action='store_true', help='regenerate the dataset even if it exists')
+
+
+def _timing_args(p):
+    p.add_argument('--warmup', type=int, default=3)
+    p.add_argument('--min-iterations', type=int, default=10)
+    p.add_argument('--min-seconds', type=float, default=3.0)
+
+
+p = commands.add_parser('generate', help='build a synthetic dataset')
+_dataset_args(p)
+p.set_defaults(func=cmd_generate)
+
+p = commands.add_parser('run', help='time the scenarios and write a results file')
+_dataset_args(p)
+_timing_args(p)
+p.add_argument('--scenario', action='append', choices=SCENARIO_NAMES, help='run only this scenario (repeatable)')
+p.add_argument('--output', help='results file (default benchmarks/results/<size>-<commit>.json)')
+p.add_argument('--baseline', help='compare against this results file and exit 1 on a regression')
+p.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+p.set_defaults(func=cmd_run)
+
+p = commands.add_parser('compare', help='compare two results files')
+p.add_argument('baseline')
+p.add_argument('current')
+p.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+p.set_defaults(func=cmd_compare)
+
+p = commands.add_parser('budgets', help='check every read route against its SQL query budget')
+_dataset_args(p)
+p.set_defaults(func=cmd_budgets)
+
+p = commands.add_parser('startup', help='startup time and worker memory, lazy vs preloaded')
+_dataset_args(p)
+p.add_argument('--workers', type=int, default=4, help='web workers forked per mode')
+p.add_argument('--output', help='also write the report as JSON')
+p.set_defaults(func=cmd_startup)
+
+p = commands.add_parser('saturation', help='browse latency on gunicorn while the recommendation pool is saturated')
+_dataset_args(p)
+p.set_defaults(func=cmd_saturation)
+
+# Internal: one scenario in this process (used by `run`)
+p = commands.add_parser('scenario')
+p.add_argument('name', choices=SCENARIO_NAMES)
+p.add_argument('--data', required=True)
+p.add_argument('--out', required=True)
+_timing_args(p)
+p.set_defaults(func=cmd_scenario)
+
+args = parser.parse_args()
+args.func(args)
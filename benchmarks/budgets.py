@@ -0,0 +1,99 @@
+"""
+Query-budget check: every read route on a benchmark dataset, with QUERY_BUDGET_MODE=raise.
+
+Each request runs with its route's declared budget enforced (see `app/query_budget.py`), and
+the same routes are requested for the smallest and the largest of the benchmark user's lists,
+so a statement count that grows with the data fails even while it is still under budget.
+Only read-only requests are made; the dataset is left as it was.
+"""
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.datasets import BENCH_PASSWORD, BENCH_USER, use_dataset
+
+# (method, url, signed in, JSON body); "{list}" is replaced by each benchmark list's id
+REQUESTS: List[Tuple[str, str, bool, Any]] = [
+    ('GET', '/', False, None),
+    ('GET', '/colleges', False, None),
+    ('GET', '/colleges?state=CA&control=public', False, None),
+    ('GET', '/colleges?page=20', False, None),
+    ('GET', '/colleges?search=state+university', False, None),
+    ('GET', '/colleges?near=40.71,-74.01&radius=100', False, None),
+    ('GET', '/college/1', False, None),
+    ('GET', '/api/colleges/search?q=college', False, None),
+    ('GET', '/', True, None),
+    ('GET', '/colleges?cursor={cursor}', True, None),
+    ('GET', '/college/1', True, None),
+    ('GET', '/my-lists', True, None),
+    ('GET', '/api/lists', True, None),
+    ('GET', '/lists/{list}', True, None),
+    ('GET', '/lists/{list}', False, None),
+    ('GET', '/recommendations', True, None),
+    ('POST', '/api/recommendations/batch', True, {'profiles': [{'states': ['CA']}, {'user_sat': 1200}]}),
+]
+
+
+def _count(app, log: List[int]):
+    from flask import g
+
+    @app.after_request
+    def _remember_count(response):
+        # Runs before the budget check (after_request hooks run last-registered first)
+        log.append(len(g.get('_query_log') or ()))
+        return response
+
+
+def check(directory: str, dataset: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Statement count and any violation per request (runs in a fresh process)."""
+    os.environ['QUERY_BUDGET_MODE'] = 'raise'
+    use_dataset(directory)
+    from app import create_app
+    from app.query_budget import QueryBudgetExceeded
+
+    app = create_app()
+    app.testing = True
+    counts: List[int] = []
+    _count(app, counts)
+
+    anonymous, signed_in = app.test_client(), app.test_client()
+    signed_in.post('/login', data={'login': BENCH_USER, 'password': BENCH_PASSWORD})
+    first = anonymous.get('/colleges').get_data(as_text=True)
+    cursor = re.search(r'cursor=([\w-]+)', first)
+
+    rows = []
+    for method, url, auth, body in REQUESTS:
+        urls = [url]
+        if '{list}' in url:
+            urls = [url.format(list=list_id) for list_id in dataset['lists'].values()]
+        elif '{cursor}' in url:
+            if cursor is None:
+                continue
+            urls = [url.format(cursor=cursor.group(1))]
+        seen = []
+        for target in urls:
+            client = signed_in if auth else anonymous
+            counts.clear()
+            row = {'request': f"{method} {target}{' (signed in)' if auth else ''}"}
+            try:
+                response = client.open(target, method=method, json=body)
+                row['status'] = response.status_code
+            except QueryBudgetExceeded as e:
+                row['violation'] = str(e)
+            row['queries'] = counts[0] if counts else None
+            seen.append(row['queries'])
+            rows.append(row)
+        if len(set(seen)) > 1:
+            rows[-1]['violation'] = (f'statement count depends on the list size: '
+                                     f'{dict(zip(dataset["lists"], seen))}')
+    return rows
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    lines = []
+    for row in rows:
+        mark = 'FAIL' if 'violation' in row else 'ok'
+        lines.append(f"{mark:<5} {row['queries'] if row['queries'] is not None else '-':>3} queries  {row['request']}")
+        if 'violation' in row:
+            lines.extend('        ' + line for line in row['violation'].splitlines())
+    return '\n'.join(lines)
@@ -0,0 +1,113 @@
+"""
+Benchmark datasets on disk: `benchmarks/.data/<size>-seed<seed>/` holds
+
+    colleges.csv   the synthetic Scorecard extract (see `synthetic.py`)
+    empty.db       SQLite schema only (`flask db upgrade`), copied for the ingestion scenarios
+    bench.db       the extract loaded through `load_bulk`, plus the benchmark user's lists
+    snapshot/      the College snapshot published from bench.db
+    dataset.json   what was generated (size, seed, rows, list sizes)
+
+`config.Config` reads the environment once, when it is imported, so `use_dataset` must run
+before the first `create_app()` in the process; each scenario therefore runs in its own process.
+Importing this module doesn't load pandas (only `generate_dataset` needs `synthetic`), so the
+startup measurements can use it before the app is imported.
+"""
+import json
+import os
+import random
+import shutil
+from typing import Any, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, 'benchmarks', '.data')
+
+BENCH_USER = 'bench'
+BENCH_PASSWORD = 'bench-password'
+# Entries in each of the benchmark user's lists
+LIST_SIZES = [50, 500, 2000]
+
+
+def dataset_dir(size: str, seed: int) -> str:
+    return os.path.join(DATA_DIR, f'{size}-seed{seed}')
+
+
+def read_dataset(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, 'dataset.json')) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def use_dataset(directory: str, database: str = 'bench.db') -> None:
+    """Point the app's configuration at a dataset (before `config` is first imported)."""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, database)
+    os.environ['COLLEGE_SNAPSHOT_DIR'] = os.path.join(directory, 'snapshot')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    # Time the recommender itself, not the hop to a pool process
+    os.environ['RECOMMENDATION_WORKERS'] = '0'
+
+
+def _create_schema(app) -> None:
+    from flask_migrate import upgrade
+    with app.app_context():
+        upgrade(directory=os.path.join(ROOT, 'migrations'))
+
+
+def _create_lists(seed: int) -> Dict[str, int]:
+    from werkzeug.security import generate_password_hash
+
+    from app.db import db
+    from app.models import College, CollegeList, CollegeListEntry, User
+
+    user = User(email='bench@example.com', username=BENCH_USER, first_name='Bench', last_name='User',
+                password_hash=generate_password_hash(BENCH_PASSWORD))
+    db.session.add(user)
+    db.session.flush()
+
+    ids = [i for (i,) in db.session.query(College.id).order_by(College.id)]
+    rnd = random.Random(seed)
+    lists = {}
+    for size in LIST_SIZES:
+        clist = CollegeList(name=f'{size} schools', user_id=user.id)
+        db.session.add(clist)
+        db.session.flush()
+        picked = rnd.sample(ids, min(size, len(ids)))
+        db.session.bulk_insert_mappings(CollegeListEntry, [
+            {'list_id': clist.id, 'college_id': college_id, 'notes': 'Visit in the fall' if i % 5 == 0 else None}
+            for i, college_id in enumerate(picked)
+        ])
+        lists[str(size)] = clist.id
+    db.session.commit()
+    return lists
+
+
+def generate_dataset(size: str, seed: int, force: bool = False) -> str:
+    """Build (or reuse) the dataset for `size` and return its directory. Runs in a fresh process."""
+    from benchmarks.synthetic import SIZES, write_csv
+
+    directory = dataset_dir(size, seed)
+    if not force and read_dataset(directory) is not None:
+        return directory
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+    csv_path = os.path.join(directory, 'colleges.csv')
+    write_csv(csv_path, SIZES[size], seed)
+
+    use_dataset(directory)
+    from app import create_app
+    from app.loader import load_bulk
+    from app.snapshot import write_snapshot
+    app = create_app()
+    _create_schema(app)
+    shutil.copy(os.path.join(directory, 'bench.db'), os.path.join(directory, 'empty.db'))
+    with app.app_context():
+        summary = load_bulk(csv_path)
+        lists = _create_lists(seed)
+        write_snapshot(app.config['COLLEGE_SNAPSHOT_DIR'])
+
+    info = {'size': size, 'seed': seed, 'rows': summary.inserted, 'lists': lists}
+    with open(os.path.join(directory, 'dataset.json'), 'w') as fh:
+        json.dump(info, fh, indent=2)
+    return directory
@@ -0,0 +1,149 @@
+"""
+Timing, result files and baseline comparison.
+
+A scenario is timed in its own process (so peak RSS belongs to that scenario alone): a few
+untimed warmup calls, then calls until both `min_iterations` and `min_seconds` are reached.
+Latencies are wall-clock per call; `ops_per_sec` counts operations, which is more than calls
+when one call does several (e.g. walking a run of pages).
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# A scenario is flagged when its p50 or p95 latency grows (or ops/sec drops) by more than this
+DEFAULT_THRESHOLD = 0.10
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(fn: Callable[[], Any], ops_per_call: int = 1, setup: Optional[Callable[[], Any]] = None,
+            warmup: int = 3, min_iterations: int = 10, min_seconds: float = 2.0,
+            max_iterations: int = 100_000) -> Dict[str, Any]:
+    """
+    Time `fn()` repeatedly. `setup()`, if given, runs untimed before every call (warmup
+    included), e.g. to reset a database.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+
+    times: List[float] = []
+    elapsed = 0.0
+    while len(times) < max_iterations and (len(times) < min_iterations or elapsed < min_seconds):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        took = time.perf_counter() - started
+        times.append(took)
+        elapsed += took
+
+    ms = np.array(times) * 1000
+    per_op = ms / ops_per_call
+    return {
+        'iterations': len(times),
+        'ops_per_call': ops_per_call,
+        'ops_per_sec': round(len(times) * ops_per_call / elapsed, 3),
+        'mean_ms': round(float(per_op.mean()), 3),
+        'p50_ms': round(float(np.percentile(per_op, 50)), 3),
+        'p95_ms': round(float(np.percentile(per_op, 95)), 3),
+        'p99_ms': round(float(np.percentile(per_op, 99)), 3),
+        'max_ms': round(float(per_op.max()), 3),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_metadata(dataset: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'dataset': dataset,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+
+
+def read_results(path: str) -> Dict[str, Any]:
+    with open(path) as fh:
+        return json.load(fh)
+
+
+# ---- Comparison
+
+def _change(base: float, current: float) -> Optional[float]:
+    if not base:
+        return None
+    return current / base - 1
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    One row per scenario present in both runs, with relative changes
+    (positive = slower / bigger) and whether it counts as a regression.
+    """
+    rows = []
+    base_scenarios = baseline.get('scenarios', {})
+    for name, now in current.get('scenarios', {}).items():
+        before = base_scenarios.get(name)
+        if before is None or 'error' in before or 'error' in now:
+            continue
+        p50 = _change(before['p50_ms'], now['p50_ms'])
+        p95 = _change(before['p95_ms'], now['p95_ms'])
+        ops = _change(before['ops_per_sec'], now['ops_per_sec'])
+        rss = _change(before['peak_rss_mb'], now['peak_rss_mb'])
+        slower = [c for c in (p50, p95, -ops if ops is not None else None) if c is not None]
+        rows.append({
+            'scenario': name,
+            'p50_ms': (before['p50_ms'], now['p50_ms'], p50),
+            'p95_ms': (before['p95_ms'], now['p95_ms'], p95),
+            'ops_per_sec': (before['ops_per_sec'], now['ops_per_sec'], ops),
+            'peak_rss_mb': (before['peak_rss_mb'], now['peak_rss_mb'], rss),
+            'regressed': any(c > threshold for c in slower),
+        })
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    def cell(triple):
+        before, now, change = triple
+        pct = '' if change is None else f' ({change:+.0%})'
+        return f'{before:>10.2f} -> {now:<10.2f}{pct:<8}'
+
+    header = f"{'scenario':<28} {'p50 ms':<30} {'p95 ms':<30} {'ops/sec':<30} {'peak RSS MB':<30}"
+    lines = [header, '-' * len(header)]
+    for row in rows:
+        mark = '  REGRESSED' if row['regressed'] else ''
+        lines.append(f"{row['scenario']:<28} {cell(row['p50_ms'])} {cell(row['p95_ms'])} "
+                     f"{cell(row['ops_per_sec'])} {cell(row['peak_rss_mb'])}{mark}")
+    return '\n'.join(lines)
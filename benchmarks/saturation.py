@@ -0,0 +1,170 @@
+"""
+Browsing while the recommendation pool is saturated, on a real gunicorn server.
+
+Starts `gunicorn run:app` with the project's `gunicorn.conf.py` on a benchmark dataset, with one
+web worker (so every request shares one pool) and a small pool (`POOL_ENV`), then:
+
+    idle       times the browse requests (`BROWSE_URLS`) one after another, `ROUNDS` times
+    saturated  the same, while `pool waiters + EXTRA_CLIENTS` threads keep posting distinct
+               recommendation batches, more than the pool lets wait
+
+Reported per phase: browse p50/p95/max latency and failed browse requests, and the
+recommendation answers by status. The check fails when a browse request fails or takes longer
+than `BROWSE_LIMIT_MS` while saturated, or when no recommendation got a 503 (the pool never
+pushed back).
+"""
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List
+
+from benchmarks.datasets import BENCH_PASSWORD, BENCH_USER, ROOT, use_dataset
+
+# One pool process and two queued computations: three requests may wait on it
+POOL_ENV = {'RECOMMENDATION_WORKERS': '1', 'RECOMMENDATION_QUEUE_DEPTH': '2', 'RECOMMENDATION_TIMEOUT': '20'}
+BROWSE_URLS = ['/colleges', '/colleges?state=CA&control=public', '/colleges?search=state+university',
+               '/colleges?near=40.71,-74.01&radius=100', '/college/1']
+ROUNDS = 10
+# Recommendation clients beyond the number the pool lets wait
+EXTRA_CLIENTS = 3
+# Profiles per posted batch (each batch is a few seconds of ranking on the 7k dataset)
+BATCH_PROFILES = 100
+BROWSE_LIMIT_MS = 1000.0
+STARTUP_SECONDS = 120.0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _start_server(directory: str, port: int) -> subprocess.Popen:
+    use_dataset(directory)
+    env = dict(os.environ, **POOL_ENV, WEB_WORKERS='1')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                             '--bind', f'127.0.0.1:{port}', 'run:app'],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+
+class Client:
+    """A signed-in HTTP session against the server under test."""
+
+    def __init__(self, base: str, jar: http.cookiejar.CookieJar):
+        self.base = base
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+
+    def request(self, url: str, body: Any = None, form: Any = None, timeout: float = 60.0) -> int:
+        data, headers = None, {}
+        if body is not None:
+            data, headers = json.dumps(body).encode(), {'Content-Type': 'application/json'}
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        try:
+            with self.opener.open(urllib.request.Request(self.base + url, data, headers), timeout=timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def _wait_ready(server: subprocess.Popen, client: Client) -> None:
+    deadline = time.monotonic() + STARTUP_SECONDS
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn exited: {server.stderr.read().strip().splitlines()[-1:]}')
+        try:
+            if client.request('/', timeout=5) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start in time')
+
+
+def _browse(client: Client) -> Dict[str, Any]:
+    latencies, failed = [], 0
+    for _ in range(ROUNDS):
+        for url in BROWSE_URLS:
+            started = time.perf_counter()
+            status = client.request(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+            failed += status != 200
+    latencies.sort()
+    return {'p50_ms': latencies[len(latencies) // 2], 'p95_ms': latencies[int(len(latencies) * 0.95)],
+            'max_ms': latencies[-1], 'failed': failed, 'requests': len(latencies)}
+
+
+def _recommend_until(client: Client, stop: threading.Event, seed: int, statuses: List[int]) -> None:
+    rnd = random.Random(seed)
+    while not stop.is_set():
+        # Distinct profiles every time, so nothing is answered from a cache or coalesced
+        profiles = [{'user_sat': rnd.randint(900, 1550), 'states': [rnd.choice(['CA', 'NY', 'TX', 'FL'])]}
+                    for _ in range(BATCH_PROFILES)]
+        statuses.append(client.request('/api/recommendations/batch', body={'profiles': profiles}))
+
+
+def check(directory: str) -> Dict[str, Any]:
+    """Browse latency idle and with the pool saturated, and the recommendation statuses."""
+    port = _free_port()
+    server = _start_server(directory, port)
+    try:
+        jar = http.cookiejar.CookieJar()
+        client = Client(f'http://127.0.0.1:{port}', jar)
+        _wait_ready(server, client)
+        client.request('/login', form={'login': BENCH_USER, 'password': BENCH_PASSWORD})
+        # Build the indexes and start the pool before timing anything
+        for url in BROWSE_URLS:
+            client.request(url)
+        client.request('/api/recommendations/batch', body={'profiles': [{'states': ['CA']}]})
+
+        report: Dict[str, Any] = {'idle': _browse(client)}
+        stop, statuses = threading.Event(), []
+        clients = int(POOL_ENV['RECOMMENDATION_WORKERS']) + int(POOL_ENV['RECOMMENDATION_QUEUE_DEPTH']) + EXTRA_CLIENTS
+        threads = [threading.Thread(target=_recommend_until, args=(Client(client.base, jar), stop, seed, statuses))
+                   for seed in range(clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)
+        report['saturated'] = _browse(client)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        report['recommendations'] = {str(s): statuses.count(s) for s in sorted(set(statuses))}
+    finally:
+        server.terminate()
+        server.wait(30)
+
+    saturated = report['saturated']
+    violations = []
+    if saturated['failed']:
+        violations.append(f"{saturated['failed']} browse requests failed while saturated")
+    if saturated['max_ms'] > BROWSE_LIMIT_MS:
+        violations.append(f"slowest browse request took {saturated['max_ms']:.0f} ms (limit {BROWSE_LIMIT_MS:.0f})")
+    if not report['recommendations'].get('503'):
+        violations.append('no recommendation was answered 503')
+    report['violations'] = violations
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = []
+    for phase in ('idle', 'saturated'):
+        r = report[phase]
+        lines.append(f"{phase:<10} browse p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms  "
+                     f"max {r['max_ms']:7.1f} ms  failed {r['failed']}/{r['requests']}")
+    answers = '  '.join(f'{status}: {n}' for status, n in report['recommendations'].items())
+    lines.append(f'recommendations while saturated  {answers}')
+    lines.extend(f'violation  {v}' for v in report['violations'])
+    lines.append('ok' if not report['violations'] else 'FAILED')
+    return '\n'.join(lines)
@@ -0,0 +1,207 @@
+"""
+Benchmark scenarios. Each one prepares its inputs untimed and returns `harness.measure(...)`.
+
+    recommend            recommend_colleges_filtered over varied states, scores, budgets,
+                         priorities and home locations
+    colleges_filters     GET /colleges for a spread of filter combinations (first page)
+    colleges_deep_pages  GET /colleges following next-page cursors deep into the listing
+    colleges_page_jump   GET /colleges?page=N (old page-number links), up to the last page
+    list_views           /lists/<id> for 50/500/2000-entry lists, /my-lists and GET /api/lists
+    load_bulk            scripts/load.py's bulk upsert into an empty database
+    load_refresh         the bulk upsert again over the loaded database (every row unchanged)
+    load_stream          scripts/load.py --stream into an empty database
+
+Scenarios run inside an app built on the dataset by `run_scenario`, in a process of their own.
+"""
+import os
+import shutil
+import tempfile
+from itertools import cycle
+from typing import Any, Callable, Dict
+
+from benchmarks.datasets import BENCH_PASSWORD, BENCH_USER, use_dataset
+from benchmarks.harness import measure, peak_rss_mb
+
+# Each run of `colleges_deep_pages` walks this many pages from the first
+DEEP_PAGE_WALK = 25
+
+RECOMMEND_PROFILES = [
+    dict(states=['CA'], user_sat=1350, user_gpa=3.7,
+         user_priorities={'academics': 0.9, 'prestige': 0.5, 'diversity': 0.3}),
+    dict(states=['NY', 'MA', 'PA'], user_act=29, user_priorities={'professors': 0.8, 'urbanicity': 0.6}),
+    dict(states=None, user_sat=1180, user_cost=30000, user_priorities={'academics': 0.4, 'diversity': 0.8}),
+    dict(states=['TX'], user_gpa=3.2, user_cost=25000, user_priorities={'urbanicity': 0.2, 'prestige': 0.1}),
+    dict(states=None, user_priorities={'academics': 1.0}),
+    dict(states=['OH', 'MI', 'IN', 'IL'], user_sat=1450, user_act=33, user_gpa=3.95,
+         user_priorities={'academics': 1.0, 'prestige': 1.0, 'professors': 0.5}, prefer_selectivity=True),
+    dict(states=['FL', 'GA'], user_sat=1050, user_priorities={'diversity': 0.7, 'urbanicity': 0.9},
+         prefer_selectivity=False),
+    dict(states=None, user_sat=1300, home=(40.7, -74.0), radius_miles=150,
+         user_priorities={'academics': 0.6, 'professors': 0.4}),
+    dict(states=['WA', 'OR'], user_cost=50000, home=(47.6, -122.3),
+         user_priorities={'academics': 0.5, 'urbanicity': 0.5}),
+]
+
+LISTING_FILTERS = [
+    {},
+    {'state': 'CA'},
+    {'control': ['public']},
+    {'control': ['private'], 'max_cost': '40000'},
+    {'size': ['large'], 'state': 'TX'},
+    {'specialties': ['HBCU']},
+    {'selectivity': ['Very Selective', 'Selective']},
+    {'state': 'NY', 'control': ['public', 'private'], 'size': ['medium', 'large']},
+    {'search': 'state university'},
+    {'search': 'college', 'state': 'OH'},
+    {'near': '40.71,-74.01', 'radius': '100'},
+    {'max_cost': '20000', 'selectivity': ['Safety']},
+]
+
+LOAD_SCENARIOS = ('load_bulk', 'load_refresh', 'load_stream')
+# A load is seconds long at the larger sizes: fewer, unwarmed repetitions
+LOAD_TIMING = {'warmup': 0, 'min_iterations': 3, 'min_seconds': 0}
+
+SCENARIOS: Dict[str, Callable[..., Dict[str, Any]]] = {}
+
+
+def scenario(fn):
+    SCENARIOS[fn.__name__] = fn
+    return fn
+
+
+def _get(client, url, query=None):
+    response = client.get(url, query_string=query)
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} {query or ""} answered {response.status_code}')
+    return response
+
+
+def _login(client) -> None:
+    response = client.post('/login', data={'login': BENCH_USER, 'password': BENCH_PASSWORD})
+    if response.status_code not in (200, 302):
+        raise RuntimeError(f'login answered {response.status_code}')
+
+
+@scenario
+def recommend(app, dataset, **timing):
+    from app.ml.recommendations import recommend_colleges_filtered
+
+    profiles = cycle(RECOMMEND_PROFILES)
+    return measure(lambda: recommend_colleges_filtered(None, top_n=12, **next(profiles)), **timing)
+
+
+@scenario
+def colleges_filters(app, dataset, **timing):
+    client = app.test_client()
+    combos = cycle(LISTING_FILTERS)
+    return measure(lambda: _get(client, '/colleges', next(combos)), **timing)
+
+
+@scenario
+def colleges_deep_pages(app, dataset, **timing):
+    from werkzeug.datastructures import MultiDict
+
+    from app.routes.colleges import college_page
+
+    # Cursors for the first DEEP_PAGE_WALK pages, resolved once and replayed as links
+    cursors = [None]
+    with app.test_request_context():
+        for _ in range(DEEP_PAGE_WALK - 1):
+            page, _, _ = college_page(MultiDict({'cursor': cursors[-1]} if cursors[-1] else {}))
+            if not page.next_cursor:
+                break
+            cursors.append(page.next_cursor)
+
+    client = app.test_client()
+
+    def walk():
+        for cursor in cursors:
+            _get(client, '/colleges', {'cursor': cursor} if cursor else None)
+
+    return measure(walk, ops_per_call=len(cursors), **timing)
+
+
+@scenario
+def colleges_page_jump(app, dataset, **timing):
+    from app.routes.colleges import PER_PAGE
+
+    last = max(1, dataset['rows'] // PER_PAGE)
+    pages = cycle(sorted({p for p in (2, 10, 100, last // 2, last) if 1 < p <= last}) or [1])
+    client = app.test_client()
+    return measure(lambda: _get(client, '/colleges', {'page': next(pages)}), **timing)
+
+
+@scenario
+def list_views(app, dataset, **timing):
+    client = app.test_client()
+    _login(client)
+    urls = [f'/lists/{list_id}' for list_id in dataset['lists'].values()] + ['/my-lists', '/api/lists']
+    return measure(lambda: [_get(client, url) for url in urls], ops_per_call=len(urls), **timing)
+
+
+def _fresh_database(app, directory: str, source: str) -> Callable[[], None]:
+    from app.db import db
+
+    target = os.path.join(directory, 'ingest.db')
+
+    def reset():
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.copy(source, target)
+
+    return reset
+
+
+def _load(app, fn):
+    def call():
+        with app.app_context():
+            fn()
+    return call
+
+
+@scenario
+def load_bulk(app, dataset, **timing):
+    from app.loader import load_bulk as bulk
+
+    reset = _fresh_database(app, dataset['directory'], os.path.join(dataset['directory'], 'empty.db'))
+    return measure(_load(app, lambda: bulk(dataset['csv'])), setup=reset, **timing)
+
+
+@scenario
+def load_refresh(app, dataset, **timing):
+    from app.loader import load_bulk as bulk
+
+    _fresh_database(app, dataset['directory'], os.path.join(dataset['directory'], 'bench.db'))()
+    return measure(_load(app, lambda: bulk(dataset['csv'])), **timing)
+
+
+@scenario
+def load_stream(app, dataset, **timing):
+    from app.loader import load_streaming
+
+    reset = _fresh_database(app, dataset['directory'], os.path.join(dataset['directory'], 'empty.db'))
+    progress = os.path.join(tempfile.mkdtemp(prefix='bench-progress-'), 'progress.json')
+    return measure(_load(app, lambda: load_streaming(dataset['csv'], progress_path=progress)),
+                   setup=reset, **timing)
+
+
+def run_scenario(name: str, directory: str, dataset: Dict[str, Any], **timing) -> Dict[str, Any]:
+    """Run one scenario against the dataset in `directory` (in a fresh process)."""
+    use_dataset(directory, 'ingest.db' if name in LOAD_SCENARIOS else 'bench.db')
+    if name in LOAD_SCENARIOS:
+        timing = dict(timing, **LOAD_TIMING)
+    from app import create_app
+    from app.preload import import_ml_stack
+
+    app = create_app()
+    # Time the work, not the one-off pandas/scikit-learn import the first ranking or KD-tree pays
+    import_ml_stack()
+    dataset = dict(dataset, directory=directory, csv=os.path.join(directory, 'colleges.csv'))
+    if name == 'recommend':
+        with app.app_context():
+            result = SCENARIOS[name](app, dataset, **timing)
+    else:
+        result = SCENARIOS[name](app, dataset, **timing)
+    result['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    return result
@@ -0,0 +1,180 @@
+"""
+Startup time and per-worker memory, with and without preloading (see `app/preload.py`).
+
+One parent process forks `workers` web workers, as gunicorn does, and every worker then makes
+the same first requests (a search listing, a proximity listing, a college page with similar
+schools and a recommendation):
+
+    lazy      the parent only forks; each worker imports the app and builds what its first
+              requests need (gunicorn without --preload)
+    preload   the parent creates the app and runs `warm` before forking
+              (PRELOAD_WARM=1 gunicorn --preload run:app)
+
+Reported per mode: the parent's import/warm time and memory, and per worker its startup time,
+first-request latencies, whether pandas/scikit-learn were loaded after `create_app`, and its
+RSS, PSS (shared pages split between the processes mapping them) and USS (private pages) from
+/proc/self/smaps_rollup, taken while every worker is still alive. `total_pss_mb` (parent plus
+workers) is what the whole server costs.
+
+Each mode runs in a fresh interpreter (`python -m benchmarks.startup MODE ...`), which only
+imports the standard library and `benchmarks.datasets` before the measured imports.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.datasets import BENCH_PASSWORD, BENCH_USER, use_dataset
+
+MODES = ['lazy', 'preload']
+DEFAULT_WORKERS = 4
+ML_MODULES = ['pandas', 'sklearn', 'scipy']
+
+# (name, method, url, JSON body), made in order by every worker
+FIRST_REQUESTS = [
+    ('colleges_search', 'GET', '/colleges?search=state+university', None),
+    ('colleges_near', 'GET', '/colleges?near=40.71,-74.01&radius=100', None),
+    ('college_detail', 'GET', '/college/1', None),
+    ('recommend', 'POST', '/api/recommendations/batch', {'profiles': [{'states': ['CA'], 'user_sat': 1200}]}),
+]
+
+
+def memory_mb() -> Dict[str, Optional[float]]:
+    """This process's RSS, PSS and USS in MB (PSS/USS are None without smaps_rollup)."""
+    out: Dict[str, Optional[float]] = {'rss_mb': None, 'pss_mb': None, 'uss_mb': None}
+    try:
+        with open('/proc/self/smaps_rollup') as fh:
+            fields = {}
+            for line in fh:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        out['rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+        return out
+    out['rss_mb'] = fields.get('Rss')
+    out['pss_mb'] = fields.get('Pss')
+    out['uss_mb'] = fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)
+    return out
+
+
+def _ml_loaded() -> List[str]:
+    return [name for name in ML_MODULES if name in sys.modules]
+
+
+def _create_app() -> Any:
+    from app import create_app
+    return create_app()
+
+
+def _worker(app) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if app is None:
+        app = _create_app()
+    result: Dict[str, Any] = {'startup_seconds': time.perf_counter() - started, 'ml_loaded_at_start': _ml_loaded()}
+
+    client = app.test_client()
+    client.post('/login', data={'login': BENCH_USER, 'password': BENCH_PASSWORD})
+    result['first_request_ms'] = {}
+    for name, method, url, body in FIRST_REQUESTS:
+        started = time.perf_counter()
+        response = client.open(url, method=method, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f'{method} {url} answered {response.status_code}')
+        result['first_request_ms'][name] = (time.perf_counter() - started) * 1000
+    result.update(memory_mb())
+    return result
+
+
+def run_mode(mode: str, directory: str, workers: int = DEFAULT_WORKERS) -> Dict[str, Any]:
+    """Fork `workers` workers in `mode` and collect the parent's and each worker's numbers."""
+    use_dataset(directory)
+    parent: Dict[str, Any] = {}
+    app = None
+    if mode == 'preload':
+        started = time.perf_counter()
+        app = _create_app()
+        parent['create_app_seconds'] = time.perf_counter() - started
+        from app.preload import warm
+        parent['warm_steps'] = warm(app)
+        parent['warm_seconds'] = sum(parent['warm_steps'].values())
+    parent['ml_loaded'] = _ml_loaded()
+    parent.update(memory_mb())
+
+    # Workers report through a pipe each, then block on `release` until the parent has
+    # measured itself, so every PSS figure is taken with all processes alive
+    release_read, release_write = os.pipe()
+    children = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            os.close(release_write)
+            try:
+                result = _worker(app)
+            except Exception as e:
+                result = {'error': f'{type(e).__name__}: {e}'}
+            with os.fdopen(write_fd, 'w') as fh:
+                json.dump(result, fh)
+            os.read(release_read, 1)
+            os._exit(0)
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    results = []
+    for pid, read_fd in children:
+        with os.fdopen(read_fd) as fh:
+            results.append(json.load(fh))
+    parent_after = memory_mb()
+    os.close(release_write)
+    for pid, _ in children:
+        os.waitpid(pid, 0)
+
+    errors = [r['error'] for r in results if 'error' in r]
+    if errors:
+        raise RuntimeError(f'{mode} worker failed: {errors[0]}')
+    pss = [r['pss_mb'] for r in results] + [parent_after['pss_mb']]
+    return {
+        'mode': mode,
+        'workers': workers,
+        'parent': parent,
+        'worker_results': results,
+        'total_pss_mb': sum(pss) if None not in pss else None,
+    }
+
+
+def format_report(reports: List[Dict[str, Any]]) -> str:
+    """One summary line per mode, then per-worker memory and first-request latencies."""
+    def mb(value):
+        return f'{value:7.1f}' if value is not None else '      -'
+
+    lines = []
+    for report in reports:
+        parent, workers = report['parent'], report['worker_results']
+        first = workers[0]
+        parent_work = parent.get('create_app_seconds', 0.0) + parent.get('warm_seconds', 0.0)
+        lines.append(f"{report['mode']:<8} parent {parent_work:5.2f}s RSS {mb(parent['rss_mb'])} MB   "
+                     f"{report['workers']} workers   total PSS {mb(report['total_pss_mb'])} MB")
+        for i, worker in enumerate(workers, 1):
+            firsts = '  '.join(f'{name} {ms:7.1f}' for name, ms in worker['first_request_ms'].items())
+            lines.append(f"  worker {i}: startup {worker['startup_seconds']:5.2f}s  RSS {mb(worker['rss_mb'])}  "
+                         f"PSS {mb(worker['pss_mb'])}  USS {mb(worker['uss_mb'])} MB  first requests (ms): {firsts}")
+        loaded = ', '.join(first['ml_loaded_at_start']) or 'none'
+        lines.append(f'  ML modules loaded when a worker starts serving: {loaded}')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    # Internal: one mode in this fresh interpreter (used by `python -m benchmarks startup`)
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup')
+    parser.add_argument('mode', choices=MODES)
+    parser.add_argument('--data', required=True)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+    with open(args.out, 'w') as fh:
+        json.dump(run_mode(args.mode, args.data, args.workers), fh)
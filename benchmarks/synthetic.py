@@ -0,0 +1,207 @@
+"""
+Synthetic College Scorecard extracts.
+
+Generates a CSV in the layout `scripts/load.py` reads (the columns of `app.loader.COLUMN_MAP`),
+with the shape of the real data: institutions spread over states roughly in proportion to
+the real counts, coordinates around each state's centre, the Scorecard's control mix, skewed
+enrollment and prices, and each column's typical share of missing values. Some of the missing
+values are written the way the Scorecard writes them ("PrivacySuppressed", "PS", "NULL").
+Admissions, test scores, outcomes and price all follow one latent "selectivity" per school,
+so the recommender sees realistic correlations.
+
+The same seed and size always produce the same file.
+"""
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from app.loader import COLUMN_MAP
+
+SIZES = {'7k': 7_000, '50k': 50_000, '250k': 250_000}
+DEFAULT_SEED = 20240901
+
+# Approximate institution counts by state (weights) and state centres (lat, lon)
+STATES: Dict[str, tuple] = {
+    'AL': (90, 32.8, -86.8), 'AK': (10, 61.4, -150.0), 'AZ': (110, 33.7, -111.9), 'AR': (80, 34.9, -92.4),
+    'CA': (700, 36.8, -119.4), 'CO': (120, 39.6, -105.3), 'CT': (80, 41.6, -72.7), 'DE': (20, 39.0, -75.5),
+    'DC': (20, 38.9, -77.0), 'FL': (380, 27.8, -81.7), 'GA': (180, 33.0, -83.6), 'HI': (30, 21.3, -157.8),
+    'ID': (30, 44.2, -114.5), 'IL': (260, 40.3, -89.0), 'IN': (140, 39.8, -86.3), 'IA': (90, 42.0, -93.2),
+    'KS': (80, 38.5, -96.7), 'KY': (100, 37.7, -84.7), 'LA': (120, 31.2, -91.9), 'ME': (40, 44.7, -69.4),
+    'MD': (90, 39.1, -76.8), 'MA': (160, 42.2, -71.5), 'MI': (190, 43.3, -84.5), 'MN': (130, 45.7, -93.9),
+    'MS': (60, 32.7, -89.7), 'MO': (160, 38.5, -92.3), 'MT': (30, 46.9, -110.5), 'NE': (50, 41.1, -98.3),
+    'NV': (40, 38.3, -117.1), 'NH': (40, 43.5, -71.6), 'NJ': (170, 40.3, -74.5), 'NM': (40, 34.8, -106.2),
+    'NY': (450, 42.2, -74.9), 'NC': (190, 35.6, -79.8), 'ND': (30, 47.5, -99.8), 'OH': (300, 40.4, -82.8),
+    'OK': (110, 35.6, -96.9), 'OR': (80, 44.6, -122.1), 'PA': (350, 40.6, -77.2), 'PR': (140, 18.2, -66.5),
+    'RI': (20, 41.7, -71.5), 'SC': (110, 33.9, -80.9), 'SD': (30, 44.3, -99.4), 'TN': (150, 35.7, -86.7),
+    'TX': (430, 31.1, -97.6), 'UT': (60, 40.2, -111.9), 'VT': (25, 44.0, -72.7), 'VA': (170, 37.8, -78.2),
+    'WA': (120, 47.4, -121.5), 'WV': (70, 38.5, -81.0), 'WI': (110, 44.3, -89.6), 'WY': (10, 42.8, -107.3),
+}
+
+# Share of missing values per CSV column (columns not listed are always present)
+NULL_RATES: Dict[str, float] = {
+    'INSTURL': 0.05, 'NPCURL': 0.15, 'ZIP': 0.01, 'LATITUDE': 0.05, 'LONGITUDE': 0.05, 'ACCREDAGENCY': 0.05,
+    'LOCALE': 0.05, 'CCBASIC': 0.05, 'CCSIZSET': 0.05,
+    'COSTT4_A': 0.45, 'TUITIONFEE_IN': 0.22, 'TUITIONFEE_OUT': 0.22,
+    'GRAD_DEBT_MDN_SUPP': 0.15, 'DEBT_MDN': 0.15,
+    'MD_EARN_WNE_INC1_P11': 0.20, 'MD_EARN_WNE_INC2_P11': 0.22, 'MD_EARN_WNE_INC3_P11': 0.25,
+    'RET_FT4': 0.50, 'RET_PT4': 0.70, 'C150_4': 0.60, 'C200_4': 0.60, 'C150_L4': 0.50,
+    'ADM_RATE': 0.67, 'SAT_AVG': 0.80, 'SATVR25': 0.80, 'SATMT25': 0.80, 'ACTMT25': 0.80, 'ACTCM25': 0.80,
+    'UGDS': 0.10, 'PELL_EVER': 0.12, 'AVGFACSAL': 0.35,
+    'revised_description': 0.30, 'wiki_image': 0.60,
+}
+RACE_COLUMNS = ['UGDS_WHITE', 'UGDS_BLACK', 'UGDS_HISP', 'UGDS_ASIAN', 'UGDS_AIAN', 'UGDS_NHPI',
+                'UGDS_2MOR', 'UGDS_UNKN', 'UGDS_NRA']
+RACE_SHARES = [0.50, 0.13, 0.20, 0.07, 0.01, 0.005, 0.04, 0.03, 0.03]
+# Of the missing values in these columns, this share is written as a suppression marker
+SUPPRESSED_SHARE = 0.5
+SUPPRESSION_MARKERS = ['PrivacySuppressed', 'PS', 'NULL']
+
+PLACES = [
+    'Springfield', 'Riverside', 'Fairview', 'Georgetown', 'Madison', 'Franklin', 'Clinton', 'Arlington',
+    'Salem', 'Ashland', 'Oxford', 'Burlington', 'Manchester', 'Milton', 'Newport', 'Auburn', 'Dayton',
+    'Lexington', 'Kingston', 'Hudson', 'Marion', 'Jackson', 'Greenville', 'Bristol', 'Dover', 'Hamilton',
+    'Lakewood', 'Lincoln', 'Monroe', 'Clayton', 'Winchester', 'Cleveland', 'Columbia', 'Jefferson',
+    'Highland', 'Mount Vernon', 'Oakland', 'Chester', 'Troy', 'Canton', 'Elmwood', 'Westfield',
+    'Northfield', 'Brookside', 'Cedar Falls', 'Pine Ridge', 'Rock Hill', 'Silver Lake', 'Stonebridge',
+    'Sunnyvale', 'Bay City', 'St. Charles', 'Mt. Pleasant', 'Ft. Collins', 'Glenwood', 'Harmony',
+]
+KINDS = ['University', 'College', 'State University', 'Community College', 'Technical College',
+          'Institute of Technology', 'College of Art and Design', 'School of Nursing', 'Beauty Academy',
+         'Seminary', 'Polytechnic Institute', 'Career College']
+KIND_WEIGHTS = [0.12, 0.18, 0.06, 0.17, 0.09, 0.03, 0.03, 0.06, 0.14, 0.04, 0.02, 0.06]
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _fmt(values: np.ndarray, decimals: int = 4) -> np.ndarray:
+    return np.char.mod(f'%.{decimals}f', values).astype(object)
+
+
+def generate(rows: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """A Scorecard-layout frame of `rows` synthetic institutions (all values as CSV text)."""
+    rng = np.random.default_rng(seed)
+    n = rows
+    codes = list(STATES)
+    weights = np.array([STATES[s][0] for s in codes], dtype=float)
+    state_idx = rng.choice(len(codes), size=n, p=weights / weights.sum())
+    states = np.array(codes)[state_idx]
+    centre = np.array([STATES[s][1:] for s in codes])[state_idx]
+
+    control = rng.choice([1, 2, 3], size=n, p=[0.30, 0.27, 0.43])
+    kind = rng.choice(len(KINDS), size=n, p=KIND_WEIGHTS)
+    place = rng.integers(len(PLACES), size=n)
+    selectivity = rng.normal(0, 1, n) + np.where(control == 2, 0.4, 0) - np.where(control == 3, 0.5, 0)
+    four_year = ~np.isin(kind, [3, 4, 8, 11])
+
+    out: Dict[str, np.ndarray] = {}
+    unitid = 100000 + np.arange(n) * 7 + rng.integers(0, 7, n)
+    names = np.char.add(np.char.add(np.array(PLACES)[place], ' '), np.array(KINDS)[kind]).astype(object)
+    names = names + np.where(rng.random(n) < 0.35, ' - Campus ' + (np.arange(n) % 97).astype(str), '')
+    cities = np.array(PLACES)[rng.integers(len(PLACES), size=n)].astype(object)
+    out['UNITID'] = unitid.astype(str).astype(object)
+    out['INSTNM'] = names
+    slug = np.char.lower(np.char.replace(np.array(PLACES)[place], ' ', '')).astype(object)
+    out['INSTURL'] = 'www.' + slug + unitid.astype(str) + '.edu'
+    out['NPCURL'] = out['INSTURL'] + '/netprice'
+    out['CITY'] = cities
+    out['STABBR'] = states.astype(object)
+    zip3 = 100 + (state_idx * 17) % 890
+    out['ZIP'] = np.char.mod('%03d', zip3).astype(object) + np.char.mod('%02d', rng.integers(0, 100, n)).astype(object)
+    lat = centre[:, 0] + rng.normal(0, 1.2, n)
+    lon = centre[:, 1] + rng.normal(0, 1.6, n)
+    out['LATITUDE'], out['LONGITUDE'] = _fmt(lat), _fmt(lon)
+    out['ACCREDAGENCY'] = rng.choice(['Middle States Commission on Higher Education',
+                                      'Higher Learning Commission', 'WASC Senior College and University Commission',
+                                      'Southern Association of Colleges and Schools'], size=n).astype(object)
+
+    degree = np.where(four_year, rng.choice([3, 4], n, p=[0.5, 0.5]), rng.choice([1, 2], n, p=[0.4, 0.6]))
+    out['SCH_DEG'] = np.where(four_year, 3, rng.choice([1, 2], n)).astype(str).astype(object)
+    out['HIGHDEG'] = degree.astype(str).astype(object)
+    out['PREDDEG'] = np.minimum(degree, 3).astype(str).astype(object)
+    out['CONTROL'] = control.astype(str).astype(object)
+    out['NUMBRANCH'] = rng.choice([1, 1, 1, 2, 3, 5, 12], n).astype(str).astype(object)
+    out['MAIN'] = (rng.random(n) < 0.9).astype(int).astype(str).astype(object)
+    out['LOCALE'] = rng.choice([11, 12, 13, 21, 22, 23, 31, 32, 33, 41, 42, 43], n).astype(str).astype(object)
+    out['REGION'] = rng.integers(0, 10, n).astype(str).astype(object)
+    out['CCBASIC'] = np.where(four_year, rng.integers(15, 34, n), rng.integers(1, 15, n)).astype(str).astype(object)
+    out['CCSIZSET'] = rng.choice([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 17, 18], n).astype(str).astype(object)
+    for col, rate in (('HBCU', 0.015), ('ANNHI', 0.03), ('HBCU.1', 0.005), ('HSI', 0.08),
+                      ('MENONLY', 0.005), ('WOMENONLY', 0.008)):
+        flags = rng.random(n) < rate
+        # The Scorecard mixes 0/1 with Yes/blank in older extracts
+        out[col] = np.where(flags, rng.choice(['1', 'Yes'], n), rng.choice(['0', ''], n, p=[0.9, 0.1])).astype(object)
+
+    # Price: private schools cost more; selective ones a bit more again
+    base_cost = np.where(control == 1, 22000, np.where(control == 2, 45000, 28000))
+    cost = base_cost * np.exp(rng.normal(0, 0.25, n) + 0.08 * selectivity)
+    tuition_in = np.where(control == 1, cost * 0.35, cost * 0.65) * np.exp(rng.normal(0, 0.15, n))
+    tuition_out = np.where(control == 1, tuition_in * 2.4, tuition_in) * np.exp(rng.normal(0, 0.05, n))
+    out['COSTT4_A'] = np.round(cost).astype(int).astype(str).astype(object)
+    out['TUITIONFEE_IN'] = np.round(tuition_in).astype(int).astype(str).astype(object)
+    out['TUITIONFEE_OUT'] = np.round(tuition_out).astype(int).astype(str).astype(object)
+    debt = np.clip(rng.normal(13000 + 1500 * four_year, 4500, n), 2500, 40000)
+    out['GRAD_DEBT_MDN_SUPP'] = _fmt(debt * 1.6, 1)
+    out['DEBT_MDN'] = _fmt(debt, 1)
+    earn = 34000 * np.exp(0.18 * selectivity + rng.normal(0, 0.22, n))
+    for i, col in enumerate(['MD_EARN_WNE_INC1_P11', 'MD_EARN_WNE_INC2_P11', 'MD_EARN_WNE_INC3_P11']):
+        out[col] = np.round(earn * (0.9 + 0.1 * i)).astype(int).astype(str).astype(object)
+
+    # Outcomes and admissions from the latent selectivity
+    out['RET_FT4'] = _fmt(np.clip(_sigmoid(1.0 + 0.8 * selectivity + rng.normal(0, 0.4, n)), 0, 1))
+    out['RET_PT4'] = _fmt(np.clip(_sigmoid(-0.2 + 0.5 * selectivity + rng.normal(0, 0.6, n)), 0, 1))
+    grad = _sigmoid(0.1 + 0.9 * selectivity + rng.normal(0, 0.4, n))
+    out['C150_4'] = _fmt(grad)
+    out['C200_4'] = _fmt(np.minimum(grad * 1.08, 1))
+    out['C150_L4'] = _fmt(_sigmoid(-0.3 + 0.6 * selectivity + rng.normal(0, 0.5, n)))
+    out['ADM_RATE'] = _fmt(np.clip(_sigmoid(1.1 - 1.3 * selectivity + rng.normal(0, 0.4, n)), 0.03, 1))
+    sat = np.clip(1130 + 125 * selectivity + rng.normal(0, 40, n), 780, 1570)
+    out['SAT_AVG'] = np.round(sat).astype(int).astype(str).astype(object)
+    out['SATVR25'] = np.round(np.clip(sat / 2 - 55 + rng.normal(0, 10, n), 350, 760)).astype(int).astype(str).astype(object)
+    out['SATMT25'] = np.round(np.clip(sat / 2 - 60 + rng.normal(0, 12, n), 350, 780)).astype(int).astype(str).astype(object)
+    act = np.clip((sat - 400) / 44 + rng.normal(0, 0.8, n), 12, 35)
+    out['ACTMT25'] = np.round(act - 2).astype(int).astype(str).astype(object)
+    out['ACTCM25'] = np.round(act - 2).astype(int).astype(str).astype(object)
+
+    # Enrollment: heavy-tailed, public four-years largest
+    size = np.exp(rng.normal(6.9, 1.5, n) + np.where((control == 1) & four_year, 1.3, 0))
+    out['UGDS'] = np.maximum(np.round(size), 1).astype(int).astype(str).astype(object)
+    race = rng.dirichlet(np.array(RACE_SHARES) * 8, n)
+    for j, col in enumerate(RACE_COLUMNS):
+        out[col] = _fmt(race[:, j])
+    out['PELL_EVER'] = _fmt(np.clip(_sigmoid(-0.2 - 0.5 * selectivity + rng.normal(0, 0.4, n)), 0, 1))
+    out['AVGFACSAL'] = np.round(np.clip(rng.normal(7600 + 1200 * selectivity, 1500, n), 2500, 20000)).astype(int).astype(str).astype(object)
+
+    ctrl = np.array(['', 'public', 'private nonprofit', 'private for-profit'], dtype=object)[control]
+    out['revised_description'] = (
+        names + ' is a ' + ctrl + ' institution in ' + cities + ', ' + states.astype(object) + '. It enrolls about '
+        + out['UGDS'] + ' undergraduate students. The campus is near St. Mary\'s Park and offers programs in '
+        + rng.choice(['business, nursing and education', 'engineering and computer science',
+                      'the liberal arts', 'health sciences', 'cosmetology and barbering'], n).astype(object) + '.'
+    )
+    out['wiki_image'] = 'https://upload.example.org/' + out['UNITID'] + '.jpg'
+
+    frame = pd.DataFrame({csv: out[csv] for _, csv, _ in COLUMN_MAP})
+    ugds_missing = rng.random(n) < NULL_RATES['UGDS']
+    for col, rate in NULL_RATES.items():
+        missing = ugds_missing if col == 'UGDS' else rng.random(n) < rate
+        frame.loc[missing, col] = _missing_values(rng, int(missing.sum()), col)
+    # Demographics are missing exactly where enrollment is
+    for col in RACE_COLUMNS:
+        frame.loc[ugds_missing, col] = ''
+    return frame
+
+
+def _missing_values(rng, count: int, col: str) -> np.ndarray:
+    values = np.full(count, '', dtype=object)
+    if col in ('COSTT4_A', 'GRAD_DEBT_MDN_SUPP', 'DEBT_MDN', 'RET_FT4', 'RET_PT4', 'C150_4', 'C200_4',
+               'ADM_RATE', 'SAT_AVG', 'PELL_EVER') or col.startswith('MD_EARN'):
+        suppressed = rng.random(count) < SUPPRESSED_SHARE
+        values[suppressed] = rng.choice(SUPPRESSION_MARKERS, int(suppressed.sum()))
+    return values
+
+
+def write_csv(path: str, rows: int, seed: int = DEFAULT_SEED) -> None:
+    generate(rows, seed).to_csv(path, index=False)
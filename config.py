@@ -7,3 +7,57 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv("SECRET_KEY")
+
+    # Memory-mapped College snapshot written by scripts/snapshot.py (see app/snapshot.py)
+    COLLEGE_SNAPSHOT_DIR = os.getenv("COLLEGE_SNAPSHOT_DIR", "data/snapshot")
+    COLLEGE_SNAPSHOT_CHECK_INTERVAL = float(os.getenv("COLLEGE_SNAPSHOT_CHECK_INTERVAL", "5"))
+
+    # Per-worker LRU+TTL cache of recommendation results
+    RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "512"))
+    RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", "600"))
+
+    # Normalized populations kept server-side for live slider re-weighting
+    RECOMMENDATION_PROFILE_CACHE_SIZE = int(os.getenv("RECOMMENDATION_PROFILE_CACHE_SIZE", "64"))
+    RECOMMENDATION_PROFILE_CACHE_TTL = float(os.getenv("RECOMMENDATION_PROFILE_CACHE_TTL", "900"))
+
+    # Maximum student profiles accepted by /api/recommendations/batch
+    RECOMMENDATION_BATCH_LIMIT = int(os.getenv("RECOMMENDATION_BATCH_LIMIT", "1000"))
+
+    # Recommender process pool per web worker (0 = compute in the request thread), how many
+    # distinct requests may wait beyond the busy workers before answering 503, and the
+    # per-request wait in seconds
+    RECOMMENDATION_WORKERS = int(os.getenv("RECOMMENDATION_WORKERS", "2"))
+    RECOMMENDATION_QUEUE_DEPTH = int(os.getenv("RECOMMENDATION_QUEUE_DEPTH", "8"))
+    RECOMMENDATION_TIMEOUT = float(os.getenv("RECOMMENDATION_TIMEOUT", "20"))
+
+    # College name search backend: memory (in-process index), postgres (pg_trgm) or sqlite (FTS5)
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "memory")
+
+    # Page count on /colleges: cached (exact COUNT, cached per filter set), estimate (PostgreSQL planner rows) or off
+    COLLEGE_LIST_COUNT = os.getenv("COLLEGE_LIST_COUNT", "cached")
+
+    # Seconds browsers/shared caches may reuse anonymous college pages (ETag-validated after that)
+    HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+    # Release id folded into every ETag; defaults to a fingerprint of the templates and static files
+    HTTP_CACHE_RELEASE = os.getenv("HTTP_CACHE_RELEASE")
+
+    # Bearer token a Prometheus scraper sends to /metrics (admins can always look)
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    # Requests sending this value in X-Profile are stack-sampled every METRICS_PROFILE_INTERVAL ms (unset = off)
+    METRICS_PROFILE_TOKEN = os.getenv("METRICS_PROFILE_TOKEN")
+    METRICS_PROFILE_INTERVAL = float(os.getenv("METRICS_PROFILE_INTERVAL", "5"))
+
+    # Per-worker cache of signed-in users' profile columns (seconds before another worker's
+    # profile or password change is seen here)
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+    # Per-route SQL budgets (app/query_budget.py): off, log (warning) or raise (development/tests)
+    QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off")
+    # Budget for routes without @query_budget, and how often one statement shape may repeat per request
+    QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "10"))
+    QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "3"))
+
+    # Build the search/facet/geo/similar indexes and load the ML stack when run.py is imported,
+    # i.e. once in the gunicorn master with --preload (app/preload.py); otherwise on first use
+    PRELOAD_WARM = os.getenv("PRELOAD_WARM", "").lower() in ("1", "true", "yes")
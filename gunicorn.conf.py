@@ -0,0 +1,37 @@
+"""
+gunicorn settings; `gunicorn run:app` reads this file from the project root.
+
+Web workers are threaded (gthread). A recommendation request waits on its web worker's process
+pool (`app/ml/pool.py`) for up to `RECOMMENDATION_TIMEOUT` seconds, holding one thread, and
+the pool's coalescing and 503 backpressure only work between requests in the same process. So
+run few processes (`WEB_WORKERS`) with several threads each (`WEB_THREADS`). By default there
+are `BROWSE_THREADS` more threads than the pool lets wait, so every worker keeps serving pages
+while its pool is saturated (`python -m benchmarks saturation` checks this).
+
+Starting with sync workers while the pool is on is refused: one request per process means
+nothing ever coalesces or gets a 503, and each waiting worker is lost to browsing.
+"""
+import os
+
+from config import Config
+
+# Threads per worker left for pages when the pool has as many waiters as it allows
+BROWSE_THREADS = 4
+
+pool_waiters = Config.RECOMMENDATION_WORKERS + Config.RECOMMENDATION_QUEUE_DEPTH
+
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_WORKERS', '2'))
+threads = int(os.getenv('WEB_THREADS', str(pool_waiters + BROWSE_THREADS)))
+
+
+def on_starting(server):
+    if Config.RECOMMENDATION_WORKERS <= 0:
+        return
+    if server.cfg.worker_class_str not in ('gthread', 'gunicorn.workers.gthread.ThreadWorker'):
+        raise RuntimeError(f'worker class {server.cfg.worker_class_str!r}: the recommendation pool '
+                           'needs threaded workers (gthread; see gunicorn.conf.py)')
+    if server.cfg.threads <= pool_waiters:
+        server.log.warning('%d threads per worker: a saturated recommendation pool can hold all of '
+                           'them (up to %d wait on it); no pages are served meanwhile',
+                           server.cfg.threads, pool_waiters)
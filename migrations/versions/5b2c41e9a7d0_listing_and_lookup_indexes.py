@@ -0,0 +1,82 @@
+"""listing and lookup indexes
+
+Revision ID: 5b2c41e9a7d0
+Revises: d3e106f5a883
+Create Date: 2026-10-16 23:05:12.418220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2c41e9a7d0'
+down_revision = 'd3e106f5a883'
+branch_labels = None
+depends_on = None
+
+SPECIALTY_FLAGS = ['women_only', 'men_only', 'annhi', 'hbcu', 'tribal']
+
+
+def _listing_index(name, leading=(), where=None):
+    # Mirrors app.models._listing_index: PostgreSQL needs NULLS LAST spelled out to serve
+    # ORDER BY undergrad_population DESC NULLS LAST, SQLite rejects it (and doesn't need it)
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    order = 'undergrad_population DESC NULLS LAST' if postgresql else 'undergrad_population DESC'
+    op.create_index(
+        name, 'college', [*leading, sa.text(order), 'id'],
+        postgresql_where=sa.text(where) if where else None,
+        sqlite_where=sa.text(where) if where else None,
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    duplicates = bind.execute(sa.text(
+        "SELECT COUNT(*) FROM (SELECT unitid FROM college WHERE unitid IS NOT NULL "
+        "GROUP BY unitid HAVING COUNT(*) > 1) d"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} unitids appear on more than one college row; "
+            "remove the duplicates before adding the unique index"
+        )
+    # Repeated list entries were possible through the form route; keep the first of each
+    op.execute(
+        "DELETE FROM college_list_entry WHERE id NOT IN "
+        "(SELECT MIN(id) FROM college_list_entry GROUP BY list_id, college_id)"
+    )
+
+    op.create_index('ix_college_unitid', 'college', ['unitid'], unique=True)
+    op.create_index('ix_college_cost_of_attendance', 'college', ['cost_of_attendance'])
+    op.create_index('ix_college_admission_rate', 'college', ['admission_rate'])
+
+    true = 'true' if bind.dialect.name == 'postgresql' else '1'
+    _listing_index('ix_college_population', where='undergrad_population IS NOT NULL')
+    _listing_index('ix_college_control_population', ['control'], where='undergrad_population IS NOT NULL')
+    _listing_index('ix_college_state_population', ['state'])
+    for flag in SPECIALTY_FLAGS:
+        _listing_index(
+            f'ix_college_{flag}_population',
+            where=f'is_{flag} IS {true} AND undergrad_population IS NOT NULL',
+        )
+
+    op.create_index('ix_college_list_user_id', 'college_list', ['user_id'])
+    with op.batch_alter_table('college_list_entry', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_college_list_entry_list_college', ['list_id', 'college_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('college_list_entry', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_college_list_entry_list_college', type_='unique')
+    op.drop_index('ix_college_list_user_id', table_name='college_list')
+
+    for flag in SPECIALTY_FLAGS:
+        op.drop_index(f'ix_college_{flag}_population', table_name='college')
+    op.drop_index('ix_college_state_population', table_name='college')
+    op.drop_index('ix_college_control_population', table_name='college')
+    op.drop_index('ix_college_population', table_name='college')
+
+    op.drop_index('ix_college_admission_rate', table_name='college')
+    op.drop_index('ix_college_cost_of_attendance', table_name='college')
+    op.drop_index('ix_college_unitid', table_name='college')
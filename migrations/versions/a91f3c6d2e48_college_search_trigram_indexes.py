@@ -0,0 +1,35 @@
+"""college search trigram indexes
+
+Revision ID: a91f3c6d2e48
+Revises: 5b2c41e9a7d0
+Create Date: 2026-10-16 23:32:50.104377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91f3c6d2e48'
+down_revision = '5b2c41e9a7d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Only the postgres search backend uses these; SQLite builds its FTS5 table on demand
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in ('name', 'city'):
+        op.create_index(
+            f'ix_college_{column}_trgm', 'college', [column],
+            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for column in ('name', 'city'):
+        op.drop_index(f'ix_college_{column}_trgm', table_name='college')
@@ -0,0 +1,66 @@
+"""college short description
+
+Revision ID: c6f2d8b1a4e3
+Revises: a91f3c6d2e48
+Create Date: 2026-10-17 09:12:37.504118
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f2d8b1a4e3'
+down_revision = 'a91f3c6d2e48'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 1000
+
+# Frozen copy of app.loader.short_description as of this revision: the backfill must not
+# change when the loader does
+SHORT_DESCRIPTION_LENGTH = 365
+_SENTENCE_END = re.compile(r'[.!?](?=\s+[A-Z0-9"\'(]|$)')
+ABBREVIATIONS = {'St', 'Ste', 'Mt', 'Ft', 'Dr', 'Mr', 'Mrs', 'Ms', 'Jr', 'Sr', 'Inc', 'Co', 'No', 'vs', 'Univ'}
+
+
+def short_description(text):
+    if not isinstance(text, str) or not text.strip():
+        return None
+    text = ' '.join(text.split())
+    sentence = text
+    for end in _SENTENCE_END.finditer(text):
+        word = text[:end.start()].rsplit(' ', 1)[-1]
+        if end.group() == '.' and (word in ABBREVIATIONS or len(word) <= 1 or '.' in word):
+            continue
+        sentence = text[:end.end()]
+        break
+    if len(sentence) > SHORT_DESCRIPTION_LENGTH:
+        sentence = sentence[:SHORT_DESCRIPTION_LENGTH].rsplit(' ', 1)[0].rstrip(',;:') + '...'
+    return sentence
+
+
+def upgrade():
+    with op.batch_alter_table('college', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('short_description', sa.String(length=400), nullable=True))
+
+    # Existing rows get the same value the loader now stores; their content hashes don't
+    # change, so the streaming refresh wouldn't rewrite them
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, description FROM college WHERE description IS NOT NULL"
+    )).fetchall()
+    update = sa.text("UPDATE college SET short_description = :short WHERE id = :id")
+    for start in range(0, len(rows), BACKFILL_BATCH):
+        batch = [
+            {'id': row.id, 'short': short_description(row.description)}
+            for row in rows[start:start + BACKFILL_BATCH]
+        ]
+        bind.execute(update, batch)
+
+
+def downgrade():
+    with op.batch_alter_table('college', schema=None) as batch_op:
+        batch_op.drop_column('short_description')
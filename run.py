@@ -2,5 +2,10 @@ from app import create_app
 
 app = create_app()
 
+if app.config.get('PRELOAD_WARM'):
+    # Build the shared indexes before gunicorn --preload forks its workers (app/preload.py)
+    from app.preload import warm
+    warm(app)
+
 if __name__ == '__main__':
     app.run(debug=True)
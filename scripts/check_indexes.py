@@ -0,0 +1,73 @@
+# Check that the hot query shapes are served by an index, using EXPLAIN on the configured DB.
+# Prints each plan and exits non-zero if a query falls back to a full table scan.
+#
+# Name search (`ILIKE '%term%'`) is left out on purpose: a b-tree index can't serve it.
+import re
+import sys
+
+from sqlalchemy import text
+from werkzeug.datastructures import MultiDict
+
+from app import create_app
+from app.db import db
+from app.models import College, CollegeList, CollegeListEntry
+from app.ml.population import college_columns_query
+from app.routes.colleges import college_query
+
+LISTING_ARGS = {
+    'colleges: default order': {},
+    'colleges: state': {'state': 'CA'},
+    'colleges: control': {'control': ['public']},
+    'colleges: max cost': {'max_cost': '30000'},
+    'colleges: size': {'size': ['large']},
+    'colleges: specialty': {'specialties': ['HBCU']},
+    'colleges: selectivity': {'selectivity': ['Very Selective']},
+}
+
+
+def checked_queries():
+    queries = {
+        name: college_query(MultiDict(args))[0].limit(7)
+        for name, args in LISTING_ARGS.items()
+    }
+    queries['recommender: states + cost'] = college_columns_query(
+        ['id', 'cost_of_attendance'], ['CA', 'NY'], 40000)
+    queries['loader: unitid lookup'] = db.session.query(
+        College.unitid, College.id, College.content_hash).filter(College.unitid.in_([100000, 100001]))
+    queries['lists: by user'] = CollegeList.query.filter_by(user_id=1)
+    queries['lists: entry lookup'] = CollegeListEntry.query.filter_by(list_id=1, college_id=1)
+    return queries
+
+
+def explain(query):
+    dialect = db.engine.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    if dialect.name == 'postgresql':
+        # Tiny dev tables make sequential scans cheaper; we want to know if an index is usable
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+        return [row[0] for row in db.session.execute(text('EXPLAIN ' + sql))]
+    return [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+def uses_index(plan):
+    if db.engine.dialect.name == 'postgresql':
+        return not any('Seq Scan' in line for line in plan)
+    # SQLite: "SCAN college" is a table scan, "SCAN/SEARCH college USING ... INDEX" is not
+    return not any(re.match(r'^SCAN \w+$', line.strip()) for line in plan)
+
+
+app = create_app()
+app.app_context().push()
+
+failures = 0
+for name, query in checked_queries().items():
+    plan = explain(query)
+    ok = uses_index(plan)
+    failures += not ok
+    print(f"{'OK  ' if ok else 'FAIL'} {name}")
+    for line in plan:
+        print(f"       {line}")
+db.session.rollback()
+
+print(f"{failures} queries without an index" if failures else "All queries use an index.")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,10 @@
+# Rebuild the memory-mapped College snapshot from the database (see app/snapshot.py).
+# Running workers pick the new version up within COLLEGE_SNAPSHOT_CHECK_INTERVAL seconds.
+from app import create_app
+from app.snapshot import write_snapshot
+
+app = create_app()
+app.app_context().push()
+
+version = write_snapshot(app.config['COLLEGE_SNAPSHOT_DIR'])
+print(f"Snapshot {version} published.")